@@ -0,0 +1,47 @@
+"""Throughput of the single-item payout path against the bulk one.
+
+Usage: python -m benchmarks.bulk_create [--items 5000]
+"""
+
+import argparse
+
+from benchmarks.utils import setup_django, timer
+
+
+def make_items(count):
+    return [
+        {
+            "payment_amount": "100.00",
+            "currency": "RUB",
+            "details": {"recipient_name": f"User {i}", "method": "card"},
+            "comment": "Benchmark",
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from src.app.models import Payout
+    from src.app.services import PayoutService
+
+    items = make_items(args.items)
+
+    with timer("single-item path", args.items):
+        for data in items:
+            payout = PayoutService.create_payout(data)
+            PayoutService.submit_payout(payout.id)
+
+    Payout.objects.all().delete()
+
+    with timer("bulk path", args.items):
+        PayoutService.create_and_submit_many(items)
+
+
+if __name__ == "__main__":
+    main()
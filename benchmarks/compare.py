@@ -0,0 +1,55 @@
+"""Compare two benchmark suite result files and flag regressions.
+
+Usage: python -m benchmarks.compare BASELINE.json CANDIDATE.json [--threshold 0.1]
+
+Exits with status 1 when a metric got worse by more than the threshold.
+Throughput metrics (``per_second``) regress when they drop, every other
+metric when it grows.
+"""
+
+import argparse
+import json
+import sys
+
+# Sizes of the run rather than measurements.
+COUNTS = {"items", "samples", "stalled"}
+
+
+def flatten(results, prefix=""):
+    metrics = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and key not in COUNTS:
+            metrics[name] = value
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with open(args.baseline) as baseline, open(args.candidate) as candidate:
+        old = flatten(json.load(baseline)["results"])
+        new = flatten(json.load(candidate)["results"])
+
+    regressions = 0
+    for name in sorted(old.keys() & new.keys()):
+        before, after = old[name], new[name]
+        if not before:
+            continue
+        change = (after - before) / before
+        worse = -change if name.endswith("per_second") else change
+        marker = "REGRESSION" if worse > args.threshold else ""
+        regressions += bool(marker)
+        print(f"{name:60} {before:>12.3f} {after:>12.3f} {change:>+8.1%} {marker}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
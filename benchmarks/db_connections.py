@@ -0,0 +1,51 @@
+"""Per-request latency with a fresh connection per request against reused ones.
+
+Needs a reachable PostgreSQL server (the handshake is what is measured):
+
+    BENCH_DATABASE=postgres POSTGRES_HOST=localhost python -m benchmarks.db_connections
+
+Run it once per DB_POOL_MODE (none, persistent, pool, pgbouncer) to compare.
+"""
+
+import argparse
+
+from benchmarks.utils import measure, report, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from django.core.signals import request_finished, request_started
+    from django.db import connection
+
+    if connection.vendor != "postgresql":
+        raise SystemExit("Set BENCH_DATABASE=postgres to measure connection reuse")
+
+    from src.app.models import Payout
+
+    def handle_request():
+        # Same bookkeeping Django does around every request: connections past
+        # CONN_MAX_AGE (or pooled ones) are closed or returned when it ends.
+        request_started.send(sender=None)
+        Payout.objects.filter(status="processing").exists()
+        request_finished.send(sender=None)
+
+    def handle_request_with_new_connection():
+        connection.close()
+        Payout.objects.filter(status="processing").exists()
+
+    print(f"DB_POOL_MODE={settings.DB_POOL_MODE}")
+    report(
+        "new connection per request",
+        measure(handle_request_with_new_connection, args.requests),
+    )
+    report("configured mode", measure(handle_request, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Gateway throughput: one call at a time against calls multiplexed on a loop.
+
+Usage: python -m benchmarks.gateway [--payouts 200] [--min-latency 0.05]
+       [--max-latency 0.2] [--approval-rate 0.8] [--max-in-flight 100]
+"""
+
+import argparse
+import asyncio
+from types import SimpleNamespace
+
+from benchmarks.utils import timer
+from src.app.gateway import FakePayoutGateway
+
+
+async def submit_sequentially(gateway, payouts):
+    return [await gateway.submit(payout) for payout in payouts]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--payouts", type=int, default=200)
+    parser.add_argument("--min-latency", type=float, default=0.05)
+    parser.add_argument("--max-latency", type=float, default=0.2)
+    parser.add_argument("--approval-rate", type=float, default=0.8)
+    parser.add_argument("--max-in-flight", type=int, default=100)
+    args = parser.parse_args()
+
+    gateway = FakePayoutGateway(
+        min_latency=args.min_latency,
+        max_latency=args.max_latency,
+        approval_rate=args.approval_rate,
+        max_in_flight=args.max_in_flight,
+        seed=0,
+    )
+    payouts = [SimpleNamespace(id=i) for i in range(args.payouts)]
+
+    with timer("sequential calls", args.payouts):
+        asyncio.run(submit_sequentially(gateway, payouts))
+
+    with timer("multiplexed calls", args.payouts):
+        results = asyncio.run(gateway.submit_many(payouts))
+
+    approved = sum(result.approved for result in results)
+    print(f"approved {approved} of {len(results)}")
+
+
+if __name__ == "__main__":
+    main()
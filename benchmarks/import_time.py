@@ -0,0 +1,124 @@
+"""Startup import cost of each process role, from ``python -X importtime``.
+
+Every role starts in a fresh interpreter, with the environment docker-compose
+gives it, and loads what its process loads before serving: the API resolves
+its URLconf, workers and beat import the Celery app and all tasks.
+
+    python -m benchmarks.import_time --repeat 5 --top 15
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+STARTUP = {
+    "api": (
+        "from django.core.wsgi import get_wsgi_application\n"
+        "get_wsgi_application()\n"
+        "from django.urls import resolve\n"
+        "resolve('/api/payouts/')\n"
+    ),
+    "worker": (
+        "from src.core.celery import app\n"
+        "app.loader.import_default_modules()\n"
+        "app.finalize(auto=True)\n"
+    ),
+    "beat": (
+        "from src.core.celery import app\n"
+        "app.loader.import_default_modules()\n"
+        "app.finalize(auto=True)\n"
+    ),
+    "test": (
+        "import pytest, django\n"
+        "django.setup()\n"
+        "from django.urls import resolve\n"
+        "resolve('/api/payouts/')\n"
+    ),
+}
+
+# Mirrors docker-compose.yml.
+ROLE_ENV = {
+    "worker": {"CELERY_SKIP_CHECKS": "1"},
+    "beat": {"CELERY_SKIP_CHECKS": "1"},
+}
+
+
+def parse_importtime(stderr):
+    """``{module: (self_us, cumulative_us)}`` from ``-X importtime`` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def run_role(role):
+    env = {
+        **os.environ,
+        "APP_ROLE": role,
+        "DJANGO_SETTINGS_MODULE": "src.core.settings",
+        "SECRET_KEY": os.environ.get("SECRET_KEY", "benchmark-secret-key"),
+        **ROLE_ENV.get(role, {}),
+    }
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP[role]],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    return wall_ms, parse_importtime(process.stderr)
+
+
+def measure_roles(roles=tuple(STARTUP), repeat=3):
+    """Median import and wall time of each role's startup, in milliseconds."""
+    results = {}
+    for role in roles:
+        runs = [run_role(role) for _ in range(repeat)]
+        imports = [
+            sum(self_us for self_us, _ in modules.values()) / 1000
+            for _, modules in runs
+        ]
+        results[role] = {
+            "import_ms": round(statistics.median(imports), 1),
+            "wall_ms": round(statistics.median(wall for wall, _ in runs), 1),
+            "modules": len(runs[-1][1]),
+        }
+    return results
+
+
+def top_packages(modules, count):
+    packages = Counter()
+    for name, (self_us, _) in modules.items():
+        packages[name.split(".")[0]] += self_us
+    return packages.most_common(count)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--role", action="append", choices=sorted(STARTUP))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    roles = args.role or list(STARTUP)
+    for role, result in measure_roles(roles, args.repeat).items():
+        print(
+            f"{role}: {result['import_ms']:.0f}ms importing {result['modules']} "
+            f"modules, {result['wall_ms']:.0f}ms to start"
+        )
+        _, modules = run_role(role)
+        for package, self_us in top_packages(modules, args.top):
+            print(f"    {package:<24} {self_us / 1000:>7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
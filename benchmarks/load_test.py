@@ -0,0 +1,101 @@
+"""Throughput of the sync (gunicorn) and async (uvicorn) API under concurrency.
+
+Needs both deployments running, e.g. ``docker compose up``:
+
+    python -m benchmarks.load_test \
+        --target sync=http://localhost:8000/api/payouts/ \
+        --target async=http://localhost:8001/api/async/payouts/ \
+        --concurrency 1,4,16,64
+
+Every client creates a payout, reads it back and fetches the first list page,
+in a loop, for ``--duration`` seconds per concurrency level. Sync throughput
+is capped by the number of gunicorn workers; compare how far past that each
+target keeps scaling.
+"""
+
+import argparse
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.utils import summarize
+
+PAYLOAD = json.dumps(
+    {
+        "payment_amount": "100.00",
+        "currency": "USD",
+        "details": {"recipient_name": "Load test", "method": "card"},
+        "comment": "Load test",
+    }
+).encode()
+
+
+def call(url, data=None):
+    request = urllib.request.Request(
+        url, data=data, headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read() or b"null")
+
+
+def client(base_url, deadline):
+    latencies = []
+    errors = 0
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            payout = call(base_url, PAYLOAD)
+            call(f"{base_url}{payout['id']}/")
+            call(base_url)
+        except OSError:
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies, errors
+
+
+def run(base_url, concurrency, duration):
+    deadline = time.monotonic() + duration
+    with ThreadPoolExecutor(concurrency) as pool:
+        futures = [pool.submit(client, base_url, deadline) for _ in range(concurrency)]
+        results = [future.result() for future in futures]
+
+    latencies = [
+        latency for client_latencies, _ in results for latency in client_latencies
+    ]
+    errors = sum(client_errors for _, client_errors in results)
+    if len(latencies) < 2:
+        return {"flows_per_second": 0, "errors": errors}
+    return {
+        "flows_per_second": round(len(latencies) / duration, 1),
+        "errors": errors,
+        **summarize(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--target",
+        action="append",
+        required=True,
+        help="NAME=BASE_URL of a payout collection endpoint",
+    )
+    parser.add_argument("--concurrency", default="1,4,16,64")
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    for target in args.target:
+        name, base_url = target.split("=", 1)
+        for concurrency in map(int, args.concurrency.split(",")):
+            result = run(base_url, concurrency, args.duration)
+            print(
+                f"{name} x{concurrency}: {result['flows_per_second']} flows/s, "
+                f"p50 {result.get('p50', 0):.1f}ms, p95 {result.get('p95', 0):.1f}ms, "
+                f"{result['errors']} errors"
+            )
+
+
+if __name__ == "__main__":
+    main()
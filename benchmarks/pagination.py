@@ -0,0 +1,78 @@
+"""Latency of the first and a deep page of GET /api/payouts/ per pagination mode.
+
+Usage: python -m benchmarks.pagination [--rows 200000] [--depth 0.9]
+"""
+
+import argparse
+import uuid
+from datetime import timedelta
+
+from benchmarks.utils import measure, report, setup_django
+
+
+def seed(rows, batch_size=10000):
+    from django.utils import timezone
+
+    from src.app.models import Payout
+
+    now = timezone.now()
+    for start in range(0, rows, batch_size):
+        Payout.objects.bulk_create(
+            Payout(
+                id=uuid.uuid4(),
+                payment_amount="10.00",
+                details={"recipient_name": "Bench", "method": "card"},
+                created_at=now - timedelta(seconds=i),
+            )
+            for i in range(start, min(start + batch_size, rows))
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--depth", type=float, default=0.9)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from django.test import Client
+
+    from src.app.cache import payout_cache
+    from src.app.models import Payout
+    from src.app.pagination import PayoutCursorPagination
+
+    def get(params):
+        # Measure the database path, not the response cache.
+        payout_cache.clear()
+        client.get(url, params)
+
+    seed(args.rows)
+    client = Client()
+    url = "/api/payouts/"
+    page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    deep_page = max(1, int(args.rows * args.depth) // page_size)
+
+    deep_row = Payout.objects.order_by("-created_at", "-id")[
+        (deep_page - 1) * page_size - 1
+    ]
+    deep_cursor = PayoutCursorPagination().encode_cursor(
+        deep_row.created_at, deep_row.id
+    )
+
+    scenarios = {
+        "page number, first page": {},
+        f"page number, page {deep_page}": {"page": deep_page},
+        "no count, first page": {"count": "false"},
+        f"no count, page {deep_page}": {"count": "false", "page": deep_page},
+        "cursor, first page": {"pagination": "cursor"},
+        f"cursor, page {deep_page}": {"cursor": deep_cursor},
+    }
+    for label, params in scenarios.items():
+        report(label, measure(lambda: get(params), args.repeat))
+
+
+if __name__ == "__main__":
+    main()
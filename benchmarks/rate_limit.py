@@ -0,0 +1,179 @@
+"""Simulated gateway overload with and without the adaptive rate limiter.
+
+Worker threads drain a queue of payout batches against a fake gateway that
+slows down past ``--capacity`` concurrent calls and fails more and more
+often beyond that. Failed batches are retried the old way (fixed delay) or
+with the limiter plus jittered backoff:
+
+    python -m benchmarks.rate_limit --payouts 2000 --workers 16
+"""
+
+import argparse
+import asyncio
+import heapq
+import itertools
+import random
+import statistics
+import threading
+import time
+from types import SimpleNamespace
+
+from benchmarks.utils import setup_django
+
+
+class OverloadedGateway:
+    """Latency grows with the calls in flight past capacity, and so do errors."""
+
+    def __init__(self, capacity, base_latency, seed=None):
+        self.capacity = capacity
+        self.base_latency = base_latency
+        self.in_flight = 0
+        self.calls = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    async def submit_many(self, payouts):
+        from src.app.gateway import GatewayResult
+
+        with self._lock:
+            self.in_flight += len(payouts)
+            self.calls += len(payouts)
+            load = self.in_flight / self.capacity
+        started = time.monotonic()
+        try:
+            await asyncio.sleep(self.base_latency * max(1.0, load) ** 2)
+            if self._random.random() < min(0.9, (load - 1) / 2):
+                with self._lock:
+                    self.errors += len(payouts)
+                return [TimeoutError("gateway overloaded") for _ in payouts]
+            latency = time.monotonic() - started
+            return [GatewayResult(payout.id, True, latency) for payout in payouts]
+        finally:
+            with self._lock:
+                self.in_flight -= len(payouts)
+
+
+def simulate(args, limiter):
+    from src.app.exceptions import GatewayRateLimitedError
+    from src.app.ratelimit import retry_delay
+
+    gateway = OverloadedGateway(args.capacity, args.base_latency, seed=1)
+    ids = itertools.count()
+    queue = []
+    for _ in range(args.payouts // args.batch_size):
+        batch = [
+            SimpleNamespace(id=next(ids), currency="USD", details={})
+            for _ in range(args.batch_size)
+        ]
+        queue.append((0.0, next(ids), batch, 0))
+    lock = threading.Lock()
+    pending = [len(queue)]
+    latencies = []
+    retries = [0]
+    started = time.monotonic()
+
+    def requeue(delay, batch, attempt):
+        with lock:
+            heapq.heappush(
+                queue,
+                (time.monotonic() - started + delay, next(ids), batch, attempt),
+            )
+
+    def worker():
+        while True:
+            with lock:
+                if not pending[0]:
+                    return
+                if not queue or queue[0][0] > time.monotonic() - started:
+                    item = None
+                else:
+                    item = heapq.heappop(queue)
+            if item is None:
+                time.sleep(0.005)
+                continue
+
+            _, _, batch, attempt = item
+            try:
+                if limiter is not None:
+                    limiter.throttle(batch)
+            except GatewayRateLimitedError as exc:
+                requeue(exc.retry_after + retry_delay(0), batch, attempt)
+                continue
+
+            call_started = time.monotonic()
+            results = asyncio.run(gateway.submit_many(batch))
+            if limiter is not None:
+                limiter.observe(batch, results)
+            if any(isinstance(result, Exception) for result in results):
+                with lock:
+                    retries[0] += 1
+                delay = args.retry_delay if limiter is None else retry_delay(attempt)
+                requeue(delay, batch, attempt + 1)
+                continue
+
+            with lock:
+                latencies.append(time.monotonic() - call_started)
+                pending[0] -= 1
+
+    threads = [threading.Thread(target=worker) for _ in range(args.workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "seconds": round(time.monotonic() - started, 2),
+        "gateway_calls": gateway.calls,
+        "gateway_errors": gateway.errors,
+        "retries": retries[0],
+        "p50_ms": round(quantiles[49] * 1000, 1),
+        "p95_ms": round(quantiles[94] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--payouts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--capacity", type=int, default=40)
+    parser.add_argument("--base-latency", type=float, default=0.02)
+    parser.add_argument(
+        "--retry-delay", type=float, default=0.5, help="fixed delay of the baseline"
+    )
+    parser.add_argument("--rate", type=float, default=2000.0)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+
+    from src.app.ratelimit import GatewayRateLimiter, LocalRateStore
+
+    # Scaled down by the same factor as the simulated latencies.
+    settings.PAYOUT_RETRY_BASE_DELAY = 0.05
+    settings.PAYOUT_RETRY_MAX_DELAY = 2.0
+    settings.PAYOUT_RATE_LIMIT_MAX_WAIT = 0.1
+    settings.PAYOUT_RATE_LIMITS = {
+        "default": {
+            **settings.PAYOUT_RATE_LIMITS["default"],
+            "rate": args.rate,
+            "burst": args.rate / 10,
+            "min_rate": args.rate / 50,
+            "increase": args.rate / 100,
+            "target_latency": args.base_latency * 2,
+        }
+    }
+
+    for name, limiter in [
+        ("unlimited, fixed retry delay", None),
+        ("adaptive limiter, jittered backoff", GatewayRateLimiter(LocalRateStore())),
+    ]:
+        result = simulate(args, limiter)
+        print(f"{name}: " + ", ".join(f"{k}={v}" for k, v in result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Redis memory taken by Celery task results, before and after slimming.
+
+Encodes the result meta of the payout and periodic tasks the way the result
+backend stores it and projects the memory held for a day of traffic:
+
+    python -m benchmarks.result_backend --payouts-per-day 1000000
+
+With ``--redis-url`` the results are also written to that Redis (to keys
+under a throwaway prefix, deleted afterwards) and ``used_memory`` is
+measured instead of estimated from the payload size.
+"""
+
+import argparse
+import uuid
+from datetime import UTC, datetime
+
+from kombu.serialization import dumps
+
+from benchmarks.utils import setup_django
+
+KEY_PREFIX = "celery-task-meta-"
+STALLED_TICKS_PER_DAY = 24 * 6
+
+# Return values before and after slimming, as stored per task.
+OLD_SINGLE = {
+    "task_id": str(uuid.uuid4()),
+    "payout_id": str(uuid.uuid4()),
+    "status": "approved",
+    "new_status": "paid",
+    "processing_time": 6.482913374519348,
+}
+NEW_SINGLE = {"new_status": "paid", "processing_time": 6.483}
+
+
+def result_meta(result):
+    return {
+        "status": "SUCCESS",
+        "result": result,
+        "traceback": None,
+        "children": [],
+        "date_done": datetime.now(UTC).isoformat(),
+        "task_id": str(uuid.uuid4()),
+    }
+
+
+def payload_size(result, serializer):
+    _, _, payload = dumps(result_meta(result), serializer=serializer)
+    return len(KEY_PREFIX) + 36 + len(payload)
+
+
+def measure_redis(url, result, serializer, samples, ttl):
+    """Bytes of ``used_memory`` per stored result."""
+    import redis
+
+    client = redis.Redis.from_url(url)
+    prefix = f"bench-{uuid.uuid4().hex[:8]}-{KEY_PREFIX}"
+    before = client.info("memory")["used_memory"]
+    pipeline = client.pipeline(transaction=False)
+    for _ in range(samples):
+        _, _, payload = dumps(result_meta(result), serializer=serializer)
+        pipeline.set(f"{prefix}{uuid.uuid4()}", payload, ex=ttl)
+    pipeline.execute()
+    used = client.info("memory")["used_memory"] - before
+    for keys in batched(client.scan_iter(f"{prefix}*", count=1000), 1000):
+        client.delete(*keys)
+    return used / samples
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--payouts-per-day", type=int, default=1_000_000)
+    parser.add_argument("--redis-url", help="measure against this Redis")
+    parser.add_argument("--samples", type=int, default=20000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+
+    ttl = settings.CELERY_RESULT_EXPIRES
+    scenarios = [
+        # name, result, serializer, seconds kept (None: forever)
+        ("before: json, full dict, no expiry", OLD_SINGLE, "json", None),
+        ("msgpack, slim dict, no expiry", NEW_SINGLE, "msgpack", None),
+        (f"after: msgpack, slim dict, {ttl}s TTL", NEW_SINGLE, "msgpack", ttl),
+        ("after: ignore_result (default)", None, None, 0),
+    ]
+
+    per_second = args.payouts_per_day / 86400
+    stalled = payload_size("Processed 100 payouts", "json") * STALLED_TICKS_PER_DAY
+    print(f"{args.payouts_per_day:,} payouts/day, one stored result each")
+    print(f"stalled scan strings before: {stalled / 1024:,.1f} KiB/day, forever")
+    for name, result, serializer, kept in scenarios:
+        if kept == 0:
+            print(f"{name}: 0 B/result, 0 MiB held")
+            continue
+        if args.redis_url:
+            size = measure_redis(args.redis_url, result, serializer, args.samples, kept)
+            source = "measured"
+        else:
+            size = payload_size(result, serializer)
+            source = "key + payload"
+        held = args.payouts_per_day if kept is None else per_second * kept
+        growth = " after one day, growing" if kept is None else ", steady"
+        print(
+            f"{name}: {size:,.0f} B/result ({source}), "
+            f"{held * size / 2**20:,.1f} MiB held{growth}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Rows per second of PayoutSerializer against the fast read path.
+
+Both paths render the same rows to JSON; the output is checked to be byte
+identical before timing.
+
+Usage: python -m benchmarks.serializers [--rows 5000] [--repeat 20]
+"""
+
+import argparse
+
+from benchmarks.pagination import seed
+from benchmarks.utils import measure, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from rest_framework.renderers import JSONRenderer
+
+    from src.app.encoders import PAYOUT_FIELDS, PayoutRowEncoder
+    from src.app.models import Payout
+    from src.app.renderers import FastJSONRenderer
+    from src.app.serializers import PayoutSerializer
+
+    seed(args.rows)
+    queryset = Payout.objects.order_by("-created_at")
+    encoder = PayoutRowEncoder()
+    instances = list(queryset)
+    rows = list(queryset.values_list(*PAYOUT_FIELDS, named=True))
+
+    paths = {
+        "serializer, with query": lambda: JSONRenderer().render(
+            PayoutSerializer(queryset, many=True).data
+        ),
+        "fast path, with query": lambda: FastJSONRenderer().render(
+            [
+                encoder.to_dict(row)
+                for row in queryset.values_list(*PAYOUT_FIELDS, named=True)
+            ]
+        ),
+        "serializer, encoding only": lambda: JSONRenderer().render(
+            PayoutSerializer(instances, many=True).data
+        ),
+        "fast path, encoding only": lambda: FastJSONRenderer().render(
+            [encoder.to_dict(row) for row in rows]
+        ),
+    }
+    if paths["serializer, with query"]() != paths["fast path, with query"]():
+        raise SystemExit("Fast path output differs from PayoutSerializer")
+
+    for name, render in paths.items():
+        best = min(measure(render, args.repeat)) / 1000
+        print(f"{name}: {args.rows / best:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
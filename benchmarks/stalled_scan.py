@@ -0,0 +1,79 @@
+"""Duration of check_stalled_payouts over a large seeded Payout table.
+
+Usage: python -m benchmarks.stalled_scan [--rows 1000000] [--stalled 0.01]
+"""
+
+import argparse
+import random
+import uuid
+from datetime import timedelta
+
+from benchmarks.utils import setup_django, timer
+
+
+def seed(rows, stalled_ratio, batch_size=10000):
+    from django.utils import timezone
+
+    from src.app.models import Payout, StatusChoices
+
+    statuses = [StatusChoices.PAID, StatusChoices.CANCELLED, StatusChoices.CREATED]
+    stalled_ids = []
+    for start in range(0, rows, batch_size):
+        payouts = []
+        for _ in range(min(batch_size, rows - start)):
+            payout = Payout(
+                id=uuid.uuid4(),
+                payment_amount="10.00",
+                details={"recipient_name": "Bench", "method": "card"},
+                status=random.choice(statuses),
+            )
+            if random.random() < stalled_ratio:
+                payout.status = StatusChoices.PROCESSING
+                stalled_ids.append(payout.id)
+            payouts.append(payout)
+        Payout.objects.bulk_create(payouts)
+
+    past = timezone.now() - timedelta(hours=1)
+    for start in range(0, len(stalled_ids), batch_size):
+        Payout.objects.filter(id__in=stalled_ids[start : start + batch_size]).update(
+            updated_at=past
+        )
+    return len(stalled_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--stalled", type=float, default=0.01)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.utils import timezone
+
+    from src.app.models import Payout, StatusChoices
+    from src.app.tasks.sanity_task import check_stalled_payouts
+
+    with timer(f"seeding {args.rows} payouts", args.rows):
+        stalled = seed(args.rows, args.stalled)
+    print(f"{stalled} stalled payouts")
+
+    cutoff = timezone.now() - timedelta(minutes=10)
+    with timer("legacy scan (count twice + full iteration)", stalled):
+        legacy = Payout.objects.filter(
+            status=StatusChoices.PROCESSING, updated_at__lt=cutoff
+        )
+        legacy.count()
+        legacy.count()
+        for _ in legacy:
+            pass
+
+    with timer("check_stalled_payouts", stalled):
+        print(check_stalled_payouts())
+
+    with timer("check_stalled_payouts, nothing left"):
+        print(check_stalled_payouts())
+
+
+if __name__ == "__main__":
+    main()
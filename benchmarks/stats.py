@@ -0,0 +1,57 @@
+"""Payout statistics read from the rollup table against live GROUP BY.
+
+Usage: python -m benchmarks.stats [--rows 200000] [--days 90]
+"""
+
+import argparse
+import random
+import uuid
+from datetime import timedelta
+
+from benchmarks.utils import measure, report, setup_django
+
+
+def seed(rows, days, batch_size=10000):
+    from django.utils import timezone
+
+    from src.app.models import CurrencyChoices, Payout, StatusChoices
+
+    now = timezone.now()
+    for start in range(0, rows, batch_size):
+        Payout.objects.bulk_create(
+            Payout(
+                id=uuid.uuid4(),
+                payment_amount=f"{random.randint(1, 10000)}.00",
+                currency=random.choice(CurrencyChoices.values),
+                status=random.choice(StatusChoices.values),
+                created_at=now - timedelta(days=random.randrange(days)),
+            )
+            for _ in range(min(batch_size, rows - start))
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from src.app.models import PayoutDailyStat
+    from src.app.stats import live_stats, reconcile_stats
+
+    seed(args.rows, args.days)
+    reconcile_stats()
+
+    report(
+        "rollup table",
+        measure(lambda: list(PayoutDailyStat.objects.all()), args.repeat),
+    )
+    report("live GROUP BY", measure(live_stats, args.repeat))
+    report("reconcile", measure(reconcile_stats, 3))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Benchmark suite for the payout API and task pipeline.
+
+Seeds a configurable number of payouts, runs every scenario and writes the
+results as JSON so that runs can be compared with ``benchmarks.compare``:
+
+    python -m benchmarks.suite --rows 100000
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+
+Runs against a throwaway SQLite database, or against PostgreSQL with
+``BENCH_DATABASE=postgres``. Celery runs in eager mode with the fake gateway.
+"""
+
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.utils import measure, setup_django, summarize
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+SCENARIOS = {}
+
+
+def scenario(func):
+    SCENARIOS[func.__name__] = func
+    return func
+
+
+def make_items(count):
+    return [
+        {
+            "payment_amount": "100.00",
+            "currency": "USD",
+            "details": {"recipient_name": f"Suite {i}", "method": "card"},
+            "comment": "Benchmark suite",
+        }
+        for i in range(count)
+    ]
+
+
+def throughput(func, items):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    return {
+        "items": items,
+        "seconds": round(elapsed, 3),
+        "per_second": round(items / elapsed, 1),
+    }
+
+
+@scenario
+def create_submit(args, client):
+    from src.app.services import PayoutService
+
+    def run():
+        for data in make_items(args.items):
+            payout = PayoutService.create_payout(data)
+            PayoutService.submit_payout(payout.id)
+
+    return throughput(run, args.items)
+
+
+@scenario
+def bulk_create(args, client):
+    from src.app.services import PayoutService
+
+    return throughput(
+        lambda: PayoutService.create_and_submit_many(make_items(args.items)),
+        args.items,
+    )
+
+
+@scenario
+def list_latency(args, client):
+    from src.app.cache import payout_cache
+
+    def get(params):
+        # Measure the database path, not the response cache.
+        payout_cache.clear()
+        client.get("/api/payouts/", params)
+
+    requests = {
+        "first_page": {},
+        "status_filter": {"status": "paid"},
+        "currency_and_date_filter": {
+            "currency": "USD",
+            "created_after": "2000-01-01T00:00:00Z",
+        },
+        "search": {"search": "Suite"},
+        "no_count": {"count": "false"},
+        "cursor": {"pagination": "cursor"},
+        "deep_page": {"page": max(1, args.rows // 40), "count": "false"},
+    }
+    return {
+        name: summarize(measure(lambda params=params: get(params), args.repeat))
+        for name, params in requests.items()
+    }
+
+
+@scenario
+def stalled_scan(args, client):
+    from benchmarks.stalled_scan import seed
+    from src.app.tasks.sanity_task import check_stalled_payouts
+
+    stalled = seed(max(1, args.rows // 10), stalled_ratio=0.1)
+    started = time.perf_counter()
+    check_stalled_payouts()
+    return {"stalled": stalled, "seconds": round(time.perf_counter() - started, 3)}
+
+
+@scenario
+def task_pipeline(args, client):
+    from celery import current_app
+
+    from src.app.models import OutboxMessage
+    from src.app.services import PayoutService
+
+    def run():
+        PayoutService.create_and_submit_many(make_items(args.items))
+        for message in OutboxMessage.objects.filter(sent_at__isnull=True):
+            current_app.tasks[message.task_name].apply(args=message.args)
+        OutboxMessage.objects.all().delete()
+
+    return throughput(run, args.items)
+
+
+@scenario
+def import_time(args, client):
+    from benchmarks.import_time import measure_roles
+
+    return measure_roles(repeat=3)
+
+
+def seed(rows):
+    from benchmarks.pagination import seed as seed_payouts
+
+    seed_payouts(rows)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--gateway-latency", type=float, default=0.0)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS))
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    setup_django()
+    # Per-payout task logging would dominate the pipeline timings.
+    logging.disable(logging.INFO)
+
+    from django.conf import settings
+    from django.db import connection
+    from django.test import Client
+
+    settings.PAYOUT_GATEWAY = {
+        "BACKEND": "src.app.gateway.FakePayoutGateway",
+        "OPTIONS": {
+            "min_latency": args.gateway_latency,
+            "max_latency": args.gateway_latency,
+        },
+    }
+    seed(args.rows)
+
+    results = {}
+    client = Client()
+    for name in args.scenario or SCENARIOS:
+        print(f"Running {name}...")
+        results[name] = SCENARIOS[name](args, client)
+        print(json.dumps(results[name], indent=2))
+
+    run = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "rows": args.rows,
+            "items": args.items,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    output = args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(run, indent=2))
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
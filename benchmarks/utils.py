@@ -0,0 +1,83 @@
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+
+def setup_django():
+    """Configure Django for an offline benchmark run.
+
+    Celery publishes to an in-memory broker, the cache is process-local, Redis
+    status events, cache invalidation broadcasts and gateway rate limiting are
+    off and the database is a throwaway
+    SQLite one, unless ``BENCH_DATABASE=postgres`` is set, in which case a
+    test database is created next to the configured Postgres one.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "src.core.settings")
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+    os.environ.setdefault("CELERY_BROKER_URL", "memory://")
+    os.environ.setdefault("CELERY_RESULT_BACKEND", "cache+memory://")
+    os.environ.setdefault("PAYOUT_EVENTS_ENABLED", "false")
+    os.environ.setdefault("PAYOUT_CACHE_BROADCAST", "false")
+    os.environ.setdefault("PAYOUT_RATE_LIMIT_BACKEND", "none")
+
+    import django
+    from django.conf import settings
+
+    if os.environ.get("BENCH_DATABASE", "sqlite") != "postgres":
+        settings.DATABASES["default"] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": ":memory:",
+        }
+    settings.CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+    }
+
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, serialize=False)
+
+
+@contextmanager
+def timer(label, items=None):
+    started = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - started
+    if items:
+        print(f"{label}: {elapsed:.3f}s ({items / elapsed:,.0f} items/s)")
+    else:
+        print(f"{label}: {elapsed:.3f}s")
+
+
+def measure(func, repeat=20):
+    """Call ``func`` ``repeat`` times and return latencies in milliseconds."""
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def summarize(latencies):
+    """Latency percentiles in milliseconds, as stored in suite results."""
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "p50": round(quantiles[49], 3),
+        "p95": round(quantiles[94], 3),
+        "p99": round(quantiles[98], 3),
+        "max": round(max(latencies), 3),
+        "samples": len(latencies),
+    }
+
+
+def report(label, latencies):
+    summary = summarize(latencies)
+    print(
+        f"{label}: p50 {summary['p50']:.2f}ms, p95 {summary['p95']:.2f}ms, "
+        f"max {summary['max']:.2f}ms"
+    )
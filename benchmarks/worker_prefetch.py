@@ -0,0 +1,202 @@
+"""How worker presets spread long payout tasks and what that does to latency.
+
+A discrete-event simulation of Celery prefork workers draining a shared
+queue, with the broker as an in-memory FIFO. Each node reserves up to
+``concurrency * prefetch_multiplier`` messages, not counting running tasks
+that were acknowledged early. A node hands a reserved message only to an
+idle child (``-O fair``). Nodes take turns fetching, as clients blocked on
+a Redis list do. Payouts arrive in bursts, like bulk submissions, and take
+3-10 s each, except for a share of batch tasks that run for a minute. Now
+and then a child dies mid-task. With early acks its payout waits for the
+stalled scan; with ``reject_on_worker_lost`` it is requeued.
+
+    python -m benchmarks.worker_prefetch --nodes 3 --concurrency 4
+"""
+
+import argparse
+import heapq
+import itertools
+import random
+import statistics
+from collections import deque
+
+from benchmarks.utils import setup_django, summarize
+
+STALLED_SCAN_INTERVAL = 600.0
+STALLED_AFTER = 600.0
+
+
+class Message:
+    def __init__(self, arrived, duration):
+        self.arrived = arrived
+        self.duration = duration
+        self.started = None
+
+
+class Node:
+    def __init__(self, concurrency, multiplier, acks_late):
+        self.window = concurrency * multiplier
+        self.acks_late = acks_late
+        self.reserved = deque()
+        self.children = [None] * concurrency
+        self.completed = [0] * concurrency
+
+    def has_room(self):
+        unacked = len(self.reserved)
+        if self.acks_late:
+            unacked += sum(child is not None for child in self.children)
+        return unacked < self.window
+
+    def idle_children(self):
+        return [i for i, child in enumerate(self.children) if child is None]
+
+
+def simulate(args, profile):
+    rng = random.Random(args.seed)
+    nodes = [
+        Node(
+            args.concurrency,
+            profile["worker_prefetch_multiplier"],
+            profile["task_acks_late"],
+        )
+        for _ in range(args.nodes)
+    ]
+    broker = deque()
+    events = []
+    order = itertools.count()
+    turn = itertools.cycle(range(len(nodes)))
+    waits, totals = [], []
+    lost = recovered = 0
+
+    def schedule(at, kind, *payload):
+        heapq.heappush(events, (at, next(order), kind, payload))
+
+    def dispatch(now):
+        # Nodes with room fetch one message at a time, in turns.
+        while broker:
+            for _ in range(len(nodes)):
+                node = nodes[next(turn)]
+                if node.has_room():
+                    node.reserved.append(broker.popleft())
+                    break
+            else:
+                break
+        for node_index, node in enumerate(nodes):
+            for child in node.idle_children():
+                if not node.reserved:
+                    break
+                message = node.reserved.popleft()
+                message.started = now
+                node.children[child] = message
+                schedule(now + message.duration, "finish", node_index, child)
+
+    at = 0.0
+    for _ in range(args.bursts):
+        for _ in range(args.burst_size):
+            if rng.random() < args.batch_share:
+                duration = args.batch_duration
+            else:
+                duration = rng.uniform(*args.duration)
+            schedule(at, "arrive", Message(at, duration))
+        at += rng.expovariate(1 / args.burst_interval)
+    crash_at = rng.expovariate(1 / args.crash_interval)
+    while crash_at < at:
+        schedule(crash_at, "crash")
+        crash_at += rng.expovariate(1 / args.crash_interval)
+    scan_at = STALLED_SCAN_INTERVAL
+    while scan_at < at + STALLED_AFTER * 2:
+        schedule(scan_at, "scan")
+        scan_at += STALLED_SCAN_INTERVAL
+
+    stalled = []
+    while events:
+        now, _, kind, payload = heapq.heappop(events)
+        if kind == "arrive":
+            broker.append(payload[0])
+        elif kind == "finish":
+            node_index, child = payload
+            node = nodes[node_index]
+            message = node.children[child]
+            if message is None or message.started + message.duration != now:
+                continue  # the child died before finishing this one
+            node.children[child] = None
+            node.completed[child] += 1
+            waits.append(message.started - message.arrived)
+            totals.append(now - message.arrived)
+        elif kind == "crash":
+            busy = [
+                (node, child)
+                for node in nodes
+                for child, message in enumerate(node.children)
+                if message is not None
+            ]
+            if not busy:
+                continue
+            node, child = rng.choice(busy)
+            message, node.children[child] = node.children[child], None
+            if profile["task_reject_on_worker_lost"]:
+                broker.appendleft(message)
+            else:
+                lost += 1
+                stalled.append(message)
+        elif kind == "scan":
+            # The payout stays PROCESSING; the scan resubmits it once stale.
+            for message in [m for m in stalled if now - m.arrived >= STALLED_AFTER]:
+                stalled.remove(message)
+                broker.append(message)
+                recovered += 1
+        dispatch(now)
+
+    completed = [count for node in nodes for count in node.completed]
+    return {
+        "tasks_per_child_min": min(completed),
+        "tasks_per_child_max": max(completed),
+        "tasks_per_child_cv": round(
+            statistics.pstdev(completed) / statistics.mean(completed), 3
+        ),
+        "wait": summarize(waits),
+        "total": summarize(totals),
+        "lost_to_crashes": lost,
+        "recovered_by_scan": recovered,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--bursts", type=int, default=400)
+    parser.add_argument("--burst-size", type=int, default=30)
+    parser.add_argument(
+        "--burst-interval", type=float, default=60.0, help="mean seconds between"
+    )
+    parser.add_argument(
+        "--duration", type=float, nargs=2, default=(3.0, 10.0), metavar=("MIN", "MAX")
+    )
+    parser.add_argument("--batch-share", type=float, default=0.05)
+    parser.add_argument("--batch-duration", type=float, default=60.0)
+    parser.add_argument(
+        "--crash-interval", type=float, default=1800.0, help="mean seconds between"
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+
+    for name, profile in settings.WORKER_PROFILES.items():
+        result = simulate(args, profile)
+        wait, total = result["wait"], result["total"]
+        print(
+            f"{name}: tasks per child {result['tasks_per_child_min']}-"
+            f"{result['tasks_per_child_max']} (cv {result['tasks_per_child_cv']}), "
+            f"wait p50 {wait['p50']:.1f}s p95 {wait['p95']:.1f}s "
+            f"p99 {wait['p99']:.1f}s max {wait['max']:.1f}s, "
+            f"end-to-end p99 {total['p99']:.1f}s max {total['max']:.1f}s, "
+            f"{result['lost_to_crashes']} lost to crashes"
+        )
+
+
+if __name__ == "__main__":
+    main()
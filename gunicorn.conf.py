@@ -0,0 +1,20 @@
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", 4))
+# Settings size the database pool of each worker from the same variable.
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+
+
+def post_fork(server, worker):
+    # Only relevant with --preload, when the master may have opened
+    # connections before forking.
+    from src.core.db import close_db_connections
+
+    close_db_connections()
+
+
+def child_exit(server, worker):
+    from src.app.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
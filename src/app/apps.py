@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class AppConfig(AppConfig):
     name = "src.app"
+
+    def ready(self):
+        from src.app import instrumentation, receivers  # noqa: F401
@@ -0,0 +1,142 @@
+"""Async variants of the payout create, submit, retrieve and list endpoints.
+
+Served by uvicorn, a worker keeps many requests in flight instead of one.
+Reads go through the async ORM. Writes run in a thread because they need a
+transaction, which the async ORM does not offer yet. Tasks are published by
+writing outbox rows in that transaction, so no request waits on the broker.
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from src.app.cache import entry_headers, payout_cache
+from src.app.exceptions import PAYOUT_REQUEST_ERRORS
+from src.app.filters import PayoutFilterSet
+from src.app.idempotency import (
+    HEADER,
+    REPLAYED_HEADER,
+    payload_fingerprint,
+    run_idempotent,
+)
+from src.app.models import Payout, PayoutArchive
+from src.app.pagination import PayoutCursorPagination
+from src.app.serializers import PayoutCreateSerializer, PayoutSerializer
+from src.app.services import PayoutService
+from src.app.streams import NOT_FOUND
+
+
+def create_and_submit(data):
+    try:
+        payout = PayoutService.create_payout(data)
+        payout = PayoutService.submit_payout(payout.id)
+    except PAYOUT_REQUEST_ERRORS as e:
+        return Response({"error": str(e)}, status=400)
+    return Response(PayoutSerializer(payout).data, status=201)
+
+
+def submit(payout_id):
+    try:
+        payout = PayoutService.submit_payout(payout_id)
+    except PAYOUT_REQUEST_ERRORS as e:
+        return Response({"error": str(e)}, status=400)
+    return Response(PayoutSerializer(payout).data)
+
+
+async def run_once(request, data, handler):
+    """``handler()`` in a thread, at most once per ``Idempotency-Key``.
+
+    ``handler`` returns a DRF ``Response``, like the viewset actions, so the
+    stored responses replay the same way on both APIs.
+    """
+    key = request.headers.get(HEADER)
+    if key is None:
+        response = await sync_to_async(handler)()
+    else:
+        fingerprint = payload_fingerprint(request.method, request.path, data)
+        response = await sync_to_async(run_idempotent)(key, fingerprint, handler)
+    json_response = JsonResponse(response.data, status=response.status_code)
+    if REPLAYED_HEADER in response:
+        json_response[REPLAYED_HEADER] = response[REPLAYED_HEADER]
+    return json_response
+
+
+def cached_json_response(request, entry):
+    not_modified = get_conditional_response(
+        request, etag=entry["etag"], last_modified=entry["last_modified"]
+    )
+    if not_modified is not None:
+        return not_modified
+    return JsonResponse(entry["data"], headers=entry_headers(entry))
+
+
+async def create_payout(request):
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"detail": "JSON parse error"}, status=400)
+
+    serializer = PayoutCreateSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    return await run_once(
+        request, data, lambda: create_and_submit(serializer.validated_data)
+    )
+
+
+async def list_payouts(request):
+    drf_request = Request(request)
+    filterset = PayoutFilterSet(drf_request.query_params, queryset=Payout.objects.all())
+    if not filterset.is_valid():
+        return JsonResponse(filterset.errors, status=400)
+
+    paginator = PayoutCursorPagination()
+    try:
+        page = await paginator.apaginate_queryset(filterset.qs, drf_request)
+    except NotFound as e:
+        return JsonResponse({"detail": str(e.detail)}, status=404)
+    return JsonResponse(
+        {
+            "next": paginator.get_next_link(),
+            "results": PayoutSerializer(page, many=True).data,
+        }
+    )
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+async def payouts(request):
+    """Create a payout and submit it, or list payouts newest first by cursor."""
+    if request.method == "POST":
+        return await create_payout(request)
+    return await list_payouts(request)
+
+
+@require_GET
+async def payout_detail(request, pk):
+    payout_id = str(pk)
+    entry = await sync_to_async(payout_cache.get_detail)(payout_id)
+    if entry is None:
+        payout = await Payout.objects.filter(pk=payout_id).afirst()
+        if payout is None:
+            payout = await PayoutArchive.objects.filter(pk=payout_id).afirst()
+        if payout is None:
+            return JsonResponse(NOT_FOUND, status=404)
+        entry = await sync_to_async(payout_cache.set_detail)(
+            payout_id, PayoutSerializer(payout).data, payout.updated_at
+        )
+    return cached_json_response(request, entry)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def submit_payout(request, pk):
+    return await run_once(request, {}, lambda: submit(pk))
@@ -0,0 +1,226 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import redis
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import http_date
+
+logger = logging.getLogger(__name__)
+
+LIST_GENERATION_KEY = "payouts:list:generation"
+INVALIDATION_CHANNEL = "payouts:cache:invalidate"
+# Stored in place of an invalidated detail entry; see ``PayoutCache``.
+TOMBSTONE = "invalidated"
+
+
+@functools.cache
+def get_redis():
+    return redis.Redis.from_url(settings.REDIS_URL)
+
+
+class LocalLRUCache:
+    """Small thread-safe in-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class PayoutCache:
+    """Rendered payout responses, cached in two tiers.
+
+    An in-process LRU with a short TTL sits in front of the shared cache
+    (Redis in production). List entries are keyed by a generation counter
+    that every change bumps, so stale pages are never read again.
+
+    When a payout changes, its detail entry is replaced by a tombstone for
+    ``PAYOUT_CACHE_TOMBSTONE_TTL`` seconds, and fills only ``add()`` entries.
+    A reader that loaded the row before the change therefore cannot put
+    the stale version back. With ``PAYOUT_CACHE_BROADCAST`` on, changes are
+    published over Redis pub/sub. Every process that reads through the
+    local tier drops the detail entry from its own LRU too.
+    """
+
+    def __init__(self):
+        self.local = LocalLRUCache(
+            settings.PAYOUT_CACHE_LOCAL_MAX_SIZE, settings.PAYOUT_CACHE_LOCAL_TTL
+        )
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[settings.PAYOUT_CACHE_ALIAS]
+
+    def get_detail(self, payout_id):
+        return self._get(self.detail_key(payout_id))
+
+    def set_detail(self, payout_id, data, updated_at):
+        entry = self.make_entry(
+            data, f"{payout_id}:{updated_at.isoformat()}", updated_at
+        )
+        key = self.detail_key(payout_id)
+        if self.shared.add(key, entry, settings.PAYOUT_CACHE_TTL):
+            self.local.set(key, entry)
+            self._ensure_listener()
+        return entry
+
+    def get_list(self, key):
+        """Entry under ``key``, from ``list_key()`` computed before the query."""
+        return self._get(key)
+
+    def set_list(self, key, data):
+        # The generation in ``key`` predates the query, so a page read while
+        # a change was committed lands under a generation nobody reads.
+        # No Last-Modified: the newest row of a filtered page can get older
+        # when a row leaves it, so only the ETag validates a page.
+        entry = self.make_entry(data, key, None)
+        self._set(key, entry)
+        return entry
+
+    def invalidate(self, payout_ids):
+        keys = [self.detail_key(payout_id) for payout_id in payout_ids]
+        for key in keys:
+            self.local.delete(key)
+        self.shared.set_many(
+            dict.fromkeys(keys, TOMBSTONE), settings.PAYOUT_CACHE_TOMBSTONE_TTL
+        )
+        try:
+            self.shared.incr(LIST_GENERATION_KEY)
+        except ValueError:
+            self.shared.add(LIST_GENERATION_KEY, 1, timeout=None)
+        if settings.PAYOUT_CACHE_BROADCAST and payout_ids:
+            self.broadcast(payout_ids)
+
+    def broadcast(self, payout_ids):
+        message = json.dumps([str(payout_id) for payout_id in payout_ids])
+        try:
+            get_redis().publish(INVALIDATION_CHANNEL, message)
+        except redis.RedisError as e:
+            # Other processes fall back on the local TTL.
+            logger.error(f"Failed to broadcast {len(payout_ids)} invalidations: {e}")
+
+    def apply_broadcast(self, message):
+        for payout_id in json.loads(message):
+            self.local.delete(self.detail_key(payout_id))
+
+    def _ensure_listener(self):
+        """Start this process's invalidation listener, once per fork."""
+        if not settings.PAYOUT_CACHE_BROADCAST or self._listener_pid == os.getpid():
+            return
+        with self._listener_lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            threading.Thread(
+                target=self._listen, name="payout-cache-invalidations", daemon=True
+            ).start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = redis.Redis.from_url(settings.REDIS_URL).pubsub(
+                    ignore_subscribe_messages=True
+                )
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Whatever was published while disconnected is lost.
+                self.local.clear()
+                for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.apply_broadcast(message["data"])
+            except redis.RedisError as e:
+                logger.warning(f"Payout cache invalidation listener failed: {e}")
+                self.local.clear()
+                time.sleep(1)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    @staticmethod
+    def normalize_id(payout_id):
+        """Canonical form of a payout ID, or None if it is not a UUID."""
+        try:
+            return str(uuid.UUID(str(payout_id)))
+        except ValueError:
+            return None
+
+    @staticmethod
+    def detail_key(payout_id):
+        return f"payouts:detail:{payout_id}"
+
+    def list_key(self, url):
+        generation = self.shared.get(LIST_GENERATION_KEY, 0)
+        digest = hashlib.md5(url.encode()).hexdigest()
+        return f"payouts:list:{generation}:{digest}"
+
+    @staticmethod
+    def make_entry(data, version, updated_at):
+        return {
+            "data": data,
+            "etag": f'"{hashlib.md5(version.encode()).hexdigest()}"',
+            # Whole seconds, like the If-Modified-Since it is compared with.
+            "last_modified": int(updated_at.timestamp()) if updated_at else None,
+        }
+
+    def _get(self, key):
+        entry = self.local.get(key)
+        if entry is None:
+            entry = self.shared.get(key)
+            if entry == TOMBSTONE:
+                return None
+            if entry is not None:
+                self.local.set(key, entry)
+                self._ensure_listener()
+        return entry
+
+    def _set(self, key, entry):
+        self.local.set(key, entry)
+        self.shared.set(key, entry, settings.PAYOUT_CACHE_TTL)
+
+
+def entry_headers(entry):
+    headers = {"ETag": entry["etag"]}
+    if entry["last_modified"] is not None:
+        headers["Last-Modified"] = http_date(entry["last_modified"])
+    return headers
+
+
+payout_cache = PayoutCache()
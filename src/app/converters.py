@@ -0,0 +1,16 @@
+from django.urls import register_converter
+from django.urls.converters import UUIDConverter
+
+
+class PayoutIDConverter(UUIDConverter):
+    """A payout UUID in any letter case, passed to views as a ``uuid.UUID``.
+
+    Django's ``uuid`` converter only matches lowercase hex digits.
+    """
+
+    regex = (
+        "[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+    )
+
+
+register_converter(PayoutIDConverter, "payout_id")
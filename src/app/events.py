@@ -0,0 +1,170 @@
+import asyncio
+import functools
+import json
+import logging
+import weakref
+from collections import defaultdict
+
+import redis
+import redis.asyncio
+from django.conf import settings
+
+from src.app.models import Payout
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "payouts:status:"
+SUBSCRIBE_TIMEOUT = 5.0
+RECONNECT_DELAY = 1.0
+
+
+def status_channel(payout_id):
+    return f"{CHANNEL_PREFIX}{payout_id}"
+
+
+@functools.cache
+def get_redis():
+    return redis.Redis.from_url(settings.REDIS_URL)
+
+
+def publish_status_changes(transitions):
+    """Publish status changes to Redis pub/sub, one channel per payout."""
+    if not settings.PAYOUT_EVENTS_ENABLED:
+        return
+
+    pipeline = get_redis().pipeline(transaction=False)
+    for transition in transitions:
+        message = {"id": str(transition.payout_id), "status": transition.new_status}
+        pipeline.publish(status_channel(transition.payout_id), json.dumps(message))
+    try:
+        pipeline.execute()
+    except redis.RedisError as e:
+        logger.error(f"Failed to publish {len(transitions)} status changes: {e}")
+
+
+class StatusListener:
+    """The process's one Redis subscriber, fanning status changes out to waiters.
+
+    Long-polls and streams register a queue for their payouts instead of each
+    opening a Redis connection and subscription. The pattern subscription
+    receives every status change; those nobody in the process waits for are
+    dropped. Changes published while the connection is being re-established
+    are missed, the waiters' timeouts cover that.
+    """
+
+    def __init__(self):
+        self.queues = defaultdict(set)
+        self.subscribed = asyncio.Event()
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    def add(self, payout_ids, queue):
+        for payout_id in payout_ids:
+            self.queues[payout_id].add(queue)
+
+    def discard(self, payout_ids, queue):
+        for payout_id in payout_ids:
+            queues = self.queues.get(payout_id, set())
+            queues.discard(queue)
+            if not queues:
+                self.queues.pop(payout_id, None)
+
+    def dispatch(self, message):
+        data = json.loads(message["data"])
+        for queue in self.queues.get(data["id"], ()):
+            queue.put_nowait((data["id"], data["status"]))
+
+    async def run(self):
+        while True:
+            client = redis.asyncio.Redis.from_url(settings.REDIS_URL)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                self.subscribed.set()
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self.dispatch(message)
+            except redis.RedisError as e:
+                logger.error(f"Status subscription lost, reconnecting: {e}")
+            finally:
+                self.subscribed.clear()
+                await pubsub.aclose()
+                await client.aclose()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+
+# One listener per event loop, which is one per uvicorn worker.
+_listeners = weakref.WeakKeyDictionary()
+
+
+def get_status_listener():
+    loop = asyncio.get_running_loop()
+    if loop not in _listeners:
+        _listeners[loop] = StatusListener()
+    return _listeners[loop]
+
+
+class RedisStatusSubscription:
+    """Status changes of the given payouts, received over Redis pub/sub."""
+
+    def __init__(self, payout_ids):
+        self.payout_ids = list(payout_ids)
+
+    async def __aenter__(self):
+        self.listener = get_status_listener()
+        # Subscribed before the caller reads the current statuses, so that
+        # no change falls between the read and the subscription.
+        await asyncio.wait_for(self.listener.subscribed.wait(), SUBSCRIBE_TIMEOUT)
+        self.queue = asyncio.Queue()
+        self.listener.add(self.payout_ids, self.queue)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.listener.discard(self.payout_ids, self.queue)
+
+    async def get(self, timeout):
+        """Return the next ``(payout_id, status)`` change, or None on timeout."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+
+class PollingStatusSubscription:
+    """Fallback that polls the database when pub/sub events are disabled."""
+
+    def __init__(self, payout_ids):
+        self.payout_ids = list(payout_ids)
+        self.known = None
+
+    async def __aenter__(self):
+        self.known = await fetch_statuses(self.payout_ids)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+    async def get(self, timeout):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            current = await fetch_statuses(self.payout_ids)
+            for payout_id in self.payout_ids:
+                status = current.get(payout_id)
+                if status != self.known.get(payout_id):
+                    self.known[payout_id] = status
+                    return payout_id, status
+
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(settings.PAYOUT_WAIT_POLL_INTERVAL, remaining))
+
+
+def subscribe(payout_ids):
+    if settings.PAYOUT_EVENTS_ENABLED:
+        return RedisStatusSubscription(payout_ids)
+    return PollingStatusSubscription(payout_ids)
+
+
+async def fetch_statuses(payout_ids):
+    rows = Payout.objects.filter(id__in=payout_ids).values_list("id", "status")
+    return {str(payout_id): status async for payout_id, status in rows}
@@ -1,2 +1,23 @@
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+
+
 class InvalidStatusTransitionError(Exception):
     pass
+
+
+class GatewayRateLimitedError(Exception):
+    def __init__(self, scope, retry_after):
+        super().__init__(f"Gateway rate limit for {scope}, retry in {retry_after:.1f}s")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+# Errors a payout request can be refused with as 400 Bad Request. Anything
+# else, database errors included, is left to propagate as a 500, so that an
+# idempotency key is not stored for a failure a retry could get past.
+PAYOUT_REQUEST_ERRORS = (
+    InvalidStatusTransitionError,
+    ObjectDoesNotExist,
+    ValidationError,
+    ValueError,
+)
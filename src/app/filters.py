@@ -0,0 +1,57 @@
+from django.db import connections
+from django_filters import rest_framework as django_filters
+from rest_framework import filters
+
+from src.app.models import Payout, PayoutArchive, PayoutDailyStat
+from src.app.search import payout_search_query, payout_search_vector
+
+
+class PayoutSearchFilter(filters.SearchFilter):
+    """``?search=`` served by the GIN full-text index on PostgreSQL.
+
+    Every term must prefix-match a word of the payout's comment, recipient
+    name or method, so ``?search=Ivan`` finds "Ivanov", but not "Kivanov"
+    as the ``icontains`` search did.
+
+    Other databases (SQLite in tests) fall back to DRF's ``icontains`` search
+    over the view's ``search_fields``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if connections[queryset.db].vendor != "postgresql":
+            return super().filter_queryset(request, queryset, view)
+
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+
+        return queryset.annotate(search_document=payout_search_vector()).filter(
+            search_document=payout_search_query(search_terms)
+        )
+
+
+class PayoutFilterSet(django_filters.FilterSet):
+    created_after = django_filters.IsoDateTimeFilter(
+        field_name="created_at", lookup_expr="gte"
+    )
+    created_before = django_filters.IsoDateTimeFilter(
+        field_name="created_at", lookup_expr="lt"
+    )
+
+    class Meta:
+        model = Payout
+        fields = ["status", "currency"]
+
+
+class ArchivedPayoutFilterSet(PayoutFilterSet):
+    class Meta(PayoutFilterSet.Meta):
+        model = PayoutArchive
+
+
+class PayoutDailyStatFilterSet(django_filters.FilterSet):
+    date_from = django_filters.DateFilter(field_name="day", lookup_expr="gte")
+    date_to = django_filters.DateFilter(field_name="day", lookup_expr="lte")
+
+    class Meta:
+        model = PayoutDailyStat
+        fields = ["status", "currency"]
@@ -0,0 +1,104 @@
+import abc
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+@dataclass(frozen=True)
+class GatewayResult:
+    payout_id: object
+    approved: bool
+    latency: float
+
+
+class PayoutGateway(abc.ABC):
+    """Interface of the external payout system.
+
+    ``submit`` is a coroutine, so a worker can keep many gateway calls in
+    flight on one event loop instead of blocking a process per payout.
+    """
+
+    def __init__(self, max_in_flight=100):
+        self.max_in_flight = max_in_flight
+
+    @abc.abstractmethod
+    async def submit(self, payout):
+        """Send one payout and return its ``GatewayResult``."""
+
+    async def submit_many(self, payouts):
+        """Submit payouts concurrently.
+
+        Returns results in input order; a failed call yields its exception
+        instead of a ``GatewayResult``.
+        """
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        async def submit_one(payout):
+            async with semaphore:
+                return await self.submit(payout)
+
+        return await asyncio.gather(
+            *(submit_one(payout) for payout in payouts), return_exceptions=True
+        )
+
+
+class FakePayoutGateway(PayoutGateway):
+    """Local stand-in with configurable latency and approval rate."""
+
+    def __init__(
+        self,
+        min_latency=3.0,
+        max_latency=10.0,
+        approval_rate=0.8,
+        max_in_flight=100,
+        seed=None,
+    ):
+        super().__init__(max_in_flight=max_in_flight)
+        self.min_latency = min_latency
+        self.max_latency = max_latency
+        self.approval_rate = approval_rate
+        self._random = random.Random(seed)
+
+    async def submit(self, payout):
+        started = time.monotonic()
+        await asyncio.sleep(self._random.uniform(self.min_latency, self.max_latency))
+        return GatewayResult(
+            payout_id=payout.id,
+            approved=self._random.random() < self.approval_rate,
+            latency=time.monotonic() - started,
+        )
+
+
+def get_gateway():
+    config = settings.PAYOUT_GATEWAY
+    return import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
+
+
+def call_gateway(payouts):
+    """Run gateway calls for ``payouts`` on a fresh event loop.
+
+    Waits for the shared rate limiter first. Returns results in input order;
+    payouts the limiter held back get a ``GatewayRateLimitedError`` instead.
+    """
+    # Both load the models; imported here so that the gateway classes can be
+    # used without a configured Django, as the gateway benchmark does.
+    from src.app.metrics import record_gateway_results
+    from src.app.ratelimit import get_rate_limiter
+
+    limiter = get_rate_limiter()
+    deferred = limiter.throttle(payouts) if limiter is not None else {}
+    sent = [payout for index, payout in enumerate(payouts) if index not in deferred]
+    sent_results = asyncio.run(get_gateway().submit_many(sent)) if sent else []
+    record_gateway_results(sent_results)
+    if limiter is not None:
+        limiter.observe(sent, sent_results)
+
+    sent_results = iter(sent_results)
+    return [
+        deferred[index] if index in deferred else next(sent_results)
+        for index in range(len(payouts))
+    ]
@@ -0,0 +1,101 @@
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from src.app.models import PayoutEvent
+
+REPORT_PERCENTILES = (50, 95, 99)
+
+
+def append_events(events, since=None):
+    """Timestamp unsaved ``PayoutEvent`` objects and insert them in one batch.
+
+    ``latency`` is measured from the last logged event of each payout, looked
+    up with a single grouped query. Pass ``since``, a time no event of these
+    payouts can predate, to let PostgreSQL skip older partitions.
+    """
+    if not events:
+        return []
+
+    now = timezone.now()
+    for event in events:
+        event.created_at = now
+
+    followed = {event.payout_id for event in events if event.from_status is not None}
+    if followed:
+        previous = PayoutEvent.objects.filter(payout_id__in=followed)
+        if since is not None:
+            previous = previous.filter(created_at__gte=since)
+        last_at = {
+            str(payout_id): created_at
+            for payout_id, created_at in previous.values("payout_id")
+            .annotate(last=Max("created_at"))
+            .values_list("payout_id", "last")
+        }
+        for event in events:
+            if (created_at := last_at.get(str(event.payout_id))) is not None:
+                event.latency = now - created_at
+
+    return PayoutEvent.objects.bulk_create(
+        events, batch_size=settings.PAYOUT_BULK_INSERT_BATCH_SIZE
+    )
+
+
+def log_transitions(transitions):
+    append_events(
+        [
+            PayoutEvent(
+                payout_id=transition.payout_id,
+                from_status=transition.old_status,
+                to_status=transition.new_status,
+                task_id=transition.task_id,
+            )
+            for transition in transitions
+        ],
+        since=min(transition.created_at for transition in transitions),
+    )
+
+
+def percentile(ordered, percent):
+    """Nearest-rank percentile of an ordered, non-empty list."""
+    return ordered[max(math.ceil(len(ordered) * percent / 100) - 1, 0)]
+
+
+def stage_latency_report(since, until=None):
+    """Latency percentiles of each ``from -> to`` stage, slowest p95 first.
+
+    Only events created in ``[since, until)`` are read, which the monthly
+    partitions and the BRIN index on ``created_at`` keep to that range on
+    PostgreSQL.
+    """
+    events = PayoutEvent.objects.filter(created_at__gte=since, latency__isnull=False)
+    if until is not None:
+        events = events.filter(created_at__lt=until)
+
+    samples = defaultdict(list)
+    rows = events.values_list("from_status", "to_status", "latency").iterator(
+        chunk_size=settings.PAYOUT_EXPORT_CHUNK_SIZE
+    )
+    for from_status, to_status, latency in rows:
+        samples[(from_status, to_status)].append(latency.total_seconds())
+
+    report = []
+    for (from_status, to_status), latencies in samples.items():
+        latencies.sort()
+        report.append(
+            {
+                "from_status": from_status,
+                "to_status": to_status,
+                "count": len(latencies),
+                **{
+                    f"p{percent}": percentile(latencies, percent)
+                    for percent in REPORT_PERCENTILES
+                },
+                "max": latencies[-1],
+            }
+        )
+    report.sort(key=lambda stage: stage["p95"], reverse=True)
+    return report
@@ -0,0 +1,136 @@
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from src.app.models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def cache_key(key):
+    return f"payouts:idempotency:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def payload_fingerprint(method, path, data):
+    body = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(f"{method} {path}\n{body}".encode()).hexdigest()
+
+
+def request_fingerprint(request):
+    return payload_fingerprint(request.method, request.path, request.data)
+
+
+def stored_response(record):
+    """``(fingerprint, status, data)`` of a finished request."""
+    if isinstance(record, IdempotencyKey):
+        return record.fingerprint, record.response_status, record.response_data
+    return record
+
+
+def lookup(key):
+    shared = caches[settings.PAYOUT_CACHE_ALIAS]
+    record = shared.get(cache_key(key))
+    if record is None:
+        row = IdempotencyKey.objects.filter(key=key).first()
+        if row is not None:
+            record = stored_response(row)
+            shared.set(cache_key(key), record, settings.PAYOUT_IDEMPOTENCY_TTL)
+    return record
+
+
+def replay(record, fingerprint):
+    stored_fingerprint, response_status, data = record
+    if stored_fingerprint != fingerprint:
+        return Response(
+            {"error": f"{HEADER} was already used for a different request"},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    return Response(data, status=response_status, headers={REPLAYED_HEADER: "true"})
+
+
+def execute_once(key, fingerprint, handler):
+    """Run ``handler`` unless a response is already stored under ``key``.
+
+    The key row is inserted in the same transaction as the handler's writes:
+    a request that fails with an exception leaves no key behind and may be
+    retried, and a concurrent duplicate waits on the unique index and then
+    replays the committed response. Server errors are rolled back and not
+    stored either, only 2xx and 4xx answers are final.
+    """
+    record = lookup(key)
+    if record is not None:
+        return replay(record, fingerprint)
+
+    try:
+        with transaction.atomic():
+            row = IdempotencyKey.objects.create(
+                key=key, fingerprint=fingerprint, response_status=0
+            )
+            # A savepoint, so a handler that broke the transaction fails here
+            # instead of the key row being saved on top of it.
+            with transaction.atomic():
+                response = handler()
+            if response.status_code >= 500:
+                transaction.set_rollback(True)
+                return response
+            # Round trip through JSON so the first answer and the replays match.
+            row.response_status = response.status_code
+            row.response_data = json.loads(
+                json.dumps(response.data, cls=DjangoJSONEncoder)
+            )
+            row.save(update_fields=["response_status", "response_data"])
+            record = stored_response(row)
+            transaction.on_commit(
+                lambda: caches[settings.PAYOUT_CACHE_ALIAS].set(
+                    cache_key(key), record, settings.PAYOUT_IDEMPOTENCY_TTL
+                )
+            )
+    except IntegrityError:
+        record = lookup(key)
+        if record is None:
+            raise
+        return replay(record, fingerprint)
+    return response
+
+
+def run_idempotent(key, fingerprint, handler):
+    """``execute_once`` for a client-supplied key, which is validated first."""
+    if not key or len(key) > IdempotencyKey._meta.get_field("key").max_length:
+        return Response(
+            {"error": f"{HEADER} must be 1 to 255 characters long"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return execute_once(key, fingerprint, handler)
+
+
+def idempotent(action):
+    """Make a viewset action honour the ``Idempotency-Key`` request header."""
+
+    @functools.wraps(action)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return action(self, request, *args, **kwargs)
+        return run_idempotent(
+            key,
+            request_fingerprint(request),
+            lambda: action(self, request, *args, **kwargs),
+        )
+
+    return wrapper
+
+
+def purge_idempotency_keys():
+    cutoff = timezone.now() - timedelta(seconds=settings.PAYOUT_IDEMPOTENCY_RETENTION)
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,82 @@
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from celery.signals import task_postrun, task_prerun
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Usage:
+    """SQL queries, database time and wall time spent in one unit of work."""
+
+    queries: int = 0
+    db_time: float = 0.0
+    wall_time: float = 0.0
+    started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def as_dict(self):
+        return {
+            "queries": self.queries,
+            "db_ms": round(self.db_time * 1000, 3),
+            "wall_ms": round(self.wall_time * 1000, 3),
+        }
+
+
+@contextmanager
+def record_usage():
+    """Count queries run on the default connection inside the block.
+
+    Recordings nest, so a test can put a budget around a request that the
+    view also records.
+    """
+    usage = Usage()
+    try:
+        with connection.execute_wrapper(usage):
+            yield usage
+    finally:
+        usage.wall_time = time.perf_counter() - usage.started
+
+
+def log_usage(name, usage):
+    logger.info(
+        " ".join([name, *(f"{key}={value}" for key, value in usage.as_dict().items())]),
+        extra={"operation": name, **usage.as_dict()},
+    )
+
+
+def usage_headers(usage):
+    return {
+        "X-Query-Count": str(usage.queries),
+        "X-DB-Time-Ms": f"{usage.db_time * 1000:.3f}",
+        "X-Wall-Time-Ms": f"{usage.wall_time * 1000:.3f}",
+    }
+
+
+_task_recordings = {}
+
+
+@task_prerun.connect
+def start_task_recording(task_id, task, **kwargs):
+    recording = record_usage()
+    _task_recordings[task_id] = (recording, recording.__enter__())
+
+
+@task_postrun.connect
+def finish_task_recording(task_id, task, **kwargs):
+    recording, usage = _task_recordings.pop(task_id, (None, None))
+    if recording is None:
+        return
+    recording.__exit__(None, None, None)
+    log_usage(f"task.{task.name}", usage)
@@ -0,0 +1,80 @@
+from datetime import UTC, datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from src.app.models import PayoutEvent
+from src.app.partitions import (
+    add_months,
+    archive_settled_payouts,
+    create_partitions,
+    drop_empty_partitions,
+    drop_expired_partitions,
+    is_partitioned,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Create upcoming monthly Payout and PayoutEvent partitions, move old "
+        "settled payouts to the archive table and drop expired payout events"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=3,
+            help="Number of future monthly partitions to keep ready",
+        )
+        parser.add_argument(
+            "--archive-after",
+            type=int,
+            default=6,
+            help="Archive settled payouts created more than N months ago",
+        )
+        parser.add_argument(
+            "--event-retention",
+            type=int,
+            default=12,
+            help="Drop payout events created more than N months ago",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        month = timezone.now().date().replace(day=1)
+        cutoff_month = add_months(month, -options["archive_after"])
+        cutoff = datetime(cutoff_month.year, cutoff_month.month, 1, tzinfo=UTC)
+
+        partitioned = is_partitioned()
+        if partitioned:
+            for name in create_partitions(options["months_ahead"]):
+                self.stdout.write(f"Created partition {name}")
+        else:
+            self.stdout.write("Payout table is not partitioned, skipping DDL")
+
+        archived = archive_settled_payouts(cutoff, options["batch_size"])
+        self.stdout.write(
+            f"Archived {archived} payouts created before {cutoff:%Y-%m-%d}"
+        )
+
+        if partitioned:
+            for name in drop_empty_partitions(cutoff):
+                self.stdout.write(f"Dropped empty partition {name}")
+
+        event_month = add_months(month, -options["event_retention"])
+        event_cutoff = datetime(event_month.year, event_month.month, 1, tzinfo=UTC)
+        event_table = PayoutEvent._meta.db_table
+        if is_partitioned(event_table):
+            for name in create_partitions(options["months_ahead"], event_table):
+                self.stdout.write(f"Created partition {name}")
+            for name in drop_expired_partitions(event_cutoff, event_table):
+                self.stdout.write(f"Dropped expired partition {name}")
+        else:
+            deleted, _ = PayoutEvent.objects.filter(
+                created_at__lt=event_cutoff
+            ).delete()
+            self.stdout.write(
+                f"Deleted {deleted} payout events created before "
+                f"{event_cutoff:%Y-%m-%d}"
+            )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from src.app.routing import payout_queues
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the queues payout tasks can be routed to under the current "
+        "settings, comma-separated for a Celery worker's -Q option"
+    )
+    requires_system_checks = []
+
+    def handle(self, *args, **options):
+        self.stdout.write(",".join(payout_queues()))
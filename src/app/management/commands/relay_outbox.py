@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from src.app.outbox import relay_outbox, requeue_dead_messages
+
+
+class Command(BaseCommand):
+    help = "Continuously publish pending outbox messages to the Celery broker"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.PAYOUT_OUTBOX_BATCH_SIZE
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.PAYOUT_OUTBOX_POLL_INTERVAL,
+            help="Seconds to sleep when the outbox is empty",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Drain the outbox and exit"
+        )
+        parser.add_argument(
+            "--requeue-dead",
+            action="store_true",
+            help="Retry messages set aside after too many failed publishes first",
+        )
+
+    def handle(self, *args, **options):
+        if options["requeue_dead"]:
+            self.stdout.write(f"Requeued {requeue_dead_messages()} dead messages")
+        while True:
+            sent = relay_outbox(options["batch_size"])
+            if sent:
+                self.stdout.write(f"Relayed {sent} messages")
+                continue
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
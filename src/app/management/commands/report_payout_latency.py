@@ -0,0 +1,45 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from src.app.history import REPORT_PERCENTILES, stage_latency_report
+
+
+class Command(BaseCommand):
+    help = (
+        "Print latency percentiles of each payout status stage from the event "
+        "log, slowest first"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=float,
+            default=24,
+            help="Report on events logged in the last N hours",
+        )
+        parser.add_argument("--json", action="store_true", help="Print JSON rows")
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options["hours"])
+        report = stage_latency_report(since)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        if not report:
+            self.stdout.write(f"No payout events since {since:%Y-%m-%d %H:%M}")
+            return
+
+        columns = [f"p{percent}" for percent in REPORT_PERCENTILES] + ["max"]
+        self.stdout.write(
+            f"{'stage':<26} {'count':>8} " + " ".join(f"{c:>10}" for c in columns)
+        )
+        for stage in report:
+            name = f"{stage['from_status'] or '-'} -> {stage['to_status'] or '-'}"
+            self.stdout.write(
+                f"{name:<26} {stage['count']:>8} "
+                + " ".join(f"{stage[c]:>9.2f}s" for c in columns)
+            )
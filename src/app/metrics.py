@@ -0,0 +1,150 @@
+"""Prometheus metrics for payouts, tasks and queues.
+
+Recording is an in-process counter update. With ``PROMETHEUS_MULTIPROC_DIR``
+set, which gunicorn workers and Celery prefork children need, every process
+writes to memory-mapped files in that directory and a scrape sums them up.
+"""
+
+import os
+
+from celery import current_app
+from celery.signals import task_retry
+from django.conf import settings
+from django.utils import timezone
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from src.app.models import OutboxMessage, StatusChoices
+from src.app.outbox import dead_messages
+from src.app.routing import payout_queues
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 7.5, 10, 15, 30, 60)
+STATUS_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 4 * 3600, 86400)
+
+payouts_created = Counter("payouts_created", "Payouts created", ["currency"])
+payouts_submitted = Counter(
+    "payouts_submitted", "Payouts moved to processing", ["currency"]
+)
+payouts_settled = Counter(
+    "payouts_settled", "Payouts that reached a final status", ["status", "currency"]
+)
+payout_status_age = Histogram(
+    "payout_status_age_seconds",
+    "Time from payout creation to entering a status",
+    ["status"],
+    buckets=STATUS_BUCKETS,
+)
+gateway_latency = Histogram(
+    "payout_gateway_latency_seconds",
+    "Payment gateway answer time",
+    buckets=LATENCY_BUCKETS,
+)
+gateway_errors = Counter("payout_gateway_errors", "Failed payment gateway calls")
+task_retries = Counter("payout_task_retries", "Payout task retries", ["task"])
+stalled_payouts = Counter(
+    "payouts_stalled", "Stalled payouts found and resubmitted by the sanity scan"
+)
+
+
+def record_transitions(transitions):
+    now = timezone.now()
+    for transition in transitions:
+        if transition.new_status is None:
+            continue
+        if transition.old_status is None:
+            payouts_created.labels(transition.currency).inc()
+        if transition.new_status == transition.old_status:
+            continue
+        if transition.new_status == StatusChoices.PROCESSING:
+            payouts_submitted.labels(transition.currency).inc()
+        elif transition.new_status in (StatusChoices.PAID, StatusChoices.CANCELLED):
+            payouts_settled.labels(transition.new_status, transition.currency).inc()
+        else:
+            continue
+        payout_status_age.labels(transition.new_status).observe(
+            (now - transition.created_at).total_seconds()
+        )
+
+
+def record_gateway_results(results):
+    for result in results:
+        if isinstance(result, Exception):
+            gateway_errors.inc()
+        else:
+            gateway_latency.observe(result.latency)
+
+
+@task_retry.connect
+def count_task_retry(sender, **kwargs):
+    task_retries.labels(sender.name).inc()
+
+
+class QueueDepthCollector:
+    """Broker queue and outbox backlog, read at scrape time."""
+
+    def collect(self):
+        queues = GaugeMetricFamily(
+            "payout_queue_depth", "Messages waiting in a broker queue", labels=["queue"]
+        )
+        names = settings.PAYOUT_METRICS_QUEUES
+        if names is None:
+            names = [current_app.conf.task_default_queue, *payout_queues()]
+        with current_app.connection_for_read() as conn:
+            for queue in names:
+                try:
+                    _, depth, _ = conn.default_channel.queue_declare(
+                        queue=queue, passive=True
+                    )
+                except conn.channel_errors:
+                    # Redis drops the key of an empty list.
+                    depth = 0
+                queues.add_metric([queue], depth)
+        yield queues
+
+        yield GaugeMetricFamily(
+            "payout_outbox_pending",
+            "Outbox messages not yet published",
+            value=OutboxMessage.objects.filter(sent_at__isnull=True).count(),
+        )
+        yield GaugeMetricFamily(
+            "payout_outbox_dead",
+            "Outbox messages set aside after PAYOUT_OUTBOX_MAX_ATTEMPTS failures",
+            value=dead_messages().count(),
+        )
+
+
+queue_registry = CollectorRegistry(auto_describe=False)
+queue_registry.register(QueueDepthCollector())
+
+
+def get_registry():
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics(queue_depth=True):
+    output = generate_latest(get_registry())
+    if queue_depth:
+        output += generate_latest(queue_registry)
+    return output
+
+
+def serve_worker_metrics(port):
+    """Expose the metrics of all prefork children from the worker process."""
+    start_http_server(port, registry=get_registry())
+
+
+def mark_process_dead(pid):
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,20 @@
+# Generated by Django 6.1.2 on 2026-10-18 10:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app", "0002_outboxmessage"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payout",
+            index=models.Index(
+                condition=models.Q(("status", "processing")),
+                fields=["updated_at", "id"],
+                name="payout_processing_updated_idx",
+            ),
+        ),
+    ]
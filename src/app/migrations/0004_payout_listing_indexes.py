@@ -0,0 +1,30 @@
+# Generated by Django 6.1.2 on 2026-10-18 10:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app", "0003_payout_processing_updated_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payout",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="payout_created_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payout",
+            index=models.Index(
+                fields=["status", "-created_at"], name="payout_status_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payout",
+            index=models.Index(
+                fields=["currency", "-created_at"], name="payout_currency_created_idx"
+            ),
+        ),
+    ]
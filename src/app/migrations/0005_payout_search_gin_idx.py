@@ -0,0 +1,38 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models.fields.json import KeyTextTransform
+
+# A copy of the search expression as of this migration, not an import of
+# src.app.search: later changes there must come with a migration of their own.
+INDEX = GinIndex(
+    SearchVector(
+        "comment",
+        KeyTextTransform("recipient_name", "details"),
+        KeyTextTransform("method", "details"),
+        config="simple",
+    ),
+    name="payout_search_gin_idx",
+)
+
+
+def add_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.add_index(apps.get_model("app", "Payout"), INDEX)
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.remove_index(apps.get_model("app", "Payout"), INDEX)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app", "0004_payout_listing_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 6.1.2 on 2026-10-18 11:04
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_stats(apps, schema_editor):
+    Payout = apps.get_model("app", "Payout")
+    PayoutDailyStat = apps.get_model("app", "PayoutDailyStat")
+    rows = (
+        Payout.objects.annotate(day=TruncDate("created_at"))
+        .values("status", "currency", "day")
+        .annotate(count=Count("id"), amount=Sum("payment_amount"))
+    )
+    PayoutDailyStat.objects.bulk_create(
+        [PayoutDailyStat(**row) for row in rows], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app", "0005_payout_search_gin_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PayoutDailyStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("created", "Created"),
+                            ("processing", "In processing"),
+                            ("paid", "Paid"),
+                            ("cancelled", "Cancelled"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "currency",
+                    models.CharField(
+                        choices=[
+                            ("RUB", "Russian ruble"),
+                            ("USD", "US dollar"),
+                            ("EUR", "Euro"),
+                        ],
+                        max_length=3,
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("count", models.BigIntegerField(default=0)),
+                (
+                    "amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("day", "status", "currency"),
+                        name="payout_stat_bucket_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 6.1.2 on 2026-10-18 11:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app", "0006_payoutdailystat"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PayoutArchive",
+            fields=[
+                ("id", models.UUIDField(primary_key=True, serialize=False)),
+                (
+                    "payment_amount",
+                    models.DecimalField(decimal_places=2, max_digits=10),
+                ),
+                (
+                    "currency",
+                    models.CharField(
+                        choices=[
+                            ("RUB", "Russian ruble"),
+                            ("USD", "US dollar"),
+                            ("EUR", "Euro"),
+                        ],
+                        max_length=3,
+                    ),
+                ),
+                ("details", models.JSONField(blank=True, null=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("created", "Created"),
+                            ("processing", "In processing"),
+                            ("paid", "Paid"),
+                            ("cancelled", "Cancelled"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                ("comment", models.TextField(blank=True, null=True)),
+                (
+                    "archived_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+        ),
+    ]
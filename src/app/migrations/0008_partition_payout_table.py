@@ -0,0 +1,100 @@
+from datetime import date
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models.fields.json import KeyTextTransform
+
+TABLE = "app_payout"
+
+# A copy of the search expression as of this migration, not an import of
+# src.app.search: later changes there must come with a migration of their own.
+SEARCH_INDEX = GinIndex(
+    SearchVector(
+        "comment",
+        KeyTextTransform("recipient_name", "details"),
+        KeyTextTransform("method", "details"),
+        config="simple",
+    ),
+    name="payout_search_gin_idx",
+)
+
+
+def add_months(month, months):
+    index = month.month - 1 + months
+    return date(month.year + index // 12, index % 12 + 1, 1)
+
+
+def rebuild_table(apps, schema_editor, partitioned):
+    """Copy app_payout into a new table, range-partitioned by month or plain."""
+    quote = schema_editor.quote_name
+    old_table = f"{TABLE}_old"
+
+    schema_editor.execute(f"ALTER TABLE {quote(TABLE)} RENAME TO {quote(old_table)}")
+    if partitioned:
+        schema_editor.execute(
+            f"CREATE TABLE {quote(TABLE)} (LIKE {quote(old_table)} INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE (created_at)"
+        )
+        schema_editor.execute(
+            f"CREATE TABLE {quote(TABLE + '_default')} PARTITION OF {quote(TABLE)} DEFAULT"
+        )
+
+        # Only the months the existing rows span, so the outcome depends on
+        # the data and not on the day the migration runs. Later months are
+        # created by manage_payout_partitions, which also moves rows that
+        # landed in the default partition in the meantime.
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT min(created_at), max(created_at) FROM {quote(old_table)}"
+            )
+            first_created_at, last_created_at = cursor.fetchone()
+        month = first_created_at.date().replace(day=1) if first_created_at else None
+        while month and month <= last_created_at.date():
+            next_month = add_months(month, 1)
+            schema_editor.execute(
+                f"CREATE TABLE {quote(f'{TABLE}_p{month:%Y%m}')} "
+                f"PARTITION OF {quote(TABLE)} "
+                f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+                f"TO ('{next_month.isoformat()} 00:00:00+00')"
+            )
+            month = next_month
+    else:
+        schema_editor.execute(
+            f"CREATE TABLE {quote(TABLE)} (LIKE {quote(old_table)} INCLUDING DEFAULTS)"
+        )
+
+    schema_editor.execute(
+        f"INSERT INTO {quote(TABLE)} SELECT * FROM {quote(old_table)}"
+    )
+    schema_editor.execute(f"DROP TABLE {quote(old_table)} CASCADE")
+
+    # A primary key of a partitioned table has to contain the partition key,
+    # so the database only enforces a unique (id, created_at). Payout ids are
+    # uuid4 values generated by the server, never taken from the client, which
+    # is what keeps them unique across partitions.
+    primary_key = "id, created_at" if partitioned else "id"
+    schema_editor.execute(f"ALTER TABLE {quote(TABLE)} ADD PRIMARY KEY ({primary_key})")
+    Payout = apps.get_model("app", "Payout")
+    for index in [*Payout._meta.indexes, SEARCH_INDEX]:
+        schema_editor.add_index(Payout, index)
+
+
+def partition_payouts(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        rebuild_table(apps, schema_editor, partitioned=True)
+
+
+def unpartition_payouts(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        rebuild_table(apps, schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app", "0007_payoutarchive"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_payouts, unpartition_payouts),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 6.1.2 on 2026-10-18 11:34
+
+import django.utils.timezone
+from django.contrib.postgres.indexes import BrinIndex
+from django.db import migrations, models
+
+TABLE = "app_payoutevent"
+
+# Events are appended in time order, so a block range index serves time-range
+# scans at a fraction of a B-tree's size.
+CREATED_AT_INDEX = BrinIndex(fields=["created_at"], name="payout_event_created_brin")
+
+
+def partition_events(apps, schema_editor):
+    """Recreate the empty event table range-partitioned by month on PostgreSQL."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    quote = schema_editor.quote_name
+    old_table = f"{TABLE}_old"
+    sequence = f"{TABLE}_id_seq"
+
+    schema_editor.execute(f"ALTER TABLE {quote(TABLE)} RENAME TO {quote(old_table)}")
+    schema_editor.execute(
+        f"CREATE TABLE {quote(TABLE)} (LIKE {quote(old_table)} INCLUDING DEFAULTS) "
+        f"PARTITION BY RANGE (created_at)"
+    )
+    schema_editor.execute(f"DROP TABLE {quote(old_table)} CASCADE")
+    # Identity columns are not copied by LIKE, so ids come from a sequence.
+    schema_editor.execute(
+        f"CREATE SEQUENCE {quote(sequence)} OWNED BY {quote(TABLE)}.{quote('id')}"
+    )
+    schema_editor.execute(
+        f"ALTER TABLE {quote(TABLE)} ALTER COLUMN {quote('id')} "
+        f"SET DEFAULT nextval('{sequence}')"
+    )
+
+    # The table is empty, so monthly partitions are left to
+    # manage_payout_partitions; until it runs, events land in the default one.
+    schema_editor.execute(
+        f"CREATE TABLE {quote(TABLE + '_default')} PARTITION OF {quote(TABLE)} DEFAULT"
+    )
+
+    # A primary key of a partitioned table has to contain the partition key.
+    schema_editor.execute(
+        f"ALTER TABLE {quote(TABLE)} ADD PRIMARY KEY (id, created_at)"
+    )
+    PayoutEvent = apps.get_model("app", "PayoutEvent")
+    for index in [*PayoutEvent._meta.indexes, CREATED_AT_INDEX]:
+        schema_editor.add_index(PayoutEvent, index)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app", "0009_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PayoutEvent",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("payout_id", models.UUIDField()),
+                (
+                    "from_status",
+                    models.CharField(
+                        choices=[
+                            ("created", "Created"),
+                            ("processing", "In processing"),
+                            ("paid", "Paid"),
+                            ("cancelled", "Cancelled"),
+                        ],
+                        max_length=20,
+                        null=True,
+                    ),
+                ),
+                (
+                    "to_status",
+                    models.CharField(
+                        choices=[
+                            ("created", "Created"),
+                            ("processing", "In processing"),
+                            ("paid", "Paid"),
+                            ("cancelled", "Cancelled"),
+                        ],
+                        max_length=20,
+                        null=True,
+                    ),
+                ),
+                ("task_id", models.CharField(max_length=255, null=True)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("latency", models.DurationField(null=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["payout_id", "created_at"],
+                        name="payout_event_payout_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(partition_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.1.2 on 2026-10-18 11:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("app", "0010_payoutevent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outboxmessage",
+            name="next_attempt_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,5 +1,6 @@
 import uuid
 
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 
@@ -18,6 +19,8 @@ class StatusChoices(models.TextChoices):
 
 
 class Payout(models.Model):
+    # On PostgreSQL the table is partitioned by created_at and the database
+    # only enforces a unique (id, created_at); see migration 0008.
     id = models.UUIDField(primary_key=True, default=uuid.uuid4)
     payment_amount = models.DecimalField(max_digits=10, decimal_places=2, null=False)
     currency = models.CharField(
@@ -34,3 +37,125 @@ class Payout(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     comment = models.TextField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["updated_at", "id"],
+                condition=models.Q(status="processing"),
+                name="payout_processing_updated_idx",
+            ),
+            models.Index(fields=["-created_at", "-id"], name="payout_created_id_idx"),
+            models.Index(
+                fields=["status", "-created_at"], name="payout_status_created_idx"
+            ),
+            models.Index(
+                fields=["currency", "-created_at"], name="payout_currency_created_idx"
+            ),
+        ]
+
+
+class OutboxMessage(models.Model):
+    """Celery task waiting to be published by the outbox relay.
+
+    Rows are written in the same transaction as the state change that
+    requires the task, so a task is published if and only if that change
+    is committed. A message that keeps failing to publish is retried with
+    backoff and set aside after ``PAYOUT_OUTBOX_MAX_ATTEMPTS``.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    task_name = models.CharField(max_length=255)
+    args = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    options = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=models.Q(sent_at__isnull=True),
+                name="outbox_unsent_idx",
+            ),
+        ]
+
+
+class PayoutDailyStat(models.Model):
+    """Number and total amount of payouts per status, currency and creation day.
+
+    Maintained incrementally on every status transition and repaired by the
+    periodic reconcile task.
+    """
+
+    status = models.CharField(max_length=20, choices=StatusChoices.choices)
+    currency = models.CharField(max_length=3, choices=CurrencyChoices.choices)
+    day = models.DateField()
+    count = models.BigIntegerField(default=0)
+    amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "status", "currency"], name="payout_stat_bucket_uniq"
+            ),
+        ]
+
+
+class PayoutArchive(models.Model):
+    """Cold storage for settled payouts moved out of the partitioned table."""
+
+    id = models.UUIDField(primary_key=True)
+    payment_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, choices=CurrencyChoices.choices)
+    details = models.JSONField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=StatusChoices.choices)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    comment = models.TextField(blank=True, null=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+
+class IdempotencyKey(models.Model):
+    """Response of a mutating request, stored under the client's key.
+
+    The unique key is the source of truth; the shared cache only keeps a copy
+    so that retries are answered without a database round trip.
+    """
+
+    key = models.CharField(max_length=255, unique=True)
+    fingerprint = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField()
+    response_data = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+
+class PayoutEvent(models.Model):
+    """Append-only log of payout status transitions.
+
+    ``latency`` is the time since the previous event of the same payout, so
+    the time spent in each stage can be aggregated over a time range without
+    touching the Payout table. On PostgreSQL the table is range-partitioned
+    by month on ``created_at``.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    payout_id = models.UUIDField()
+    from_status = models.CharField(
+        max_length=20, choices=StatusChoices.choices, null=True
+    )
+    to_status = models.CharField(
+        max_length=20, choices=StatusChoices.choices, null=True
+    )
+    task_id = models.CharField(max_length=255, null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    latency = models.DurationField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["payout_id", "created_at"], name="payout_event_payout_idx"
+            ),
+        ]
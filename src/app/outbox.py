@@ -0,0 +1,152 @@
+import logging
+from datetime import timedelta
+
+from celery import current_app
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from src.app.models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+# Tasks whose only argument is a list of payout IDs.
+MERGEABLE_TASKS = {"payouts.process_payout_batch"}
+
+
+def enqueue_task(task, args, **options):
+    """Record ``task`` for publishing once the current transaction commits."""
+    return OutboxMessage.objects.create(
+        task_name=task.name, args=list(args), options=options
+    )
+
+
+def merge_batches(messages):
+    """Group pending messages into publishes, in outbox order.
+
+    Payout batches bound for the same queue are merged into one task of up
+    to ``PAYOUT_BATCH_MAX_SIZE`` payouts, published under the task ID of
+    the first of them. Returns ``(task_name, args, options, messages)``
+    tuples, ``messages`` being the rows each publish covers.
+    """
+    publishes = []
+    open_batches = {}
+    for message in messages:
+        mergeable = message.task_name in MERGEABLE_TASKS and set(message.options) <= {
+            "queue",
+            "task_id",
+        }
+        if not mergeable:
+            publishes.append(
+                (message.task_name, message.args, message.options, [message])
+            )
+            continue
+
+        payout_ids = message.args[0]
+        queue = message.options.get("queue")
+        batch = open_batches.get(queue)
+        if (
+            batch is None
+            or len(batch[1][0]) + len(payout_ids) > settings.PAYOUT_BATCH_MAX_SIZE
+        ):
+            batch = (message.task_name, [list(payout_ids)], message.options, [])
+            open_batches[queue] = batch
+            publishes.append(batch)
+        else:
+            batch[1][0].extend(payout_ids)
+        batch[3].append(message)
+    return publishes
+
+
+def pending_messages():
+    """Unsent messages that are due and have not used up their attempts."""
+    return OutboxMessage.objects.filter(
+        Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=timezone.now()),
+        sent_at__isnull=True,
+        attempts__lt=settings.PAYOUT_OUTBOX_MAX_ATTEMPTS,
+    )
+
+
+def dead_messages():
+    """Unsent messages the relay gave up on."""
+    return OutboxMessage.objects.filter(
+        sent_at__isnull=True, attempts__gte=settings.PAYOUT_OUTBOX_MAX_ATTEMPTS
+    )
+
+
+def requeue_dead_messages():
+    """Give set-aside messages a fresh round of attempts."""
+    return dead_messages().update(attempts=0, next_attempt_at=None)
+
+
+def record_failure(message, now):
+    message.attempts += 1
+    backoff = min(2**message.attempts, settings.PAYOUT_OUTBOX_MAX_BACKOFF)
+    message.next_attempt_at = now + timedelta(seconds=backoff)
+    if message.attempts >= settings.PAYOUT_OUTBOX_MAX_ATTEMPTS:
+        logger.critical(
+            f"Outbox message {message.id} ({message.task_name}) set aside after "
+            f"{message.attempts} failed attempts"
+        )
+
+
+def relay_outbox(batch_size=None):
+    """Publish one batch of pending outbox messages.
+
+    Rows are locked with SKIP LOCKED, so several relays can drain the outbox
+    side by side without publishing the same message twice. All messages of
+    a batch go through one producer connection, and payout batches are
+    merged per queue (see ``merge_batches``). A message that fails to
+    publish is retried later with backoff while the rest of the batch goes
+    on; two failures in a row mean the broker is down and end the batch.
+    Returns the number of messages sent.
+    """
+    batch_size = batch_size or settings.PAYOUT_OUTBOX_BATCH_SIZE
+
+    with transaction.atomic():
+        messages = list(
+            pending_messages()
+            .select_for_update(skip_locked=True)
+            .order_by("id")[:batch_size]
+        )
+        if not messages:
+            return 0
+
+        sent = 0
+        failed_in_a_row = 0
+        with current_app.producer_or_acquire() as producer:
+            for task_name, args, options, covered in merge_batches(messages):
+                try:
+                    current_app.send_task(
+                        task_name, args=args, producer=producer, **options
+                    )
+                except Exception as e:
+                    logger.error(
+                        f"Failed to publish outbox message {covered[0].id}: {e}"
+                    )
+                    now = timezone.now()
+                    for message in covered:
+                        record_failure(message, now)
+                    failed_in_a_row += 1
+                    if failed_in_a_row == 2:
+                        break
+                    continue
+                failed_in_a_row = 0
+                sent_at = timezone.now()
+                for message in covered:
+                    message.sent_at = sent_at
+                sent += len(covered)
+
+        OutboxMessage.objects.bulk_update(
+            messages, ["sent_at", "attempts", "next_attempt_at"]
+        )
+
+    logger.info(f"Relayed {sent} outbox messages")
+    return sent
+
+
+def purge_sent_messages():
+    cutoff = timezone.now() - timedelta(seconds=settings.PAYOUT_OUTBOX_RETENTION)
+    deleted, _ = OutboxMessage.objects.filter(sent_at__lt=cutoff).delete()
+    return deleted
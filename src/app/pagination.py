@@ -0,0 +1,145 @@
+import base64
+import binascii
+import uuid
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PayoutPageNumberPagination(PageNumberPagination):
+    """Page-number pagination with an opt-in ``count=false`` flag.
+
+    Without the count, the page is fetched with one extra row to find out
+    whether a next page exists, and no ``COUNT(*)`` query is run.
+    """
+
+    count_query_param = "count"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.with_count = request.query_params.get(
+            self.count_query_param, ""
+        ).lower() not in ("false", "0")
+        if self.with_count:
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            self.page_number = 0
+        if self.page_number < 1:
+            raise NotFound(self.invalid_page_message.format(page_number="", message=""))
+
+        offset = (self.page_number - 1) * page_size
+        rows = list(queryset[offset : offset + page_size + 1])
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_paginated_response(self, data):
+        if self.with_count:
+            return super().get_paginated_response(data)
+
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_next_link(self):
+        if self.with_count:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.with_count:
+            return super().get_previous_link()
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+
+class PayoutCursorPagination(BasePagination):
+    """Keyset pagination on ``(created_at, id)``, newest first.
+
+    Every page is a single index range scan, so deep pages cost the same as
+    the first one. Any ``ordering`` parameter is ignored in this mode.
+    """
+
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        page = self.get_page_queryset(queryset, request)
+        return self.set_page([row async for row in page])
+
+    def get_page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = api_settings.PAGE_SIZE
+
+        queryset = queryset.order_by("-created_at", "-id")
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            created_at, payout_id = cursor
+            # Bounding created_at on its own lets the planner range-scan the
+            # (created_at, id) index; the exclusion only drops same-timestamp ties.
+            queryset = queryset.filter(created_at__lte=created_at).exclude(
+                Q(created_at=created_at, id__gte=payout_id)
+            )
+
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(last.created_at, last.id),
+        )
+
+    def encode_cursor(self, created_at, payout_id):
+        position = f"{created_at.isoformat()}|{payout_id}"
+        return base64.urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            position = base64.urlsafe_b64decode(encoded.encode()).decode()
+            created_at, payout_id = position.split("|")
+            created_at = parse_datetime(created_at)
+            payout_id = uuid.UUID(payout_id)
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+
+        return created_at, payout_id
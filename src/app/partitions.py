@@ -0,0 +1,170 @@
+import logging
+from datetime import UTC, date, datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from src.app.models import Payout, PayoutArchive, PayoutEvent, StatusChoices
+from src.app.signals import notify_changed
+
+logger = logging.getLogger(__name__)
+
+SETTLED_STATUSES = [StatusChoices.PAID, StatusChoices.CANCELLED]
+ARCHIVED_FIELDS = [
+    field.name for field in PayoutArchive._meta.fields if field.name != "archived_at"
+]
+
+
+def add_months(month, months):
+    index = month.month - 1 + months
+    return date(month.year + index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month, table=Payout._meta.db_table):
+    return f"{table}_p{month:%Y%m}"
+
+
+def month_start(month):
+    return datetime(month.year, month.month, 1, tzinfo=UTC)
+
+
+def is_partitioned(table=Payout._meta.db_table):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def monthly_partitions(table=Payout._meta.db_table):
+    """Names of the monthly partitions of ``table``, the Payout table by default."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = %s ORDER BY child.relname",
+            [table],
+        )
+        prefix = f"{table}_p"
+        return [name for (name,) in cursor.fetchall() if name.startswith(prefix)]
+
+
+def create_partition(month, table=Payout._meta.db_table):
+    """Create the partition of ``month``, taking over its rows from the default.
+
+    Postgres refuses to add a partition while the default partition holds
+    rows in its range, so those rows are moved into a standalone table that
+    is then attached in their place, all in one transaction.
+    """
+    quote = connection.ops.quote_name
+    name = partition_name(month, table)
+    default = f"{table}_default"
+    bounds = [month_start(month), month_start(add_months(month, 1))]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {quote(default)} "
+            f"WHERE created_at >= %s AND created_at < %s)",
+            bounds,
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute(
+                f"CREATE TABLE {quote(name)} PARTITION OF "
+                f"{quote(table)} FOR VALUES FROM (%s) TO (%s)",
+                bounds,
+            )
+            return
+
+        cursor.execute(
+            f"CREATE TABLE {quote(name)} "
+            f"(LIKE {quote(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {quote(default)} "
+            f"WHERE created_at >= %s AND created_at < %s RETURNING *) "
+            f"INSERT INTO {quote(name)} SELECT * FROM moved",
+            bounds,
+        )
+        cursor.execute(
+            f"ALTER TABLE {quote(table)} ATTACH PARTITION {quote(name)} "
+            f"FOR VALUES FROM (%s) TO (%s)",
+            bounds,
+        )
+    logger.info("Moved rows of %s out of %s", name, default)
+
+
+def create_partitions(months_ahead, table=Payout._meta.db_table):
+    """Create monthly partitions from the current month ``months_ahead`` ahead."""
+    existing = set(monthly_partitions(table))
+    created = []
+    month = timezone.now().date().replace(day=1)
+    for _ in range(months_ahead + 1):
+        name = partition_name(month, table)
+        if name not in existing:
+            create_partition(month, table)
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def archive_settled_payouts(before, batch_size=1000):
+    """Move PAID and CANCELLED payouts created before ``before`` to the archive."""
+    archived = 0
+    candidates = Payout.objects.filter(
+        status__in=SETTLED_STATUSES, created_at__lt=before
+    )
+    while payout_ids := list(candidates.values_list("id", flat=True)[:batch_size]):
+        with transaction.atomic():
+            rows = Payout.objects.filter(id__in=payout_ids)
+            PayoutArchive.objects.bulk_create(
+                [PayoutArchive(**values) for values in rows.values(*ARCHIVED_FIELDS)],
+                ignore_conflicts=True,
+            )
+            rows.delete()
+            notify_changed(payout_ids)
+        archived += len(payout_ids)
+    return archived
+
+
+def drop_empty_partitions(before):
+    """Detach and drop monthly partitions older than ``before`` with no rows left."""
+    quote = connection.ops.quote_name
+    cutoff = partition_name(before.date().replace(day=1))
+    dropped = []
+    for name in monthly_partitions():
+        if name >= cutoff:
+            continue
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {quote(name)})")
+            if cursor.fetchone()[0]:
+                continue
+            cursor.execute(
+                f"ALTER TABLE {quote(Payout._meta.db_table)} "
+                f"DETACH PARTITION {quote(name)}"
+            )
+            cursor.execute(f"DROP TABLE {quote(name)}")
+        dropped.append(name)
+    return dropped
+
+
+def drop_expired_partitions(before, table=PayoutEvent._meta.db_table):
+    """Detach and drop monthly partitions older than ``before``, rows and all.
+
+    Meant for log tables such as the payout event log, where dropping a
+    month is the cheap way to enforce retention.
+    """
+    quote = connection.ops.quote_name
+    cutoff = partition_name(before.date().replace(day=1), table)
+    dropped = []
+    for name in monthly_partitions(table):
+        if name >= cutoff:
+            continue
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}")
+            cursor.execute(f"DROP TABLE {quote(name)}")
+        dropped.append(name)
+    return dropped
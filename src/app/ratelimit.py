@@ -0,0 +1,225 @@
+"""Adaptive rate limiting of gateway calls, shared by all workers.
+
+Every scope (a currency or a payout method, see ``PAYOUT_RATE_LIMIT_BY``)
+has a token bucket in Redis. A worker takes one token per payout before
+calling the gateway, at most a burst's worth per call. If the tokens will be
+refilled within ``PAYOUT_RATE_LIMIT_MAX_WAIT`` it sleeps until then; the
+payouts it could not take tokens for are retried later. After each call the refill rate is adapted (AIMD): it is cut
+when the gateway answers slowly or with errors and grows back step by step
+while it is healthy.
+"""
+
+import functools
+import random
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from src.app.events import get_redis
+from src.app.exceptions import GatewayRateLimitedError
+
+KEY_PREFIX = "payouts:ratelimit:"
+
+# KEYS: bucket. ARGV: tokens wanted, initial rate, burst, max wait.
+# Returns the seconds to wait for the reserved tokens, or minus the seconds
+# until they could be reserved if that is longer than the max wait.
+ACQUIRE_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated', 'rate')
+local wanted = tonumber(ARGV[1])
+local rate = tonumber(state[3]) or tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - updated) * rate)
+local wait = 0
+if tokens < wanted then
+    wait = (wanted - tokens) / rate
+end
+if wait > tonumber(ARGV[4]) then
+    wait = -wait
+else
+    tokens = tokens - wanted
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now, 'rate', rate)
+redis.call('EXPIRE', KEYS[1], 86400)
+return tostring(wait)
+"""
+
+# KEYS: bucket. ARGV: overloaded flag, initial, min and max rate, increase
+# step, decrease factor. Returns the new rate.
+ADAPT_SCRIPT = """
+local rate = tonumber(redis.call('HGET', KEYS[1], 'rate')) or tonumber(ARGV[2])
+if ARGV[1] == '1' then
+    rate = math.max(tonumber(ARGV[3]), rate * tonumber(ARGV[6]))
+else
+    rate = math.min(tonumber(ARGV[4]), rate + tonumber(ARGV[5]))
+end
+redis.call('HSET', KEYS[1], 'rate', rate)
+redis.call('EXPIRE', KEYS[1], 86400)
+return tostring(rate)
+"""
+
+
+class RedisRateStore:
+    def __init__(self):
+        client = get_redis()
+        self._acquire = client.register_script(ACQUIRE_SCRIPT)
+        self._adapt = client.register_script(ADAPT_SCRIPT)
+
+    def acquire(self, scope, tokens, config, max_wait):
+        return float(
+            self._acquire(
+                keys=[f"{KEY_PREFIX}{scope}"],
+                args=[tokens, config["rate"], config["burst"], max_wait],
+            )
+        )
+
+    def adapt(self, scope, overloaded, config):
+        return float(
+            self._adapt(
+                keys=[f"{KEY_PREFIX}{scope}"],
+                args=[
+                    int(overloaded),
+                    config["rate"],
+                    config["min_rate"],
+                    config["rate"],
+                    config["increase"],
+                    config["decrease"],
+                ],
+            )
+        )
+
+
+class LocalRateStore:
+    """In-process buckets with the same semantics, for tests and simulations."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, scope, tokens, config, max_wait):
+        with self._lock:
+            now = self.clock()
+            available, updated, rate = self._buckets.get(
+                scope, (config["burst"], now, config["rate"])
+            )
+            available = min(config["burst"], available + (now - updated) * rate)
+            wait = max(0.0, (tokens - available) / rate)
+            if wait > max_wait:
+                wait = -wait
+            else:
+                available -= tokens
+            self._buckets[scope] = (available, now, rate)
+            return wait
+
+    def adapt(self, scope, overloaded, config):
+        with self._lock:
+            now = self.clock()
+            available, updated, rate = self._buckets.get(
+                scope, (config["burst"], now, config["rate"])
+            )
+            if overloaded:
+                rate = max(config["min_rate"], rate * config["decrease"])
+            else:
+                rate = min(config["rate"], rate + config["increase"])
+            self._buckets[scope] = (available, updated, rate)
+            return rate
+
+
+class GatewayRateLimiter:
+    def __init__(self, store):
+        self.store = store
+
+    @staticmethod
+    def scope(payout):
+        if settings.PAYOUT_RATE_LIMIT_BY == "currency":
+            return payout.currency
+        if settings.PAYOUT_RATE_LIMIT_BY == "method":
+            return (payout.details or {}).get("method", "unknown")
+        return "all"
+
+    @staticmethod
+    def config(scope):
+        limits = settings.PAYOUT_RATE_LIMITS
+        return {**limits["default"], **limits.get(scope, {})}
+
+    def throttle(self, payouts):
+        """Block until the gateway may be called for ``payouts``, or some of them.
+
+        A scope gets at most its burst of tokens in one call, as more could
+        never be available at once. Payouts over the burst, and all payouts of
+        a scope whose tokens are more than ``PAYOUT_RATE_LIMIT_MAX_WAIT`` away,
+        are not sent: they are returned as ``{index: GatewayRateLimitedError}``
+        for the caller to retry later.
+        """
+        positions = defaultdict(list)
+        for index, payout in enumerate(payouts):
+            positions[self.scope(payout)].append(index)
+
+        deferred = {}
+        wait = 0.0
+        for scope, indexes in positions.items():
+            config = self.config(scope)
+            admitted = indexes[: max(1, int(config["burst"]))]
+            scope_wait = self.store.acquire(
+                scope, len(admitted), config, settings.PAYOUT_RATE_LIMIT_MAX_WAIT
+            )
+            if scope_wait < 0:
+                admitted, retry_after = [], -scope_wait
+            else:
+                wait = max(wait, scope_wait)
+                retry_after = (
+                    scope_wait + (len(indexes) - len(admitted)) / config["rate"]
+                )
+            for index in indexes[len(admitted) :]:
+                deferred[index] = GatewayRateLimitedError(scope, retry_after)
+        if wait:
+            time.sleep(wait)
+        return deferred
+
+    def observe(self, payouts, results):
+        """Adapt the rate of every scope to how the gateway answered."""
+        outcomes = defaultdict(list)
+        for payout, result in zip(payouts, results):
+            outcomes[self.scope(payout)].append(result)
+
+        for scope, scope_results in outcomes.items():
+            config = self.config(scope)
+            latencies = [
+                result.latency
+                for result in scope_results
+                if not isinstance(result, Exception)
+            ]
+            errors = len(scope_results) - len(latencies)
+            overloaded = errors / len(scope_results) > config["error_rate"] or (
+                latencies and sum(latencies) / len(latencies) > config["target_latency"]
+            )
+            self.store.adapt(scope, overloaded, config)
+
+
+@functools.cache
+def _get_rate_limiter(backend):
+    if backend == "redis":
+        return GatewayRateLimiter(RedisRateStore())
+    return GatewayRateLimiter(LocalRateStore())
+
+
+def get_rate_limiter():
+    """The process-wide limiter, or None when rate limiting is off."""
+    if settings.PAYOUT_RATE_LIMIT_BACKEND == "none":
+        return None
+    return _get_rate_limiter(settings.PAYOUT_RATE_LIMIT_BACKEND)
+
+
+def retry_delay(retries):
+    """Exponential backoff with full jitter for the ``retries``-th retry."""
+    ceiling = min(
+        settings.PAYOUT_RETRY_MAX_DELAY,
+        settings.PAYOUT_RETRY_BASE_DELAY * 2**retries,
+    )
+    return random.uniform(0, ceiling)
@@ -0,0 +1,37 @@
+from django.db import transaction
+from django.dispatch import receiver
+
+from src.app.cache import payout_cache
+from src.app.events import publish_status_changes
+from src.app.history import log_transitions
+from src.app.metrics import record_transitions
+from src.app.signals import payouts_changed, payouts_transitioned
+from src.app.stats import apply_transitions
+
+
+@receiver(payouts_changed)
+def invalidate_payout_cache(sender, payout_ids, **kwargs):
+    payout_ids = [payout_cache.normalize_id(payout_id) for payout_id in payout_ids]
+    transaction.on_commit(lambda: payout_cache.invalidate(payout_ids))
+
+
+@receiver(payouts_transitioned)
+def publish_payout_status(sender, transitions, **kwargs):
+    transaction.on_commit(lambda: publish_status_changes(transitions))
+
+
+@receiver(payouts_transitioned)
+def update_payout_stats(sender, transitions, **kwargs):
+    # Outside the business transaction: every submit and settle of the day
+    # shares one rollup row, which must not stay locked until its commit.
+    transaction.on_commit(lambda: apply_transitions(transitions))
+
+
+@receiver(payouts_transitioned)
+def record_payout_metrics(sender, transitions, **kwargs):
+    transaction.on_commit(lambda: record_transitions(transitions))
+
+
+@receiver(payouts_transitioned)
+def log_payout_events(sender, transitions, **kwargs):
+    log_transitions(transitions)
@@ -0,0 +1,59 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+# orjson prints large and small floats differently (1e16 vs 1e+16) and has no
+# big integers, so payloads containing them take the stdlib path.
+INT64_RANGE = range(-(2**63), 2**63)
+
+
+def orjson_compatible(data):
+    pending = [data]
+    while pending:
+        value = pending.pop()
+        kind = type(value)
+        if kind is str or value is None or kind is bool:
+            continue
+        if kind is int:
+            if value not in INT64_RANGE:
+                return False
+        elif isinstance(value, dict):
+            for key in value:
+                if type(key) is not str:
+                    return False
+            pending.extend(value.values())
+        elif isinstance(value, list):
+            pending.extend(value)
+        else:
+            return False
+    return True
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` that encodes with orjson when the output is the same.
+
+    Compact, non-indented output of plain JSON values is byte-identical to
+    DRF's renderer; anything else falls back to it.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+            or not orjson_compatible(data)
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data)
+        # Same escaping of the JavaScript line terminators as DRF.
+        if b"\xe2\x80" in ret:
+            ret = ret.replace("\u2028".encode(), b"\\u2028").replace(
+                "\u2029".encode(), b"\\u2029"
+            )
+        return ret
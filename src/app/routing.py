@@ -0,0 +1,56 @@
+"""Broker queue selection for payout tasks.
+
+Payouts marked urgent (``details["priority"] == "high"``) or above
+``PAYOUT_PRIORITY_MIN_AMOUNT`` go to the priority lane. The rest are spread
+over queues per currency or per amount tier, so a large bulk run only
+delays payouts that share its queue. Stalled-payout requeues get a queue of
+their own.
+"""
+
+from django.conf import settings
+
+from src.app.models import CurrencyChoices
+
+
+def amount_tier_queue(amount):
+    for limit in sorted(settings.PAYOUT_AMOUNT_TIERS):
+        if amount <= limit:
+            return f"{settings.PAYOUT_DEFAULT_QUEUE}.upto_{limit}"
+    return f"{settings.PAYOUT_DEFAULT_QUEUE}.above_{max(settings.PAYOUT_AMOUNT_TIERS)}"
+
+
+def is_priority(payout):
+    details = payout.details or {}
+    min_amount = settings.PAYOUT_PRIORITY_MIN_AMOUNT
+    return details.get("priority") == "high" or (
+        min_amount is not None and payout.payment_amount >= min_amount
+    )
+
+
+def payout_queue(payout):
+    if is_priority(payout):
+        return settings.PAYOUT_PRIORITY_QUEUE
+    if settings.PAYOUT_ROUTE_BY == "currency":
+        return f"{settings.PAYOUT_DEFAULT_QUEUE}.{payout.currency.lower()}"
+    if settings.PAYOUT_ROUTE_BY == "amount" and settings.PAYOUT_AMOUNT_TIERS:
+        return amount_tier_queue(payout.payment_amount)
+    return settings.PAYOUT_DEFAULT_QUEUE
+
+
+def payout_queues():
+    """Every queue that payout tasks can be routed to."""
+    queues = [
+        settings.PAYOUT_PRIORITY_QUEUE,
+        settings.PAYOUT_DEFAULT_QUEUE,
+        settings.PAYOUT_STALLED_QUEUE,
+    ]
+    if settings.PAYOUT_ROUTE_BY == "currency":
+        queues += [
+            f"{settings.PAYOUT_DEFAULT_QUEUE}.{currency.lower()}"
+            for currency in CurrencyChoices.values
+        ]
+    elif settings.PAYOUT_ROUTE_BY == "amount" and settings.PAYOUT_AMOUNT_TIERS:
+        tiers = sorted(settings.PAYOUT_AMOUNT_TIERS)
+        queues += [amount_tier_queue(limit) for limit in tiers]
+        queues.append(amount_tier_queue(tiers[-1] + 1))
+    return queues
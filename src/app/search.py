@@ -0,0 +1,39 @@
+"""Full-text search over payouts on PostgreSQL.
+
+Migrations 0005 and 0008 index a copy of the document expression, and
+PostgreSQL answers a search from ``payout_search_gin_idx`` only while the
+filter's expression matches it exactly. A change here needs a migration that
+rebuilds the index.
+"""
+
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db.models.fields.json import KeyTextTransform
+
+SEARCH_CONFIG = "simple"
+
+
+def payout_search_vector():
+    """Full-text document of a payout: comment, recipient name and method."""
+    return SearchVector(
+        "comment",
+        KeyTextTransform("recipient_name", "details"),
+        KeyTextTransform("method", "details"),
+        config=SEARCH_CONFIG,
+    )
+
+
+def prefix_tsquery(terms):
+    """``to_tsquery`` text matching documents with words that start with every term.
+
+    Each term is quoted, so tsquery operators in user input are plain text.
+    """
+    quoted = []
+    for term in terms:
+        escaped = term.replace("\\", "\\\\").replace("'", "''")
+        quoted.append(f"'{escaped}':*")
+    return " & ".join(quoted)
+
+
+def payout_search_query(terms):
+    """Prefix match, so "Ivan" still finds "Ivanov" as ``icontains`` did."""
+    return SearchQuery(prefix_tsquery(terms), config=SEARCH_CONFIG, search_type="raw")
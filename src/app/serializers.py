@@ -1,8 +1,10 @@
+from django.db import transaction
 from rest_framework import serializers
 
 from src.app.services import PayoutService
+from src.app.signals import PayoutTransition, notify_changed, notify_transitions
 
-from .models import Payout, StatusChoices
+from .models import Payout, PayoutDailyStat, PayoutEvent, StatusChoices
 
 
 class PayoutSerializer(serializers.ModelSerializer):
@@ -66,7 +68,14 @@ class PayoutUpdateSerializer(PayoutSerializer):
                 instance.refresh_from_db()
                 return instance
 
-        return super().update(instance, validated_data)
+        old_status = instance.status
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if instance.status != old_status:
+                notify_transitions([PayoutTransition.of(instance, old_status)])
+            else:
+                notify_changed([instance.id])
+        return instance
 
     def validate_status(self, value):
         instance_status = self.instance.status if self.instance else None
@@ -85,3 +94,26 @@ class PayoutUpdateSerializer(PayoutSerializer):
                 )
 
         return value
+
+
+class PayoutDailyStatSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PayoutDailyStat
+        fields = ["day", "status", "currency", "count", "amount"]
+
+
+class SecondsField(serializers.FloatField):
+    """A ``timedelta`` rendered as a number of seconds."""
+
+    def to_representation(self, value):
+        return value.total_seconds()
+
+
+class PayoutEventSerializer(serializers.ModelSerializer):
+    latency = SecondsField(
+        read_only=True, help_text="Seconds since the previous event of the payout"
+    )
+
+    class Meta:
+        model = PayoutEvent
+        fields = ["from_status", "to_status", "task_id", "created_at", "latency"]
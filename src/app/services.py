@@ -1,10 +1,17 @@
 import logging
+import uuid
+from collections import defaultdict
 
+from django.conf import settings
 from django.db import transaction
 
 from src.app.exceptions import InvalidStatusTransitionError
 from src.app.models import Payout, StatusChoices
-from src.app.tasks.payout_task import process_single_payout_task
+from src.app.outbox import enqueue_task
+from src.app.routing import payout_queue
+from src.app.signals import PayoutTransition, notify_transitions
+from src.app.tasks.batch_task import process_payout_batch_task
+from src.app.tasks.dispatcher import PayoutBatchDispatcher
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +20,7 @@ class PayoutService:
     @staticmethod
     def create_payout(data):
         payout = Payout.objects.create(**data, status=StatusChoices.CREATED)
+        notify_transitions([PayoutTransition.of(payout, None)])
         logger.info(f"Payout created {payout.id}. Status: {payout.status}")
         return payout
 
@@ -30,9 +38,59 @@ class PayoutService:
 
             payout.status = StatusChoices.PROCESSING
             payout.save()
+            task_id = str(uuid.uuid4())
+            notify_transitions(
+                [PayoutTransition.of(payout, StatusChoices.CREATED, task_id)]
+            )
+            # A batch of one: the outbox relay merges the pending batches of a
+            # queue, so submits share one gateway event loop on the worker.
+            enqueue_task(
+                process_payout_batch_task,
+                [[payout_id]],
+                queue=payout_queue(payout),
+                task_id=task_id,
+            )
             logger.info(f"{Payout} {payout_id} send on processing")
 
-        task = process_single_payout_task.delay(payout_id)
-        logger.info(f"Run Celery-task {task.id} for payout {payout_id}")
-
         return payout
+
+    @staticmethod
+    def create_and_submit_many(items):
+        """Create payouts straight in PROCESSING status and enqueue them.
+
+        Returns a ``(payouts, rejected)`` pair, where ``rejected`` holds
+        ``(position, message)`` tuples for items without recipient details.
+        """
+        payouts = []
+        rejected = []
+        for position, data in enumerate(items):
+            details = data.get("details")
+            if not details or "recipient_name" not in details:
+                rejected.append((position, "Fill in the recipient's details"))
+                continue
+            payouts.append(Payout(**data, status=StatusChoices.PROCESSING))
+
+        with transaction.atomic():
+            Payout.objects.bulk_create(
+                payouts, batch_size=settings.PAYOUT_BULK_INSERT_BATCH_SIZE
+            )
+            notify_transitions(
+                [PayoutTransition.of(payout, None) for payout in payouts]
+            )
+            PayoutService.publish_payouts(payouts)
+            logger.info(f"{len(payouts)} payouts created and send on processing")
+
+        return payouts, rejected
+
+    @staticmethod
+    def publish_payouts(payouts):
+        routes = defaultdict(list)
+        for payout in payouts:
+            routes[payout_queue(payout)].append(payout.id)
+
+        published = 0
+        for queue, payout_ids in routes.items():
+            with PayoutBatchDispatcher(queue=queue) as dispatcher:
+                dispatcher.extend(payout_ids)
+            published += dispatcher.published
+        logger.info(f"{published} payouts send to batch processing")
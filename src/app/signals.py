@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+
+from django.dispatch import Signal
+
+# Sent with ``payout_ids`` whenever payout rows are written.
+payouts_changed = Signal()
+
+# Sent with ``transitions``, a list of ``PayoutTransition``, whenever payouts
+# change status. Receivers run inside the writing transaction.
+payouts_transitioned = Signal()
+
+
+@dataclass(frozen=True)
+class PayoutTransition:
+    payout_id: object
+    old_status: str | None
+    new_status: str | None
+    currency: str
+    payment_amount: object
+    created_at: object
+    # Celery task that made the change, or will pick the payout up next.
+    task_id: str | None = None
+
+    @classmethod
+    def of(cls, payout, old_status, task_id=None):
+        return cls(
+            payout_id=payout.id,
+            old_status=old_status,
+            new_status=payout.status,
+            currency=payout.currency,
+            payment_amount=payout.payment_amount,
+            created_at=payout.created_at,
+            task_id=task_id,
+        )
+
+    @classmethod
+    def deleted(cls, payout):
+        return cls(
+            payout_id=payout.id,
+            old_status=payout.status,
+            new_status=None,
+            currency=payout.currency,
+            payment_amount=payout.payment_amount,
+            created_at=payout.created_at,
+        )
+
+
+def notify_transitions(transitions):
+    if not transitions:
+        return
+    payouts_transitioned.send(sender=PayoutTransition, transitions=transitions)
+    notify_changed([transition.payout_id for transition in transitions])
+
+
+def notify_changed(payout_ids):
+    if payout_ids:
+        payouts_changed.send(sender=PayoutTransition, payout_ids=list(payout_ids))
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from . import converters  # noqa: F401  registers <payout_id:...>
+from .streams import stream_payouts, wait_for_payout
+
+urlpatterns = [
+    path("payouts/stream/", stream_payouts, name="payout-stream"),
+    path("payouts/<payout_id:pk>/wait/", wait_for_payout, name="payout-wait"),
+]
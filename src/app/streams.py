@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from src.app.cache import payout_cache
+from src.app.events import fetch_statuses, subscribe
+from src.app.models import StatusChoices
+
+TERMINAL_STATUSES = {StatusChoices.PAID, StatusChoices.CANCELLED}
+NOT_FOUND = {"detail": "No Payout matches the given query."}
+
+
+@require_GET
+async def wait_for_payout(request, pk):
+    """Long-poll until the payout reaches one of the ``until`` statuses."""
+    payout_id = str(pk)
+    until = {value for value in request.GET.get("until", "").split(",") if value}
+    until = until or TERMINAL_STATUSES
+    if not until <= set(StatusChoices.values):
+        return JsonResponse({"until": ["Unknown status"]}, status=400)
+    try:
+        timeout = float(request.GET.get("timeout", settings.PAYOUT_WAIT_MAX_TIMEOUT))
+    except ValueError:
+        return JsonResponse({"timeout": ["A valid number is required."]}, status=400)
+    timeout = max(0.0, min(timeout, settings.PAYOUT_WAIT_MAX_TIMEOUT))
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    async with subscribe([payout_id]) as subscription:
+        # Read after subscribing, and from the database rather than the
+        # response cache: a change published in between is then either in
+        # this read or in the subscription.
+        status = (await fetch_statuses([payout_id])).get(payout_id)
+        while status is not None and status not in until:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            change = await subscription.get(remaining)
+            if change is None:
+                break
+            status = change[1]
+
+    if status is None:
+        return JsonResponse(NOT_FOUND, status=404)
+    return JsonResponse(
+        {"id": payout_id, "status": status, "timed_out": status not in until}
+    )
+
+
+def format_event(payout_id, status):
+    data = json.dumps({"id": payout_id, "status": status})
+    return f"event: status\ndata: {data}\n\n"
+
+
+async def status_events(payout_ids):
+    async with subscribe(payout_ids) as subscription:
+        statuses = await fetch_statuses(payout_ids)
+        for payout_id in payout_ids:
+            yield format_event(payout_id, statuses.get(payout_id))
+
+        pending = {
+            payout_id
+            for payout_id in payout_ids
+            if statuses.get(payout_id) not in TERMINAL_STATUSES | {None}
+        }
+        while pending:
+            change = await subscription.get(settings.PAYOUT_STREAM_HEARTBEAT)
+            if change is None:
+                yield ": keepalive\n\n"
+                continue
+            payout_id, status = change
+            yield format_event(payout_id, status)
+            if status is None or status in TERMINAL_STATUSES:
+                pending.discard(payout_id)
+
+
+@require_GET
+async def stream_payouts(request):
+    """Server-sent events with status changes of the payouts in ``?ids=``."""
+    payout_ids = []
+    for value in request.GET.get("ids", "").split(","):
+        payout_id = payout_cache.normalize_id(value)
+        if payout_id is None:
+            return JsonResponse({"ids": [f"Invalid payout ID '{value}'"]}, status=400)
+        payout_ids.append(payout_id)
+    if len(payout_ids) > settings.PAYOUT_STREAM_MAX_IDS:
+        return JsonResponse(
+            {"ids": [f"No more than {settings.PAYOUT_STREAM_MAX_IDS} payouts"]},
+            status=400,
+        )
+
+    return StreamingHttpResponse(
+        status_events(list(dict.fromkeys(payout_ids))),
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
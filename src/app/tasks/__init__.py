@@ -1,7 +1,17 @@
+from .batch_task import process_payout_batch_task
+from .idempotency_task import purge_idempotency_keys_task
+from .outbox_task import relay_outbox_task
+from .partition_task import manage_partitions_task
 from .payout_task import process_single_payout_task
 from .sanity_task import check_stalled_payouts
+from .stats_task import reconcile_stats_task
 
 __all__ = [
     "process_single_payout_task",
+    "process_payout_batch_task",
     "check_stalled_payouts",
+    "relay_outbox_task",
+    "reconcile_stats_task",
+    "manage_partitions_task",
+    "purge_idempotency_keys_task",
 ]
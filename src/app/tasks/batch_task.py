@@ -0,0 +1,134 @@
+import logging
+
+from celery import shared_task
+from celery.exceptions import MaxRetriesExceededError
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from src.app.exceptions import GatewayRateLimitedError
+from src.app.gateway import call_gateway
+from src.app.models import Payout, StatusChoices
+from src.app.ratelimit import retry_delay
+from src.app.signals import PayoutTransition, notify_transitions
+from src.app.tasks.payout_task import settle_payout
+
+logger = logging.getLogger(__name__)
+
+
+def cancel_failed_payouts(task_id, payout_ids):
+    logger.critical(
+        f"[Task {task_id}] {len(payout_ids)} payouts failed after all attempts."
+    )
+    with transaction.atomic():
+        payouts = list(Payout.objects.select_for_update().filter(id__in=payout_ids))
+        transitions = []
+        now = timezone.now()
+        for payout in payouts:
+            old_status = payout.status
+            payout.status = StatusChoices.CANCELLED
+            payout.comment = "Celery processing error after all attempts"
+            payout.updated_at = now
+            transitions.append(PayoutTransition.of(payout, old_status, task_id))
+
+        Payout.objects.bulk_update(payouts, ["status", "comment", "updated_at"])
+        notify_transitions(transitions)
+
+
+@shared_task(
+    bind=True,
+    name="payouts.process_payout_batch",
+    max_retries=3,
+    default_retry_delay=60,
+    # Well under PAYOUT_STALLED_AFTER: a batch still running when the sanity
+    # check considers it stalled would be resubmitted and settled twice.
+    soft_time_limit=240,
+    time_limit=270,
+)
+def process_payout_batch_task(self, payout_ids, throttled=0):
+    """Settle a batch; ``throttled`` counts the rate-limited attempts so far."""
+    task_id = self.request.id
+    logger.info(f"[Task {task_id}] Start processing {len(payout_ids)} payouts")
+
+    settled = []
+    failed_ids = []
+    throttled_ids = []
+    retry_after = 0.0
+    try:
+        payouts = list(
+            Payout.objects.filter(id__in=payout_ids, status=StatusChoices.PROCESSING)
+        )
+        results = dict(zip([payout.id for payout in payouts], call_gateway(payouts)))
+
+        with transaction.atomic():
+            locked = Payout.objects.select_for_update(skip_locked=True).filter(
+                id__in=list(results), status=StatusChoices.PROCESSING
+            )
+            now = timezone.now()
+            for payout in locked:
+                result = results[payout.id]
+                if isinstance(result, GatewayRateLimitedError):
+                    throttled_ids.append(payout.id)
+                    retry_after = max(retry_after, result.retry_after)
+                    continue
+                if isinstance(result, Exception):
+                    logger.error(
+                        f"[Task {task_id}] Payment processing error {payout.id}: {result}"
+                    )
+                    failed_ids.append(payout.id)
+                    continue
+                settled.append(settle_payout(payout, result, task_id))
+                payout.updated_at = now
+
+            Payout.objects.bulk_update(settled, ["status", "comment", "updated_at"])
+            notify_transitions(
+                [
+                    PayoutTransition.of(payout, StatusChoices.PROCESSING, task_id)
+                    for payout in settled
+                ]
+            )
+
+        logger.info(
+            f"[Task {task_id}] {len(settled)} payouts were processed, "
+            f"{len(failed_ids)} failed, {len(throttled_ids)} rate limited"
+        )
+
+    except Exception as exc:
+        logger.error(f"[Task {task_id}] Batch processing error: {exc}")
+        settled = []
+        failed_ids = list(payout_ids)
+        throttled_ids = []
+
+    if throttled_ids and throttled >= settings.PAYOUT_RATE_LIMIT_MAX_RETRIES:
+        failed_ids += throttled_ids
+        throttled_ids = []
+
+    if failed_ids:
+        try:
+            # Rate-limited payouts ride along with the failure retry.
+            raise self.retry(
+                args=(failed_ids + throttled_ids,),
+                kwargs={"throttled": throttled},
+                countdown=retry_delay(self.request.retries - throttled),
+                max_retries=self.max_retries + throttled,
+            )
+        except MaxRetriesExceededError:
+            cancel_failed_payouts(task_id, failed_ids)
+            if not throttled_ids:
+                raise
+
+    if throttled_ids:
+        # Backpressure rather than a failure, see process_single_payout_task.
+        raise self.retry(
+            args=(throttled_ids,),
+            kwargs={"throttled": throttled + 1},
+            countdown=retry_after + retry_delay(0),
+            max_retries=self.request.retries + 1,
+        )
+
+    paid = sum(1 for payout in settled if payout.status == StatusChoices.PAID)
+    return {
+        "paid": paid,
+        "cancelled": len(settled) - paid,
+        "skipped": len(payout_ids) - len(settled),
+    }
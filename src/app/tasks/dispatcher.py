@@ -0,0 +1,60 @@
+import logging
+import time
+
+from django.conf import settings
+
+from src.app.outbox import enqueue_task
+from src.app.tasks.batch_task import process_payout_batch_task
+
+logger = logging.getLogger(__name__)
+
+
+class PayoutBatchDispatcher:
+    """Groups payout IDs into ``process_payout_batch`` outbox messages.
+
+    A batch is published once it holds ``max_size`` IDs or once its oldest ID
+    has waited ``max_wait`` seconds, whichever comes first. The age is checked
+    when IDs are added, so call ``flush()`` (or use the dispatcher as a context
+    manager) to publish the remainder. With ``queue`` set, batches are
+    routed to that broker queue.
+    """
+
+    def __init__(self, max_size=None, max_wait=None, queue=None):
+        self.queue = queue
+        self.max_size = max_size or settings.PAYOUT_BATCH_MAX_SIZE
+        self.max_wait = settings.PAYOUT_BATCH_MAX_WAIT if max_wait is None else max_wait
+        self.published = 0
+        self._pending = []
+        self._first_added_at = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+
+    def add(self, payout_id):
+        if not self._pending:
+            self._first_added_at = time.monotonic()
+        self._pending.append(payout_id)
+
+        if (
+            len(self._pending) >= self.max_size
+            or time.monotonic() - self._first_added_at >= self.max_wait
+        ):
+            self.flush()
+
+    def extend(self, payout_ids):
+        for payout_id in payout_ids:
+            self.add(payout_id)
+
+    def flush(self):
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        options = {"queue": self.queue} if self.queue else {}
+        enqueue_task(process_payout_batch_task, [batch], **options)
+        self.published += len(batch)
+        logger.info(f"Batch of {len(batch)} payouts added to the outbox")
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+
+@shared_task(name="payouts.purge_idempotency_keys", ignore_result=True)
+def purge_idempotency_keys_task():
+    # Imported here: the module builds DRF responses, which workers never need.
+    from src.app.idempotency import purge_idempotency_keys
+
+    return f"Purged {purge_idempotency_keys()} idempotency keys"
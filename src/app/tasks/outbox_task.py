@@ -0,0 +1,18 @@
+import logging
+
+from celery import shared_task
+
+from src.app.outbox import purge_sent_messages, relay_outbox
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name="payouts.relay_outbox", ignore_result=True)
+def relay_outbox_task():
+    relayed = 0
+    while sent := relay_outbox():
+        relayed += sent
+
+    purged = purge_sent_messages()
+    logger.info(f"Relayed {relayed} outbox messages, purged {purged} sent ones")
+    return f"Relayed {relayed} messages"
@@ -0,0 +1,8 @@
+from celery import shared_task
+from django.core.management import call_command
+
+
+@shared_task(name="payouts.manage_partitions", ignore_result=True)
+def manage_partitions_task():
+    call_command("manage_payout_partitions")
+    return "Payout partitions maintained"
@@ -1,85 +1,118 @@
 import logging
-import random
-import time
 
 from celery import shared_task
 from celery.exceptions import MaxRetriesExceededError
+from django.conf import settings
 from django.db import transaction
 
+from src.app.exceptions import GatewayRateLimitedError
+from src.app.gateway import call_gateway
 from src.app.models import Payout, StatusChoices
+from src.app.ratelimit import retry_delay
+from src.app.signals import PayoutTransition, notify_transitions
 
 logger = logging.getLogger(__name__)
 
 
+def settle_payout(payout, result, task_id):
+    if result.approved:
+        payout.status = StatusChoices.PAID
+        payout.comment = f"Processed by Celery Task ID:{task_id}"
+        logger.info(f"[Task {task_id}] Payoyt {payout.id} succesful")
+    else:
+        payout.status = StatusChoices.CANCELLED
+        payout.comment = f"Cancelled by payout system. Task ID:{task_id}"
+        logger.warning(f"[Task {task_id}] Payoyt {payout.id} was cancelled")
+
+    return payout
+
+
 @shared_task(
     bind=True,
     name="payouts.process_single_payout",
     max_retries=3,
     default_retry_delay=60,
-    soft_time_limit=300,
-    time_limit=330,
+    # Well under PAYOUT_STALLED_AFTER, see process_payout_batch_task.
+    soft_time_limit=240,
+    time_limit=270,
 )
-def process_single_payout_task(self, payout_id):
+def process_single_payout_task(self, payout_id, throttled=0):
+    """Settle one payout; ``throttled`` counts the rate-limited attempts so far."""
     task_id = self.request.id
     try:
         logger.info(f"[Task {task_id}] Start processing payout:{payout_id}")
-        delay_seconds = random.uniform(3, 10)
+        payout = Payout.objects.get(id=payout_id, status=StatusChoices.PROCESSING)
+
+        (result,) = call_gateway([payout])
+        if isinstance(result, Exception):
+            raise result
         logger.info(
-            f"[Task {task_id}] Simulation of processing ({delay_seconds:.1f} seconds)"
+            f"[Task {task_id}] Gateway answered in {result.latency:.1f} seconds"
         )
-        time.sleep(delay_seconds)
 
         with transaction.atomic():
             payout = Payout.objects.select_for_update().get(
                 id=payout_id, status=StatusChoices.PROCESSING
             )
-
-            is_approved = random.random() < 0.8
-
-            if is_approved:
-                payout.status = StatusChoices.PAID
-                payout.comment = f"Processed by Celery Task ID:{task_id}"
-                result = "approved"
-                logger.info(f"[Task {task_id}] Payoyt {payout_id} succesful")
-            else:
-                payout.status = StatusChoices.CANCELLED
-                payout.comment = f"Cancelled by payout system. Task ID:{task_id}"
-                result = "cancelled"
-                logger.warning(f"[Task {task_id}] Payoyt {payout_id} was cancelled")
-
+            settle_payout(payout, result, task_id)
             payout.save()
+            notify_transitions(
+                [PayoutTransition.of(payout, StatusChoices.PROCESSING, task_id)]
+            )
 
             logger.info(
                 f"[Task {task_id}] Payout {payout_id} was processed: new status -> {payout.status}"
             )
 
+            # The task and payout IDs are already part of the stored meta.
             return {
-                "task_id": task_id,
-                "payout_id": str(payout_id),
-                "status": result,
                 "new_status": payout.status,
-                "processing_time": delay_seconds,
+                "processing_time": round(result.latency, 3),
             }
 
     except Payout.DoesNotExist:
         error_msg = f"Payout {payout_id} not found or not in PROCESSING status"
         logger.error(f"[Task {task_id}] {error_msg}")
         raise
+    except GatewayRateLimitedError as exc:
+        logger.warning(f"[Task {task_id}] {exc}")
+        if throttled < settings.PAYOUT_RATE_LIMIT_MAX_RETRIES:
+            # Backpressure rather than a failure: counted apart from the
+            # failures max_retries limits, up to a limit of its own.
+            raise self.retry(
+                kwargs={"throttled": throttled + 1},
+                exc=exc,
+                countdown=exc.retry_after + retry_delay(0),
+                max_retries=self.request.retries + 1,
+            )
+        retry_or_cancel(self, payout_id, throttled)
     except Exception as exc:
         logger.error(f"[Task {task_id}] Payment processing error {payout_id}: {exc}")
+        retry_or_cancel(self, payout_id, throttled)
+
+
+def retry_or_cancel(task, payout_id, throttled):
+    """Retry a failed attempt, or cancel the payout once the retries run out."""
+    task_id = task.request.id
+    try:
+        # Without exc, so that Celery raises MaxRetriesExceededError rather
+        # than exc once the retries run out.
+        task.retry(
+            countdown=retry_delay(task.request.retries - throttled),
+            max_retries=task.max_retries + throttled,
+        )
+    except MaxRetriesExceededError:
+        logger.critical(f"[Task {task_id}] The task failed after all attempts.")
 
-        try:
-            self.retry(exc=exc, countdown=60)
-        except MaxRetriesExceededError:
-            logger.critical(f"[Task {task_id}] The task failed after all attempts.")
-
-            with transaction.atomic():
-                try:
-                    payout = Payout.objects.get(id=payout_id)
-                    payout.status = StatusChoices.CANCELLED
-                    payout.comment = "Celery processing error after all attempts"
-                    payout.save()
-                except Exception as e:
-                    logger.error(f"Change payout status error: {e}")
-
-            raise
+        with transaction.atomic():
+            try:
+                payout = Payout.objects.get(id=payout_id)
+                old_status = payout.status
+                payout.status = StatusChoices.CANCELLED
+                payout.comment = "Celery processing error after all attempts"
+                payout.save()
+                notify_transitions([PayoutTransition.of(payout, old_status, task_id)])
+            except Exception as e:
+                logger.error(f"Change payout status error: {e}")
+
+        raise
@@ -1,40 +1,161 @@
 import logging
+import uuid
 from datetime import timedelta
 
 from celery import shared_task
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
 from django.utils import timezone
 
-from src.app.models import Payout, StatusChoices
-from src.app.tasks.payout_task import process_single_payout_task
+from src.app.history import append_events
+from src.app.metrics import stalled_payouts
+from src.app.models import Payout, PayoutEvent, StatusChoices
+from src.app.outbox import enqueue_task
+from src.app.signals import PayoutTransition, notify_changed, notify_transitions
+from src.app.tasks.batch_task import process_payout_batch_task
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task
-def check_stalled_payouts():
-    ten_minutes = timezone.now() - timedelta(minutes=10)
+def iter_stalled_payout_ids(cutoff, chunk_size):
+    """Yield IDs of stalled payouts page by page, oldest first.
 
-    stalled_payouts = Payout.objects.filter(
-        status=StatusChoices.PROCESSING, updated_at__lt=ten_minutes
+    Pages are fetched by keyset on ``(updated_at, id)``, which is served by the
+    partial ``payout_processing_updated_idx`` index.
+    """
+    candidates = (
+        Payout.objects.filter(status=StatusChoices.PROCESSING, updated_at__lt=cutoff)
+        .order_by("updated_at", "id")
+        .values_list("updated_at", "id")
     )
+    last = None
+    while True:
+        page = candidates
+        if last is not None:
+            page = page.filter(
+                Q(updated_at__gt=last[0]) | Q(updated_at=last[0], id__gt=last[1])
+            )
+        rows = list(page[:chunk_size])
+        if not rows:
+            return
+        yield [payout_id for _, payout_id in rows]
+        last = rows[-1]
 
-    logger.info(f"Found {stalled_payouts.count()} stalled payouts in PROCESSING status")
 
-    if stalled_payouts.count() == 0:
-        return "No stalled payouts found"
+def claim_stalled_payouts(payout_ids, cutoff):
+    """Touch ``updated_at`` of payouts that are still stalled and return them.
 
-    processed = 0
-    for payout in stalled_payouts:
-        try:
-            task = process_single_payout_task.delay(payout.id)
-            logger.info(
-                f"Resubmitted stalled payout {payout.id}. Run Celery-task {task.id} "
+    A single ``UPDATE ... RETURNING`` both checks and claims the rows, so
+    overlapping scans never claim the same payout twice.
+    """
+    pk = Payout._meta.pk
+    updated_at = Payout._meta.get_field("updated_at")
+    status = Payout._meta.get_field("status")
+    quote = connection.ops.quote_name
+    placeholders = ", ".join(["%s"] * len(payout_ids))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {quote(Payout._meta.db_table)} "
+            f"SET {quote(updated_at.column)} = %s "
+            f"WHERE {quote(pk.column)} IN ({placeholders}) "
+            f"AND {quote(status.column)} = %s "
+            f"AND {quote(updated_at.column)} < %s "
+            f"RETURNING {quote(pk.column)}",
+            [
+                updated_at.get_db_prep_value(timezone.now(), connection),
+                *(
+                    pk.get_db_prep_value(payout_id, connection)
+                    for payout_id in payout_ids
+                ),
+                StatusChoices.PROCESSING.value,
+                updated_at.get_db_prep_value(cutoff, connection),
+            ],
+        )
+        return [pk.to_python(row[0]) for row in cursor.fetchall()]
+
+
+def cancel_stalled_payouts(payout_ids, cutoff, error):
+    """Cancel payouts that are still stalled after their requeue failed.
+
+    Returns the number cancelled.
+    """
+    with transaction.atomic():
+        payouts = list(
+            Payout.objects.select_for_update(skip_locked=True).filter(
+                id__in=payout_ids,
+                status=StatusChoices.PROCESSING,
+                updated_at__lt=cutoff,
             )
-            processed += 1
-        except Exception as e:
-            logger.error(f"Failed to resubmit payout {payout.id}: {e}")
-            payout.comment = f"Auto-check failed: {str(e)}"
+        )
+        now = timezone.now()
+        for payout in payouts:
             payout.status = StatusChoices.CANCELLED
-            payout.save(update_fields=["comment", "status"])
+            payout.comment = f"Auto-check failed: {error}"
+            payout.updated_at = now
+        Payout.objects.bulk_update(payouts, ["status", "comment", "updated_at"])
+        notify_transitions(
+            [
+                PayoutTransition.of(payout, StatusChoices.PROCESSING)
+                for payout in payouts
+            ]
+        )
+    return len(payouts)
+
+
+@shared_task(ignore_result=True)
+def check_stalled_payouts():
+    stalled_before = timezone.now() - timedelta(seconds=settings.PAYOUT_STALLED_AFTER)
+
+    found = processed = cancelled = 0
+    for payout_ids in iter_stalled_payout_ids(
+        stalled_before, settings.PAYOUT_BATCH_MAX_SIZE
+    ):
+        found += len(payout_ids)
+        logger.info(f"Found {len(payout_ids)} stalled payouts in PROCESSING status")
+        try:
+            with transaction.atomic():
+                claimed = claim_stalled_payouts(payout_ids, stalled_before)
+                if claimed:
+                    task_id = str(uuid.uuid4())
+                    enqueue_task(
+                        process_payout_batch_task,
+                        [claimed],
+                        queue=settings.PAYOUT_STALLED_QUEUE,
+                        task_id=task_id,
+                    )
+                    # Status stays PROCESSING, so log the requeue directly.
+                    append_events(
+                        [
+                            PayoutEvent(
+                                payout_id=payout_id,
+                                from_status=StatusChoices.PROCESSING,
+                                to_status=StatusChoices.PROCESSING,
+                                task_id=task_id,
+                            )
+                            for payout_id in claimed
+                        ]
+                    )
+                    notify_changed(claimed)
+        except Exception as e:
+            logger.error(f"Failed to resubmit {len(payout_ids)} stalled payouts: {e}")
+            try:
+                cancelled += cancel_stalled_payouts(payout_ids, stalled_before, e)
+            except Exception as cancel_error:
+                logger.error(f"Failed to cancel stalled payouts: {cancel_error}")
+            continue
+
+        logger.info(f"Resubmitted {len(claimed)} stalled payouts")
+        processed += len(claimed)
+
+    stalled_payouts.inc(processed)
+    if found == 0:
+        return "No stalled payouts found"
 
-    return f"Processed {processed} payouts"
+    summary = f"Processed {processed} payouts"
+    if cancelled:
+        summary += f", cancelled {cancelled} that could not be resubmitted"
+    if found > processed + cancelled:
+        summary += f", {found - processed - cancelled} of {found} left stalled"
+    return summary
@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from src.app.stats import reconcile_stats
+
+
+@shared_task(name="payouts.reconcile_stats", ignore_result=True)
+def reconcile_stats_task():
+    return f"Repaired {reconcile_stats()} stat buckets"
@@ -1,9 +1,28 @@
+from contextlib import contextmanager
+
 import pytest
 from rest_framework.test import APIClient
 
+from src.app.cache import payout_cache
+from src.app.instrumentation import record_usage
 from src.app.models import CurrencyChoices
 
 
+@pytest.fixture(autouse=True)
+def instant_gateway(settings):
+    settings.PAYOUT_GATEWAY = {
+        "BACKEND": "src.app.gateway.FakePayoutGateway",
+        "OPTIONS": {"min_latency": 0, "max_latency": 0},
+    }
+
+
+@pytest.fixture(autouse=True)
+def clear_payout_cache():
+    payout_cache.clear()
+    yield
+    payout_cache.clear()
+
+
 @pytest.fixture
 def api_client():
     return APIClient()
@@ -27,3 +46,28 @@ def service_payout_data():
         "details": {"recipient_name": "Test User", "method": "card"},
         "comment": "Service test",
     }
+
+
+@pytest.fixture
+def budget():
+    """Fail the test when the block exceeds a query, DB time or wall time budget.
+
+    with budget(queries=2, wall_ms=200):
+        api_client.get("/api/payouts/")
+    """
+
+    @contextmanager
+    def check(queries=None, db_ms=None, wall_ms=None):
+        with record_usage() as usage:
+            yield usage
+        spent = usage.as_dict()
+        limits = {"queries": queries, "db_ms": db_ms, "wall_ms": wall_ms}
+        exceeded = [
+            f"{name} {spent[name]} > {limit}"
+            for name, limit in limits.items()
+            if limit is not None and spent[name] > limit
+        ]
+        if exceeded:
+            pytest.fail(f"Budget exceeded: {', '.join(exceeded)}")
+
+    return check
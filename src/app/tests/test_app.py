@@ -1,13 +1,56 @@
+import asyncio
+import importlib
 import json
-from unittest.mock import patch
+import os
+import subprocess
+import sys
+import uuid
+from datetime import datetime, time, timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-from django.urls import reverse
+from celery.exceptions import MaxRetriesExceededError, Retry
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+from kombu.serialization import dumps, loads, prepare_accept_content
+from prometheus_client import REGISTRY
 from rest_framework import status
+from rest_framework.response import Response
 
-from src.app.exceptions import InvalidStatusTransitionError
-from src.app.models import CurrencyChoices, Payout, StatusChoices
+from src.app.cache import INVALIDATION_CHANNEL, PayoutCache, payout_cache
+from src.app.events import subscribe
+from src.app.exceptions import GatewayRateLimitedError, InvalidStatusTransitionError
+from src.app.gateway import FakePayoutGateway, GatewayResult, call_gateway
+from src.app.history import stage_latency_report
+from src.app.idempotency import execute_once
+from src.app.models import (
+    CurrencyChoices,
+    IdempotencyKey,
+    OutboxMessage,
+    Payout,
+    PayoutArchive,
+    PayoutDailyStat,
+    PayoutEvent,
+    StatusChoices,
+)
+from src.app.outbox import dead_messages, relay_outbox, requeue_dead_messages
+from src.app.ratelimit import GatewayRateLimiter, LocalRateStore, retry_delay
+from src.app.routing import payout_queue
+from src.app.search import payout_search_vector, prefix_tsquery
+from src.app.serializers import PayoutSerializer
 from src.app.services import PayoutService
+from src.app.signals import PayoutTransition
+from src.app.stats import apply_transitions, reconcile_stats
+from src.app.tasks.batch_task import process_payout_batch_task
+from src.app.tasks.dispatcher import PayoutBatchDispatcher
+from src.app.tasks.payout_task import process_single_payout_task
+from src.app.tasks.sanity_task import check_stalled_payouts, claim_stalled_payouts
+from src.core.celery import app as celery_app
 
 
 @pytest.mark.django_db
@@ -50,10 +93,13 @@ class TestPayoutService:
             "src.app.tasks.payout_task.process_single_payout_task.delay"
         ) as mock_task:
             PayoutService.submit_payout(payout.id)
-            mock_task.assert_called_once_with(payout.id)
+            mock_task.assert_not_called()
 
         payout.refresh_from_db()
         assert payout.status == StatusChoices.PROCESSING
+        message = OutboxMessage.objects.get()
+        assert message.task_name == "payouts.process_payout_batch"
+        assert message.args == [[str(payout.id)]]
 
     def test_submit_payout_invalid_status(self):
         payout = Payout.objects.create(
@@ -116,3 +162,1649 @@ class TestPayoutViewSet:
 
         assert response.status_code == status.HTTP_400_BAD_REQUEST
         assert "error" in response.data
+
+
+@pytest.mark.django_db
+class TestPayoutBulk:
+    def test_create_and_submit_many(self, service_payout_data):
+        items = [service_payout_data, {**service_payout_data, "details": None}]
+
+        payouts, rejected = PayoutService.create_and_submit_many(items)
+
+        assert len(payouts) == 1
+        assert rejected == [(1, "Fill in the recipient's details")]
+        message = OutboxMessage.objects.get()
+        assert message.task_name == "payouts.process_payout_batch"
+        assert message.args == [[str(payouts[0].id)]]
+        assert Payout.objects.get().status == StatusChoices.PROCESSING
+
+    def test_bulk_endpoint_reports_item_errors(self, api_client, payout_data):
+        items = [payout_data, {**payout_data, "payment_amount": -1}, payout_data]
+
+        response = api_client.post(
+            reverse("payout-bulk"),
+            data=json.dumps(items),
+            content_type="application/json",
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(response.data["created"]) == 2
+        assert response.data["errors"][0]["index"] == 1
+        assert "payment_amount" in response.data["errors"][0]["errors"]
+        assert len(OutboxMessage.objects.get().args[0]) == 2
+        assert Payout.objects.filter(status=StatusChoices.PROCESSING).count() == 2
+
+
+@pytest.mark.django_db
+class TestPayoutBatchTask:
+    def create_processing_payouts(self, count):
+        return [
+            Payout.objects.create(
+                payment_amount=10.00,
+                details={"recipient_name": "Batch", "method": "card"},
+                status=StatusChoices.PROCESSING,
+            )
+            for _ in range(count)
+        ]
+
+    def test_batch_settles_all_payouts(self):
+        payouts = self.create_processing_payouts(3)
+
+        result = process_payout_batch_task.apply(
+            args=([payout.id for payout in payouts],)
+        )
+
+        assert result.get()["paid"] + result.get()["cancelled"] == 3
+        assert not Payout.objects.filter(status=StatusChoices.PROCESSING).exists()
+
+    def test_failed_items_are_cancelled_after_retries(self):
+        payouts = self.create_processing_payouts(2)
+
+        with patch(
+            "src.app.gateway.FakePayoutGateway.submit",
+            side_effect=RuntimeError("gateway down"),
+        ):
+            process_payout_batch_task.apply(args=([payout.id for payout in payouts],))
+
+        assert Payout.objects.filter(status=StatusChoices.CANCELLED).count() == 2
+
+    def test_dispatcher_flushes_by_size(self):
+        with PayoutBatchDispatcher(max_size=2, max_wait=60) as dispatcher:
+            dispatcher.extend(range(5))
+
+        assert [
+            message.args[0] for message in OutboxMessage.objects.order_by("id")
+        ] == [[0, 1], [2, 3], [4]]
+
+
+@pytest.mark.django_db
+class TestPayoutGateway:
+    def test_single_payout_settled_from_gateway_result(self, settings):
+        settings.PAYOUT_GATEWAY = {
+            "BACKEND": "src.app.gateway.FakePayoutGateway",
+            "OPTIONS": {"min_latency": 0, "max_latency": 0, "approval_rate": 1},
+        }
+        payout = Payout.objects.create(
+            payment_amount=10.00,
+            details={"recipient_name": "Gateway", "method": "card"},
+            status=StatusChoices.PROCESSING,
+        )
+
+        result = process_single_payout_task.apply(args=(payout.id,))
+
+        assert result.get()["new_status"] == StatusChoices.PAID
+        payout.refresh_from_db()
+        assert payout.status == StatusChoices.PAID
+
+    def test_submit_many_returns_exceptions_in_order(self):
+        class FlakyGateway(FakePayoutGateway):
+            async def submit(self, payout):
+                if payout.id == 2:
+                    raise RuntimeError("timeout")
+                return await super().submit(payout)
+
+        payouts = [SimpleNamespace(id=i) for i in range(3)]
+        gateway = FlakyGateway(min_latency=0, max_latency=0, approval_rate=1)
+
+        results = asyncio.run(gateway.submit_many(payouts))
+
+        assert [result.payout_id for result in results[:2]] == [0, 1]
+        assert isinstance(results[2], RuntimeError)
+
+
+@pytest.mark.django_db
+class TestOutboxRelay:
+    def test_relay_publishes_and_marks_sent(self):
+        OutboxMessage.objects.create(
+            task_name="payouts.process_single_payout", args=[1]
+        )
+        OutboxMessage.objects.create(
+            task_name="payouts.process_single_payout", args=[2]
+        )
+
+        with patch("celery.app.base.Celery.send_task") as mock_send:
+            assert relay_outbox() == 2
+            assert relay_outbox() == 0
+
+        assert [call.kwargs["args"] for call in mock_send.call_args_list] == [[1], [2]]
+        assert not OutboxMessage.objects.filter(sent_at__isnull=True).exists()
+
+    def test_payout_batches_are_merged_per_queue(self, settings):
+        settings.PAYOUT_BATCH_MAX_SIZE = 3
+        for payout_ids, queue in [
+            (["a"], "payouts.rub"),
+            (["b"], "payouts.usd"),
+            (["c", "d"], "payouts.rub"),
+            (["e"], "payouts.rub"),
+        ]:
+            OutboxMessage.objects.create(
+                task_name="payouts.process_payout_batch",
+                args=[payout_ids],
+                options={"queue": queue, "task_id": f"task-{payout_ids[0]}"},
+            )
+
+        with patch("celery.app.base.Celery.send_task") as mock_send:
+            assert relay_outbox() == 4
+
+        assert [
+            (call.kwargs["args"], call.kwargs["queue"], call.kwargs["task_id"])
+            for call in mock_send.call_args_list
+        ] == [
+            ([["a", "c", "d"]], "payouts.rub", "task-a"),
+            ([["b"]], "payouts.usd", "task-b"),
+            ([["e"]], "payouts.rub", "task-e"),
+        ]
+        assert not OutboxMessage.objects.filter(sent_at__isnull=True).exists()
+
+    def test_submits_share_one_gateway_call(self, payout_data):
+        payouts = [PayoutService.create_payout(payout_data) for _ in range(3)]
+        for payout in payouts:
+            PayoutService.submit_payout(payout.id)
+
+        with patch(
+            "src.app.tasks.batch_task.call_gateway", wraps=call_gateway
+        ) as gateway:
+            with patch("celery.app.base.Celery.send_task") as mock_send:
+                relay_outbox()
+            (call,) = mock_send.call_args_list
+            process_payout_batch_task.apply(args=call.kwargs["args"])
+
+        gateway.assert_called_once()
+        assert not Payout.objects.filter(status=StatusChoices.PROCESSING).exists()
+
+    def test_failed_publish_keeps_message_pending(self):
+        OutboxMessage.objects.create(
+            task_name="payouts.process_single_payout", args=[1]
+        )
+
+        with patch(
+            "celery.app.base.Celery.send_task", side_effect=ConnectionError("down")
+        ):
+            assert relay_outbox() == 0
+
+        message = OutboxMessage.objects.get()
+        assert message.sent_at is None
+        assert message.attempts == 1
+        assert message.next_attempt_at > timezone.now()
+        # Not due yet, so the next relay run skips it.
+        with patch("celery.app.base.Celery.send_task") as mock_send:
+            assert relay_outbox() == 0
+        mock_send.assert_not_called()
+
+    def test_poison_message_does_not_block_the_outbox(self, settings):
+        settings.PAYOUT_OUTBOX_MAX_ATTEMPTS = 2
+        poison = OutboxMessage.objects.create(task_name="payouts.poison", args=[1])
+        OutboxMessage.objects.create(task_name="payouts.relay_outbox", args=[])
+
+        def send_task(name, **kwargs):
+            if name == "payouts.poison":
+                raise ValueError("cannot serialize")
+
+        with patch("celery.app.base.Celery.send_task", side_effect=send_task):
+            assert relay_outbox() == 1
+            OutboxMessage.objects.filter(id=poison.id).update(next_attempt_at=None)
+            assert relay_outbox() == 0
+
+        poison.refresh_from_db()
+        assert poison.attempts == 2
+        assert list(dead_messages()) == [poison]
+
+        assert requeue_dead_messages() == 1
+        with patch("celery.app.base.Celery.send_task"):
+            assert relay_outbox() == 1
+        assert not OutboxMessage.objects.filter(sent_at__isnull=True).exists()
+
+    def test_broker_outage_stops_the_batch(self):
+        for _ in range(3):
+            OutboxMessage.objects.create(task_name="payouts.relay_outbox", args=[])
+
+        with patch(
+            "celery.app.base.Celery.send_task", side_effect=ConnectionError("down")
+        ) as mock_send:
+            assert relay_outbox() == 0
+
+        assert mock_send.call_count == 2
+        assert sorted(OutboxMessage.objects.values_list("attempts", flat=True)) == [
+            0,
+            1,
+            1,
+        ]
+
+
+@pytest.mark.django_db
+class TestStalledPayouts:
+    def test_stalled_payouts_are_claimed_once(self, settings):
+        settings.PAYOUT_BATCH_MAX_SIZE = 2
+        stalled = [
+            Payout.objects.create(
+                payment_amount=10.00,
+                details={"recipient_name": "Stalled", "method": "card"},
+                status=StatusChoices.PROCESSING,
+            )
+            for _ in range(3)
+        ]
+        fresh = Payout.objects.create(
+            payment_amount=10.00, status=StatusChoices.PROCESSING
+        )
+        Payout.objects.filter(id__in=[payout.id for payout in stalled]).update(
+            updated_at=timezone.now() - timedelta(minutes=30)
+        )
+
+        assert check_stalled_payouts() == "Processed 3 payouts"
+        assert check_stalled_payouts() == "No stalled payouts found"
+
+        requeued = [
+            payout_id
+            for message in OutboxMessage.objects.order_by("id")
+            for payout_id in message.args[0]
+        ]
+        assert OutboxMessage.objects.count() == 2
+        assert sorted(requeued) == sorted(str(payout.id) for payout in stalled)
+        assert str(fresh.id) not in requeued
+
+    def test_failed_resubmit_cancels_payouts(self, settings):
+        settings.PAYOUT_BATCH_MAX_SIZE = 2
+        stalled = [
+            Payout.objects.create(payment_amount=10.00, status=StatusChoices.PROCESSING)
+            for _ in range(3)
+        ]
+        Payout.objects.update(updated_at=timezone.now() - timedelta(minutes=30))
+        real_claim = claim_stalled_payouts
+        pages = iter([DatabaseError("page lost"), None])
+
+        def claim(payout_ids, cutoff):
+            error = next(pages)
+            if error is not None:
+                raise error
+            return real_claim(payout_ids, cutoff)
+
+        with patch(
+            "src.app.tasks.sanity_task.claim_stalled_payouts", side_effect=claim
+        ):
+            summary = check_stalled_payouts()
+
+        assert summary == (
+            "Processed 1 payouts, cancelled 2 that could not be resubmitted"
+        )
+        statuses = {
+            payout.id: payout.status
+            for payout in Payout.objects.filter(id__in=[p.id for p in stalled])
+        }
+        assert sorted(statuses.values()) == [
+            StatusChoices.CANCELLED,
+            StatusChoices.CANCELLED,
+            StatusChoices.PROCESSING,
+        ]
+        cancelled = Payout.objects.filter(status=StatusChoices.CANCELLED).first()
+        assert cancelled.comment == "Auto-check failed: page lost"
+
+
+@pytest.mark.django_db
+class TestPayoutPagination:
+    @pytest.fixture
+    def payouts(self):
+        now = timezone.now()
+        return [
+            Payout.objects.create(
+                payment_amount=10.00, created_at=now - timedelta(minutes=i)
+            )
+            for i in range(25)
+        ]
+
+    def test_cursor_pages_follow_created_at(self, api_client, payouts):
+        response = api_client.get(reverse("payout-list"), {"pagination": "cursor"})
+        first_page = [row["id"] for row in response.data["results"]]
+
+        response = api_client.get(response.data["next"])
+        second_page = [row["id"] for row in response.data["results"]]
+
+        assert first_page + second_page == [str(payout.id) for payout in payouts]
+        assert response.data["next"] is None
+
+    def test_invalid_cursor(self, api_client):
+        response = api_client.get(reverse("payout-list"), {"cursor": "garbage"})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_page_without_count(self, api_client, payouts, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = api_client.get(reverse("payout-list"), {"count": "false"})
+
+        assert "count" not in response.data
+        assert len(response.data["results"]) == 20
+        assert "page=2" in response.data["next"]
+        assert response.data["previous"] is None
+
+
+@pytest.mark.django_db
+class TestPayoutSearch:
+    def test_search_by_recipient_and_comment(self, api_client):
+        alice = Payout.objects.create(
+            payment_amount=10.00,
+            details={"recipient_name": "Alice Smith", "method": "card"},
+        )
+        bob = Payout.objects.create(
+            payment_amount=10.00,
+            details={"recipient_name": "Bob Jones", "method": "bank"},
+            comment="Salary for March",
+        )
+
+        by_name = api_client.get(reverse("payout-list"), {"search": "Alice"})
+        by_comment = api_client.get(reverse("payout-list"), {"search": "salary"})
+
+        assert [row["id"] for row in by_name.data["results"]] == [str(alice.id)]
+        assert [row["id"] for row in by_comment.data["results"]] == [str(bob.id)]
+
+    def test_partial_names_match(self, api_client):
+        ivanov = Payout.objects.create(
+            payment_amount=10.00,
+            details={"recipient_name": "Petr Ivanov", "method": "card"},
+        )
+
+        response = api_client.get(reverse("payout-list"), {"search": "Ivan Pet"})
+
+        assert [row["id"] for row in response.data["results"]] == [str(ivanov.id)]
+
+    def test_postgres_terms_are_prefix_matched_literally(self):
+        # tsquery operators typed by the user must not change the query.
+        assert prefix_tsquery(["Ivan", "o'ne:il&"]) == "'Ivan':* & 'o''ne:il&':*"
+
+    @pytest.mark.parametrize(
+        "migration, name",
+        [
+            ("0005_payout_search_gin_idx", "INDEX"),
+            ("0008_partition_payout_table", "SEARCH_INDEX"),
+        ],
+    )
+    def test_search_index_matches_the_filter(self, migration, name):
+        # The planner only uses the GIN index for the exact same expression.
+        module = importlib.import_module(f"src.app.migrations.{migration}")
+        assert getattr(module, name).expressions == (payout_search_vector(),)
+
+
+@pytest.mark.django_db
+class TestPayoutCache:
+    @pytest.fixture
+    def payout(self):
+        return Payout.objects.create(
+            payment_amount=10.00,
+            details={"recipient_name": "Cached", "method": "card"},
+        )
+
+    def test_retrieve_is_served_from_cache(
+        self, api_client, payout, django_assert_num_queries
+    ):
+        url = reverse("payout-detail", args=[str(payout.id)])
+        first = api_client.get(url)
+
+        with django_assert_num_queries(0):
+            second = api_client.get(url)
+            not_modified = api_client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        assert second.data == first.data
+        assert "Last-Modified" in first
+        assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_last_modified_validates_detail_but_not_lists(self, api_client, payout):
+        url = reverse("payout-detail", args=[str(payout.id)])
+        first = api_client.get(url)
+        listing = api_client.get(reverse("payout-list"))
+
+        not_modified = api_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]
+        )
+
+        assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+        assert "Last-Modified" not in listing
+        assert listing["ETag"]
+
+    def test_status_change_invalidates_cache(
+        self, api_client, payout, django_capture_on_commit_callbacks
+    ):
+        detail_url = reverse("payout-detail", args=[str(payout.id)])
+        first = api_client.get(detail_url)
+        api_client.get(reverse("payout-list"))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            PayoutService.submit_payout(payout.id)
+
+        detail = api_client.get(detail_url, HTTP_IF_NONE_MATCH=first["ETag"])
+        listing = api_client.get(reverse("payout-list"))
+
+        assert detail.status_code == status.HTTP_200_OK
+        assert detail.data["status"] == StatusChoices.PROCESSING
+        assert listing.data["results"][0]["status"] == StatusChoices.PROCESSING
+
+    def test_fill_from_before_a_change_is_refused(self, api_client, payout):
+        payout_id = str(payout.id)
+        stale = api_client.get(reverse("payout-detail", args=[payout_id])).data
+        payout_cache.clear()
+
+        # A reader loaded the row, then the payout changed before it cached it.
+        Payout.objects.filter(id=payout.id).update(comment="changed")
+        payout_cache.invalidate([payout_id])
+        payout_cache.set_detail(payout_id, stale, payout.updated_at)
+
+        assert payout_cache.get_detail(payout_id) is None
+        fresh = api_client.get(reverse("payout-detail", args=[payout_id]))
+        assert fresh.data["comment"] == "changed"
+
+    def test_page_read_during_a_change_is_not_served(self, payout):
+        key = payout_cache.list_key("http://testserver/api/payouts/")
+
+        payout_cache.invalidate([str(payout.id)])
+        payout_cache.set_list(key, {"results": []})
+
+        current_key = payout_cache.list_key("http://testserver/api/payouts/")
+        assert payout_cache.get_list(current_key) is None
+
+    def test_invalidations_reach_other_processes(self, settings, payout):
+        settings.PAYOUT_CACHE_BROADCAST = True
+        other_process = PayoutCache()
+        key = other_process.detail_key(str(payout.id))
+        other_process.local.set(key, {"data": {}})
+
+        with patch("src.app.cache.get_redis") as get_redis:
+            payout_cache.invalidate([str(payout.id)])
+
+        channel, message = get_redis.return_value.publish.call_args.args
+        assert channel == INVALIDATION_CHANNEL
+        other_process.apply_broadcast(message)
+        assert other_process.local.get(key) is None
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.urls("src.asgi_urls")
+class TestPayoutStatusWait:
+    def test_wait_returns_terminal_status_immediately(self, api_client):
+        payout = Payout.objects.create(payment_amount=10.00, status=StatusChoices.PAID)
+
+        response = api_client.get(reverse("payout-wait", args=[str(payout.id)]))
+
+        assert response.json() == {
+            "id": str(payout.id),
+            "status": StatusChoices.PAID,
+            "timed_out": False,
+        }
+
+    def test_wait_times_out(self, api_client, settings):
+        settings.PAYOUT_WAIT_POLL_INTERVAL = 0.05
+        payout = Payout.objects.create(
+            payment_amount=10.00, status=StatusChoices.PROCESSING
+        )
+
+        response = api_client.get(
+            reverse("payout-wait", args=[str(payout.id)]), {"timeout": "0.1"}
+        )
+
+        assert response.json()["status"] == StatusChoices.PROCESSING
+        assert response.json()["timed_out"] is True
+
+    def test_wait_reads_past_a_stale_cache_entry(self, api_client):
+        payout = Payout.objects.create(
+            payment_amount=10.00, status=StatusChoices.PROCESSING
+        )
+        payout_cache.set_detail(
+            str(payout.id), PayoutSerializer(payout).data, payout.updated_at
+        )
+        # Settled, with the event published before anyone waited.
+        Payout.objects.filter(id=payout.id).update(status=StatusChoices.PAID)
+
+        response = api_client.get(
+            reverse("payout-wait", args=[str(payout.id)]), {"timeout": "0.1"}
+        )
+
+        assert response.json()["status"] == StatusChoices.PAID
+        assert response.json()["timed_out"] is False
+
+    def test_wait_accepts_uppercase_ids(self, api_client):
+        payout = Payout.objects.create(payment_amount=10.00, status=StatusChoices.PAID)
+
+        response = api_client.get(f"/api/payouts/{str(payout.id).upper()}/wait/")
+
+        assert response.json()["id"] == str(payout.id)
+
+    def test_wait_unknown_payout(self, api_client):
+        response = api_client.get(
+            reverse("payout-wait", args=["00000000-0000-0000-0000-000000000000"])
+        )
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_stream_emits_current_statuses(self, api_client):
+        paid = Payout.objects.create(payment_amount=10.00, status=StatusChoices.PAID)
+
+        response = api_client.get(reverse("payout-stream"), {"ids": str(paid.id)})
+        body = b"".join(asyncio.run(collect(response.streaming_content))).decode()
+
+        assert response["Content-Type"] == "text/event-stream"
+        assert body == (
+            f'event: status\ndata: {{"id": "{paid.id}", "status": "paid"}}\n\n'
+        )
+
+
+@pytest.mark.django_db
+def test_status_change_is_published(settings, django_capture_on_commit_callbacks):
+    settings.PAYOUT_EVENTS_ENABLED = True
+    payout = Payout.objects.create(
+        payment_amount=10.00,
+        details={"recipient_name": "Events", "method": "card"},
+    )
+
+    with (
+        patch("src.app.events.get_redis") as mock_redis,
+        django_capture_on_commit_callbacks(execute=True),
+    ):
+        PayoutService.submit_payout(payout.id)
+
+    pipeline = mock_redis.return_value.pipeline.return_value
+    pipeline.publish.assert_called_once_with(
+        f"payouts:status:{payout.id}",
+        json.dumps({"id": str(payout.id), "status": StatusChoices.PROCESSING}),
+    )
+    pipeline.execute.assert_called_once()
+
+
+class FakePubSub:
+    def __init__(self):
+        self.messages = asyncio.Queue()
+
+    async def psubscribe(self, pattern):
+        self.pattern = pattern
+
+    async def listen(self):
+        while True:
+            yield await self.messages.get()
+
+    async def aclose(self):
+        pass
+
+
+def test_status_subscriptions_share_one_redis_connection(settings):
+    settings.PAYOUT_EVENTS_ENABLED = True
+    pubsub = FakePubSub()
+    client = MagicMock(aclose=AsyncMock())
+    client.pubsub.return_value = pubsub
+
+    async def scenario():
+        async with (
+            subscribe(["a"]) as first,
+            subscribe(["a", "b"]) as second,
+            subscribe(["b"]) as third,
+        ):
+            data = json.dumps({"id": "a", "status": StatusChoices.PAID})
+            await pubsub.messages.put({"type": "pmessage", "data": data})
+            return [
+                await first.get(1),
+                await second.get(1),
+                await third.get(0.01),
+            ]
+
+    with patch("redis.asyncio.Redis.from_url", return_value=client) as from_url:
+        changes = asyncio.run(scenario())
+
+    from_url.assert_called_once()
+    assert pubsub.pattern == "payouts:status:*"
+    assert changes == [("a", StatusChoices.PAID), ("a", StatusChoices.PAID), None]
+
+
+def test_streaming_routes_are_not_served_over_wsgi():
+    with pytest.raises(NoReverseMatch):
+        reverse("payout-wait", args=["00000000-0000-0000-0000-000000000000"])
+    with pytest.raises(NoReverseMatch):
+        reverse("payout-stream")
+
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+@pytest.mark.django_db
+class TestPayoutExport:
+    @pytest.fixture
+    def payouts(self):
+        paid = Payout.objects.create(
+            payment_amount=10.5,
+            currency=CurrencyChoices.USD,
+            details={"recipient_name": "Export", "method": "card"},
+            status=StatusChoices.PAID,
+        )
+        Payout.objects.create(payment_amount=20, status=StatusChoices.CANCELLED)
+        return paid
+
+    def test_ndjson_matches_serializer(self, api_client, payouts):
+        response = api_client.get(
+            reverse("payout-export"),
+            {"export_format": "ndjson", "status": StatusChoices.PAID},
+        )
+        lines = b"".join(response.streaming_content).decode().splitlines()
+
+        assert response["Content-Type"] == "application/x-ndjson"
+        assert [json.loads(line) for line in lines] == [
+            json.loads(json.dumps(PayoutSerializer(payouts).data))
+        ]
+
+    def test_csv_export(self, api_client, payouts):
+        response = api_client.get(reverse("payout-export"))
+        lines = b"".join(response.streaming_content).decode().splitlines()
+
+        assert lines[0] == (
+            "id,payment_amount,currency,details,status,created_at,updated_at,comment"
+        )
+        assert len(lines) == 3
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize("export_format", ["csv", "ndjson"])
+    def test_export_streams_async_under_asgi(
+        self, api_client, settings, payouts, export_format
+    ):
+        settings.ASGI = False
+        sync = api_client.get(reverse("payout-export"), {"export_format": "csv"})
+        expected = b"".join(sync.streaming_content)
+
+        settings.ASGI = True
+        response = api_client.get(
+            reverse("payout-export"), {"export_format": export_format}
+        )
+
+        assert response.is_async
+        body = b"".join(asyncio.run(collect(response.streaming_content))).decode()
+        if export_format == "csv":
+            assert body.encode() == expected
+        else:
+            assert len(body.splitlines()) == 2
+
+    def test_date_filters(self, api_client, payouts):
+        Payout.objects.filter(id=payouts.id).update(
+            created_at=timezone.now() - timedelta(days=2)
+        )
+
+        response = api_client.get(
+            reverse("payout-list"),
+            {"created_before": (timezone.now() - timedelta(days=1)).isoformat()},
+        )
+
+        assert [row["id"] for row in response.data["results"]] == [str(payouts.id)]
+
+
+@pytest.mark.django_db
+class TestPayoutStats:
+    def test_rollup_follows_transitions(
+        self, api_client, service_payout_data, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            payout = PayoutService.create_payout(service_payout_data)
+            PayoutService.create_payout(service_payout_data)
+            PayoutService.submit_payout(payout.id)
+
+        response = api_client.get(reverse("payout-stats"), {"currency": "RUB"})
+
+        day = timezone.localdate().isoformat()
+        assert response.data == [
+            {
+                "day": day,
+                "status": "created",
+                "currency": "RUB",
+                "count": 1,
+                "amount": "200.00",
+            },
+            {
+                "day": day,
+                "status": "processing",
+                "currency": "RUB",
+                "count": 1,
+                "amount": "200.00",
+            },
+        ]
+
+    def test_delete_leaves_bucket(
+        self, api_client, service_payout_data, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            payout = PayoutService.create_payout(service_payout_data)
+            api_client.delete(reverse("payout-detail", args=[str(payout.id)]))
+
+        assert api_client.get(reverse("payout-stats")).data == []
+
+    def test_buckets_are_locked_in_a_fixed_order(self):
+        today = timezone.localdate()
+        yesterday = today - timedelta(days=1)
+
+        def transition(new_status, currency, day):
+            return PayoutTransition(
+                payout_id=uuid.uuid4(),
+                old_status=None,
+                new_status=new_status,
+                currency=currency,
+                payment_amount=1,
+                created_at=timezone.make_aware(datetime.combine(day, time(12))),
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            apply_transitions(
+                [
+                    transition("paid", "USD", today),
+                    transition("created", "RUB", today),
+                    transition("paid", "EUR", yesterday),
+                ]
+            )
+
+        updates = [
+            query["sql"] for query in queries if query["sql"].startswith("UPDATE")
+        ]
+        expected = [
+            (yesterday, "paid", "EUR"),
+            (today, "created", "RUB"),
+            (today, "paid", "USD"),
+        ]
+        assert len(updates) == len(expected)
+        for sql, (day, new_status, currency) in zip(updates, expected):
+            assert day.isoformat() in sql
+            assert f"'{new_status}'" in sql and f"'{currency}'" in sql
+
+    def test_rollup_is_written_after_the_business_commit(self, service_payout_data):
+        with transaction.atomic():
+            PayoutService.create_payout(service_payout_data)
+            assert not PayoutDailyStat.objects.exists()
+
+    def test_reconcile_repairs_drift(
+        self, service_payout_data, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            PayoutService.create_payout(service_payout_data)
+        PayoutDailyStat.objects.update(count=5)
+        Payout.objects.create(payment_amount=1, currency=CurrencyChoices.EUR)
+
+        assert reconcile_stats() == 2
+        assert reconcile_stats() == 0
+        assert sorted(PayoutDailyStat.objects.values_list("currency", "count")) == [
+            ("EUR", 1),
+            ("RUB", 1),
+        ]
+
+
+@pytest.mark.django_db
+class TestPayoutArchive:
+    def test_command_archives_old_settled_payouts(self):
+        old = timezone.now() - timedelta(days=400)
+        settled = Payout.objects.create(
+            payment_amount=10.00, status=StatusChoices.PAID, created_at=old
+        )
+        pending = Payout.objects.create(
+            payment_amount=10.00, status=StatusChoices.PROCESSING, created_at=old
+        )
+        recent = Payout.objects.create(payment_amount=10.00, status=StatusChoices.PAID)
+        reconcile_stats()
+
+        call_command("manage_payout_partitions", "--archive-after=6", stdout=StringIO())
+
+        assert list(PayoutArchive.objects.values_list("id", flat=True)) == [settled.id]
+        assert set(Payout.objects.values_list("id", flat=True)) == {
+            pending.id,
+            recent.id,
+        }
+        assert reconcile_stats() == 0
+
+    @pytest.fixture
+    def archived(self):
+        old = timezone.now() - timedelta(days=400)
+        payout = Payout.objects.create(
+            payment_amount=10.00, status=StatusChoices.PAID, created_at=old
+        )
+        call_command("manage_payout_partitions", "--archive-after=6", stdout=StringIO())
+        return payout
+
+    @pytest.mark.parametrize("fast", [False, True])
+    def test_archived_payout_is_still_retrieved(
+        self, api_client, settings, archived, fast
+    ):
+        settings.PAYOUT_FAST_SERIALIZER = fast
+
+        response = api_client.get(reverse("payout-detail", args=[archived.id]))
+        history = api_client.get(reverse("payout-history", args=[archived.id]))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["id"] == str(archived.id)
+        assert response.json()["status"] == StatusChoices.PAID
+        assert history.status_code == status.HTTP_200_OK
+
+    @pytest.mark.urls("src.asgi_urls")
+    def test_archived_payout_is_still_retrieved_async(self, api_client, archived):
+        response = api_client.get(reverse("async-payout-detail", args=[archived.id]))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["id"] == str(archived.id)
+
+    def test_list_and_export_archived_payouts(self, api_client, archived):
+        live = Payout.objects.create(payment_amount=10.00)
+
+        listing = api_client.get(reverse("payout-list"))
+        archive = api_client.get(
+            reverse("payout-list"), {"archived": "true", "status": "paid"}
+        )
+        export = api_client.get(
+            reverse("payout-export"), {"archived": "true", "export_format": "ndjson"}
+        )
+
+        assert [row["id"] for row in listing.json()["results"]] == [str(live.id)]
+        assert [row["id"] for row in archive.json()["results"]] == [str(archived.id)]
+        assert str(archived.id) in b"".join(export.streaming_content).decode()
+
+    def test_client_cannot_choose_payout_id(self, api_client, payout_data):
+        # The partitioned table only enforces a unique (id, created_at), so
+        # ids have to come from the server.
+        existing = Payout.objects.create(payment_amount=10.00)
+
+        response = api_client.post(
+            reverse("payout-list"),
+            {**payout_data, "id": str(existing.id)},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.json()["id"] != str(existing.id)
+
+
+@pytest.mark.django_db
+class TestTaskResults:
+    def test_results_are_not_stored_by_default(self):
+        for task in celery_app.tasks.values():
+            if task.name.startswith(("payouts.", "src.app.")):
+                assert task.ignore_result, task.name
+
+    def test_stored_results_are_compact_msgpack(self, service_payout_data):
+        payout = PayoutService.create_payout(service_payout_data)
+        PayoutService.submit_payout(payout.id)
+
+        result = process_single_payout_task.apply(args=(payout.id,)).get()
+
+        assert set(result) == {"new_status", "processing_time"}
+        content_type, encoding, payload = dumps(
+            result, serializer=celery_app.conf.result_serializer
+        )
+        assert content_type == "application/x-msgpack"
+        accept = prepare_accept_content(celery_app.conf.result_accept_content)
+        assert loads(payload, content_type, encoding, accept=accept) == result
+        assert celery_app.conf.result_expires == 60 * 60
+
+
+class TestWorkerProfile:
+    def test_long_tasks_profile_is_applied(self):
+        assert celery_app.conf.task_acks_late is True
+        assert celery_app.conf.task_reject_on_worker_lost is True
+        assert celery_app.conf.worker_prefetch_multiplier == 1
+        # Redis must not redeliver a task that is still running.
+        assert celery_app.conf.broker_transport_options["visibility_timeout"] > (
+            process_payout_batch_task.time_limit
+        )
+
+    @pytest.mark.parametrize(
+        "task", [process_payout_batch_task, process_single_payout_task]
+    )
+    def test_tasks_end_well_before_they_count_as_stalled(self, settings, task):
+        assert task.time_limit <= settings.PAYOUT_STALLED_AFTER / 2
+
+
+class TestAppRoles:
+    def test_worker_skips_api_modules(self):
+        script = (
+            "import sys\n"
+            "from src.core.celery import app\n"
+            "app.loader.import_default_modules()\n"
+            "app.finalize(auto=True)\n"
+            "assert 'payouts.process_single_payout' in app.tasks, sorted(app.tasks)\n"
+            "loaded = {'rest_framework', 'src.app.views', 'django.contrib.admin'}\n"
+            "print(sorted(loaded & sys.modules.keys()))\n"
+        )
+        env = {
+            **os.environ,
+            "APP_ROLE": "worker",
+            "CELERY_SKIP_CHECKS": "1",
+            "DJANGO_SETTINGS_MODULE": "src.core.settings",
+            "SECRET_KEY": "test",
+        }
+
+        process = subprocess.run(
+            [sys.executable, "-c", script],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+
+        assert process.returncode == 0, process.stderr
+        assert process.stdout.strip() == "[]"
+
+    def test_tests_run_the_api_middleware(self, settings):
+        assert settings.APP_ROLE == "test"
+        assert settings.MIDDLEWARE == settings.ROLE_MIDDLEWARE["api"]
+        assert "django.middleware.csrf.CsrfViewMiddleware" in settings.MIDDLEWARE
+
+
+def load_settings(**env):
+    """Import the settings in a fresh interpreter with ``env`` set.
+
+    Returns the process; ``DATABASES`` is printed as JSON on success.
+    """
+    script = (
+        "import json\n"
+        "from src.core import settings\n"
+        "print(json.dumps(settings.DATABASES['default'], default=str))\n"
+    )
+    return subprocess.run(
+        [sys.executable, "-c", script],
+        env={**os.environ, "SECRET_KEY": "test", "APP_ROLE": "api", **env},
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+
+
+class TestDatabaseSettings:
+    def test_asgi_does_not_keep_connections(self):
+        wsgi = load_settings(DB_POOL_MODE="persistent")
+        asgi = load_settings(DB_POOL_MODE="persistent", DJANGO_ASGI="1")
+
+        assert json.loads(wsgi.stdout)["CONN_MAX_AGE"] == 60
+        assert json.loads(asgi.stdout)["CONN_MAX_AGE"] == 0
+
+    def test_pool_smaller_than_threads_is_rejected(self):
+        process = load_settings(
+            DB_POOL_MODE="pool", GUNICORN_THREADS="4", DB_POOL_MAX_SIZE="2"
+        )
+
+        assert process.returncode != 0
+        assert "DB_POOL_MAX_SIZE=2 is below the 4 GUNICORN_THREADS" in process.stderr
+
+
+@pytest.mark.django_db
+class TestPayoutHistory:
+    def test_history_follows_the_pipeline(self, api_client, service_payout_data):
+        payout = PayoutService.create_payout(service_payout_data)
+        PayoutService.submit_payout(payout.id)
+        task_id = OutboxMessage.objects.get().options["task_id"]
+        process_payout_batch_task.apply(args=([payout.id],), task_id=task_id)
+        payout.refresh_from_db()
+
+        response = api_client.get(reverse("payout-history", args=[str(payout.id)]))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [
+            (event["from_status"], event["to_status"], event["task_id"])
+            for event in response.data
+        ] == [
+            (None, "created", None),
+            ("created", "processing", task_id),
+            ("processing", payout.status, task_id),
+        ]
+        assert response.data[0]["latency"] is None
+        assert all(event["latency"] >= 0 for event in response.data[1:])
+
+    def test_stalled_requeue_is_logged(self, service_payout_data):
+        payout = PayoutService.create_payout(service_payout_data)
+        PayoutService.submit_payout(payout.id)
+        Payout.objects.filter(id=payout.id).update(
+            updated_at=timezone.now() - timedelta(minutes=30)
+        )
+
+        check_stalled_payouts()
+
+        event = PayoutEvent.objects.filter(payout_id=payout.id).latest("id")
+        assert (event.from_status, event.to_status) == ("processing", "processing")
+        assert event.task_id == OutboxMessage.objects.latest("id").options["task_id"]
+        assert event.latency is not None
+
+    def test_unknown_payout(self, api_client):
+        for payout_id in ["00000000-0000-0000-0000-000000000000", "not-a-uuid"]:
+            response = api_client.get(reverse("payout-history", args=[payout_id]))
+            assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_stage_latency_report(self):
+        now = timezone.now()
+        PayoutEvent.objects.bulk_create(
+            [
+                PayoutEvent(
+                    payout_id=uuid.uuid4(),
+                    from_status=StatusChoices.PROCESSING,
+                    to_status=StatusChoices.PAID,
+                    latency=timedelta(seconds=seconds),
+                    created_at=now,
+                )
+                for seconds in range(1, 101)
+            ]
+            + [
+                PayoutEvent(
+                    payout_id=uuid.uuid4(),
+                    from_status=StatusChoices.CREATED,
+                    to_status=StatusChoices.PROCESSING,
+                    latency=timedelta(seconds=1),
+                    created_at=created_at,
+                )
+                for created_at in (now, now - timedelta(days=2))
+            ]
+        )
+
+        report = stage_latency_report(now - timedelta(days=1))
+
+        assert report == [
+            {
+                "from_status": "processing",
+                "to_status": "paid",
+                "count": 100,
+                "p50": 50.0,
+                "p95": 95.0,
+                "p99": 99.0,
+                "max": 100.0,
+            },
+            {
+                "from_status": "created",
+                "to_status": "processing",
+                "count": 1,
+                "p50": 1.0,
+                "p95": 1.0,
+                "p99": 1.0,
+                "max": 1.0,
+            },
+        ]
+        stdout = StringIO()
+        call_command("report_payout_latency", "--hours=24", stdout=stdout)
+        assert "processing -> paid" in stdout.getvalue()
+
+
+@pytest.mark.django_db
+class TestBudgets:
+    @pytest.mark.parametrize("rows", [5, 60])
+    def test_list_queries_do_not_grow_with_rows(self, api_client, budget, rows):
+        Payout.objects.bulk_create(
+            Payout(payment_amount=10.00, currency=CurrencyChoices.USD)
+            for _ in range(rows)
+        )
+
+        with budget(queries=2):
+            api_client.get(reverse("payout-list"))
+        with budget(queries=1):
+            api_client.get(reverse("payout-list"), {"pagination": "cursor"})
+
+    def test_stalled_scan_queries_per_batch(self, budget, settings):
+        settings.PAYOUT_BATCH_MAX_SIZE = 10
+        Payout.objects.bulk_create(
+            Payout(payment_amount=10.00, status=StatusChoices.PROCESSING)
+            for _ in range(25)
+        )
+        Payout.objects.update(updated_at=timezone.now() - timedelta(minutes=30))
+
+        # Per batch: page select, savepoint, claim, outbox insert, previous
+        # event lookup, event insert, release.
+        with budget(queries=3 * 7 + 1):
+            check_stalled_payouts()
+
+    def test_usage_headers_in_debug(self, api_client, settings):
+        settings.DEBUG = True
+        Payout.objects.create(payment_amount=10.00)
+
+        response = api_client.get(reverse("payout-list"))
+
+        assert response["X-Query-Count"] == "2"
+        assert float(response["X-Wall-Time-Ms"]) >= float(response["X-DB-Time-Ms"])
+
+    def test_usage_is_logged_for_tasks(self, caplog, service_payout_data):
+        payout = PayoutService.create_payout(service_payout_data)
+
+        with caplog.at_level("INFO", logger="src.app.instrumentation"):
+            process_single_payout_task.apply(args=(payout.id,))
+
+        record = next(
+            record
+            for record in caplog.records
+            if record.name == "src.app.instrumentation"
+        )
+        assert record.operation == "task.payouts.process_single_payout"
+        assert record.queries > 0
+
+
+@pytest.mark.django_db
+class TestMetrics:
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_transitions_and_gateway_calls_are_recorded(
+        self, service_payout_data, django_capture_on_commit_callbacks
+    ):
+        created = self.sample("payouts_created_total", currency="RUB")
+        submitted = self.sample("payouts_submitted_total", currency="RUB")
+        calls = self.sample("payout_gateway_latency_seconds_count")
+        ages = self.sample("payout_status_age_seconds_count", status="processing")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            payout = PayoutService.create_payout(service_payout_data)
+            PayoutService.submit_payout(payout.id)
+        process_single_payout_task.apply(args=(payout.id,))
+
+        assert self.sample("payouts_created_total", currency="RUB") == created + 1
+        assert self.sample("payouts_submitted_total", currency="RUB") == submitted + 1
+        assert self.sample("payout_gateway_latency_seconds_count") == calls + 1
+        assert (
+            self.sample("payout_status_age_seconds_count", status="processing")
+            == ages + 1
+        )
+
+    def test_metrics_endpoint(self, client, settings):
+        settings.PAYOUT_METRICS_QUEUES = []
+        OutboxMessage.objects.create(task_name="payouts.relay_outbox", args=[])
+
+        response = client.get("/metrics")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert b"payouts_created_total" in response.content
+        assert b"payout_outbox_pending 1.0" in response.content
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAsyncPayoutApi:
+    def test_create_retrieve_and_list(self, api_client, payout_data):
+        response = api_client.post(
+            reverse("async-payout-list"), payout_data, format="json"
+        )
+        payout_id = response.json()["id"]
+
+        detail = api_client.get(reverse("async-payout-detail", args=[payout_id]))
+        listing = api_client.get(reverse("async-payout-list"))
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.json()["status"] == StatusChoices.PROCESSING
+        assert OutboxMessage.objects.get().args == [[payout_id]]
+        assert detail.json() == response.json()
+        assert detail["ETag"]
+        assert listing.json() == {"next": None, "results": [response.json()]}
+
+    def test_matches_sync_detail(self, api_client):
+        payout = Payout.objects.create(payment_amount=10.00)
+
+        sync = api_client.get(reverse("payout-detail", args=[payout.id]))
+        payout_cache.clear()
+        async_ = api_client.get(reverse("async-payout-detail", args=[payout.id]))
+
+        assert async_.json() == sync.json()
+
+    def test_submit(self, api_client):
+        payout = Payout.objects.create(
+            payment_amount=10.00, details={"recipient_name": "Async", "method": "card"}
+        )
+
+        response = api_client.post(reverse("async-payout-submit", args=[payout.id]))
+        repeated = api_client.post(reverse("async-payout-submit", args=[payout.id]))
+
+        assert response.json()["status"] == StatusChoices.PROCESSING
+        assert repeated.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_invalid_payload_and_unknown_payout(self, api_client):
+        response = api_client.post(
+            reverse("async-payout-list"), {"payment_amount": -1}, format="json"
+        )
+        missing = api_client.get(
+            reverse(
+                "async-payout-detail", args=["00000000-0000-0000-0000-000000000000"]
+            )
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert missing.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestIdempotencyKeys:
+    def test_retried_create_replays_response(
+        self,
+        api_client,
+        payout_data,
+        django_assert_num_queries,
+        django_capture_on_commit_callbacks,
+    ):
+        headers = {"Idempotency-Key": "create-1"}
+        with django_capture_on_commit_callbacks(execute=True):
+            first = api_client.post(
+                reverse("payout-list"), payout_data, format="json", headers=headers
+            )
+
+        with django_assert_num_queries(0):
+            retry = api_client.post(
+                reverse("payout-list"), payout_data, format="json", headers=headers
+            )
+
+        assert first.status_code == retry.status_code == status.HTTP_201_CREATED
+        assert retry.data == first.data
+        assert retry["Idempotent-Replayed"] == "true"
+        assert Payout.objects.count() == 1
+        assert OutboxMessage.objects.count() == 1
+
+    def test_database_is_the_source_of_truth(self, api_client):
+        payout = Payout.objects.create(
+            payment_amount=10.00, details={"recipient_name": "Key", "method": "card"}
+        )
+        headers = {"Idempotency-Key": "submit-1"}
+        url = reverse("payout-submit", args=[payout.id])
+        first = api_client.post(url, headers=headers)
+        payout_cache.clear()
+
+        retry = api_client.post(url, headers=headers)
+
+        assert retry.status_code == status.HTTP_200_OK
+        assert retry.data == first.data
+        assert OutboxMessage.objects.count() == 1
+
+    def test_key_reused_for_another_request(self, api_client, payout_data):
+        headers = {"Idempotency-Key": "create-2"}
+        api_client.post(
+            reverse("payout-list"), payout_data, format="json", headers=headers
+        )
+
+        response = api_client.post(
+            reverse("payout-list"),
+            {**payout_data, "payment_amount": 5},
+            format="json",
+            headers=headers,
+        )
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert Payout.objects.count() == 1
+
+    def test_failed_validation_does_not_store_key(self, api_client, payout_data):
+        headers = {"Idempotency-Key": "create-3"}
+        api_client.post(
+            reverse("payout-list"),
+            {"payment_amount": -1},
+            format="json",
+            headers=headers,
+        )
+
+        response = api_client.post(
+            reverse("payout-list"), payout_data, format="json", headers=headers
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+
+    def test_database_error_does_not_store_key(self, api_client, payout_data):
+        headers = {"Idempotency-Key": "create-4"}
+        with patch.object(
+            PayoutService, "create_payout", side_effect=DatabaseError("gone")
+        ):
+            with pytest.raises(DatabaseError):
+                api_client.post(
+                    reverse("payout-list"), payout_data, format="json", headers=headers
+                )
+
+        response = api_client.post(
+            reverse("payout-list"), payout_data, format="json", headers=headers
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Payout.objects.count() == 1
+
+    def test_server_error_response_is_not_stored(self):
+        responses = iter([Response(status=503), Response({"ok": True})])
+
+        first = execute_once("server-1", "fingerprint", lambda: next(responses))
+        retry = execute_once("server-1", "fingerprint", lambda: next(responses))
+
+        assert first.status_code == 503
+        assert retry.data == {"ok": True}
+        assert IdempotencyKey.objects.get().response_status == 200
+
+    def test_async_create_and_submit_replay_response(self, api_client, payout_data):
+        create = api_client.post(
+            reverse("async-payout-list"),
+            payout_data,
+            format="json",
+            headers={"Idempotency-Key": "async-create-1"},
+        )
+        retried_create = api_client.post(
+            reverse("async-payout-list"),
+            payout_data,
+            format="json",
+            headers={"Idempotency-Key": "async-create-1"},
+        )
+        payout = Payout.objects.create(
+            payment_amount=10.00, details={"recipient_name": "Key", "method": "card"}
+        )
+        url = reverse("async-payout-submit", args=[payout.id])
+        submit = api_client.post(url, headers={"Idempotency-Key": "async-submit-1"})
+        retried_submit = api_client.post(
+            url, headers={"Idempotency-Key": "async-submit-1"}
+        )
+
+        assert create.status_code == retried_create.status_code == 201
+        assert retried_create.json() == create.json()
+        assert retried_create["Idempotent-Replayed"] == "true"
+        assert submit.status_code == retried_submit.status_code == 200
+        assert retried_submit.json() == submit.json()
+        assert Payout.objects.count() == 2
+        assert OutboxMessage.objects.count() == 2
+
+
+@pytest.mark.django_db
+class TestQueueRouting:
+    def test_submit_routes_by_currency_and_priority(self, settings, payout_data):
+        settings.PAYOUT_PRIORITY_MIN_AMOUNT = 10000
+        routine = PayoutService.create_payout({**payout_data, "currency": "RUB"})
+        urgent = PayoutService.create_payout(
+            {**payout_data, "details": {"recipient_name": "Urgent", "priority": "high"}}
+        )
+        large = PayoutService.create_payout({**payout_data, "payment_amount": 20000})
+
+        for payout in (routine, urgent, large):
+            PayoutService.submit_payout(payout.id)
+
+        queues = {
+            message.args[0][0]: message.options["queue"]
+            for message in OutboxMessage.objects.all()
+        }
+        assert queues == {
+            str(routine.id): "payouts.rub",
+            str(urgent.id): "payouts.priority",
+            str(large.id): "payouts.priority",
+        }
+
+    def test_bulk_batches_follow_routes(self, settings, payout_data):
+        settings.PAYOUT_ROUTE_BY = "amount"
+        items = [
+            {**payout_data, "payment_amount": amount} for amount in (10, 5000, 500000)
+        ]
+
+        PayoutService.create_and_submit_many(items)
+
+        assert sorted(
+            message.options["queue"] for message in OutboxMessage.objects.all()
+        ) == ["payouts.above_100000", "payouts.upto_1000", "payouts.upto_100000"]
+
+    def test_stalled_requeues_use_their_own_queue(self):
+        payout = Payout.objects.create(
+            payment_amount=10.00, status=StatusChoices.PROCESSING
+        )
+        Payout.objects.filter(id=payout.id).update(
+            updated_at=timezone.now() - timedelta(minutes=30)
+        )
+
+        check_stalled_payouts()
+
+        event = PayoutEvent.objects.get(payout_id=payout.id)
+        assert OutboxMessage.objects.get().options == {
+            "queue": "payouts.stalled",
+            "task_id": event.task_id,
+        }
+
+    @pytest.mark.parametrize("route_by", ["currency", "amount", "none"])
+    def test_worker_queues_cover_every_route(self, settings, route_by):
+        settings.PAYOUT_ROUTE_BY = route_by
+        stdout = StringIO()
+
+        call_command("payout_queues", stdout=stdout)
+
+        consumed = set(stdout.getvalue().strip().split(","))
+        routed = {
+            payout_queue(Payout(payment_amount=amount, currency=currency))
+            for amount in (1, 1000, 1001, 100000, 100001)
+            for currency in CurrencyChoices.values
+        }
+        assert routed <= consumed
+
+
+class TestGatewayRateLimiter:
+    @pytest.fixture
+    def clock(self):
+        return SimpleNamespace(now=0.0)
+
+    @pytest.fixture
+    def limiter(self, settings, clock):
+        settings.PAYOUT_RATE_LIMIT_MAX_WAIT = 1.0
+        settings.PAYOUT_RATE_LIMITS = {
+            "default": {
+                "rate": 10.0,
+                "burst": 5.0,
+                "min_rate": 1.0,
+                "increase": 1.0,
+                "decrease": 0.5,
+                "target_latency": 2.0,
+                "error_rate": 0.1,
+            },
+            "EUR": {"burst": 1.0},
+        }
+        return GatewayRateLimiter(LocalRateStore(clock=lambda: clock.now))
+
+    def payouts(self, count, currency="USD"):
+        return [SimpleNamespace(currency=currency, details={}) for _ in range(count)]
+
+    def test_bucket_allows_burst_then_waits_or_defers(self, limiter):
+        with patch("src.app.ratelimit.time.sleep") as sleep:
+            assert limiter.throttle(self.payouts(5)) == {}
+            sleep.assert_not_called()
+
+            assert limiter.throttle(self.payouts(5)) == {}
+            sleep.assert_called_once_with(pytest.approx(0.5))
+
+            # No more than a burst is taken at once, the rest is deferred.
+            deferred = limiter.throttle(self.payouts(10))
+            sleep.assert_called_with(pytest.approx(1.0))
+
+        assert sorted(deferred) == [5, 6, 7, 8, 9]
+        assert deferred[5].scope == "USD"
+        assert deferred[5].retry_after == pytest.approx(1.5)
+
+        deferred = limiter.throttle(self.payouts(1))
+        assert deferred[0].retry_after == pytest.approx(1.1)
+
+    def test_scopes_have_separate_buckets(self, limiter):
+        limiter.throttle(self.payouts(5, "USD"))
+        limiter.throttle(self.payouts(1, "EUR"))
+
+        with patch("src.app.ratelimit.time.sleep"):
+            deferred = limiter.throttle(self.payouts(3, "EUR") + self.payouts(2, "GBP"))
+
+        # EUR takes its burst of one; GBP is sent in full.
+        assert sorted(deferred) == [1, 2]
+        assert {error.scope for error in deferred.values()} == {"EUR"}
+
+    def test_gateway_is_called_for_admitted_payouts_only(self, limiter):
+        payouts = [
+            SimpleNamespace(id=uuid.uuid4(), currency="EUR", details={})
+            for _ in range(2)
+        ]
+        gateway = FakePayoutGateway(min_latency=0, max_latency=0, approval_rate=1)
+
+        with (
+            patch("src.app.ratelimit.get_rate_limiter", return_value=limiter),
+            patch("src.app.gateway.get_gateway", return_value=gateway),
+        ):
+            results = call_gateway(payouts)
+
+        assert isinstance(results[0], GatewayResult)
+        assert isinstance(results[1], GatewayRateLimitedError)
+
+    def test_rate_adapts_to_errors_and_latency(self, limiter):
+        store = limiter.store
+        payouts = self.payouts(2)
+        healthy = [GatewayResult(None, True, 0.5)] * 2
+
+        limiter.observe(payouts, [GatewayResult(None, True, 0.5), TimeoutError()])
+        limiter.observe(payouts, [GatewayResult(None, True, 5.0)] * 2)
+        assert store._buckets["USD"][2] == 2.5
+
+        limiter.observe(payouts, healthy)
+        assert store._buckets["USD"][2] == 3.5
+
+        for _ in range(20):
+            limiter.observe(payouts, healthy)
+        assert store._buckets["USD"][2] == 10.0
+
+    def test_retry_delay_is_jittered_and_capped(self, settings):
+        settings.PAYOUT_RETRY_BASE_DELAY = 10
+        settings.PAYOUT_RETRY_MAX_DELAY = 60
+
+        delays = [retry_delay(retries) for retries in range(10) for _ in range(20)]
+
+        assert all(0 <= delay <= 60 for delay in delays)
+        assert len(set(delays)) == len(delays)
+
+    def run_attempt(self, task, args, retries, throttled, results):
+        """Run ``task`` as its ``retries``-th retry with the gateway's ``results``."""
+        target = f"{task.__module__}.call_gateway"
+        task.push_request(
+            id="attempt",
+            retries=retries,
+            kwargs={"throttled": throttled},
+            called_directly=False,
+            is_eager=True,
+        )
+        try:
+            with patch(target, return_value=results):
+                task.run(*args, throttled=throttled)
+        finally:
+            task.pop_request()
+
+    @pytest.fixture
+    def processing_payout(self, service_payout_data):
+        payout = PayoutService.create_payout(service_payout_data)
+        PayoutService.submit_payout(payout.id)
+        return payout
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize(
+        "task, as_args",
+        [
+            (process_single_payout_task, lambda payout: [payout.id]),
+            (process_payout_batch_task, lambda payout: [[payout.id]]),
+        ],
+    )
+    def test_throttling_does_not_use_up_retries(self, processing_payout, task, as_args):
+        args = as_args(processing_payout)
+        throttle = [GatewayRateLimitedError("RUB", 30.0)]
+
+        # The 4th throttled attempt in a row is retried, past max_retries.
+        with pytest.raises(Retry) as retry:
+            self.run_attempt(task, args, retries=3, throttled=3, results=throttle)
+        assert retry.value.when >= 30.0
+        assert retry.value.sig.kwargs == {"throttled": 4}
+
+        # Failures after the throttling still get the whole retry budget.
+        with pytest.raises(Retry):
+            self.run_attempt(
+                task, args, retries=5, throttled=3, results=[RuntimeError("down")]
+            )
+        assert Payout.objects.get().status == StatusChoices.PROCESSING
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize(
+        "task, as_args",
+        [
+            (process_single_payout_task, lambda payout: [payout.id]),
+            (process_payout_batch_task, lambda payout: [[payout.id]]),
+        ],
+    )
+    def test_throttled_retries_are_capped(
+        self, settings, processing_payout, task, as_args
+    ):
+        settings.PAYOUT_RATE_LIMIT_MAX_RETRIES = 5
+        throttle = [GatewayRateLimitedError("RUB", 30.0)]
+
+        # Past the cap, being rate limited counts as a failure.
+        with pytest.raises(MaxRetriesExceededError):
+            self.run_attempt(
+                task,
+                as_args(processing_payout),
+                retries=8,
+                throttled=5,
+                results=throttle,
+            )
+
+        assert Payout.objects.get().status == StatusChoices.CANCELLED
+
+    @pytest.mark.django_db
+    def test_task_cancels_payout_after_failed_retries(self, processing_payout):
+        with pytest.raises(MaxRetriesExceededError):
+            self.run_attempt(
+                process_single_payout_task,
+                [processing_payout.id],
+                retries=5,
+                throttled=2,
+                results=[RuntimeError("down")],
+            )
+
+        assert Payout.objects.get().status == StatusChoices.CANCELLED
+
+
+@pytest.mark.django_db
+class TestFastSerializer:
+    @pytest.fixture
+    def payouts(self):
+        now = timezone.now()
+        details = [
+            {"recipient_name": "Zoë \u2028 \u2029 «Ünïcode»", "method": "card"},
+            {"recipient_name": "Floats", "fee": 0.5, "limit": 1e16},
+            {"recipient_name": "Nested", "tags": ["a", {"b": None}], "n": 2**70},
+            None,
+        ]
+        return [
+            Payout.objects.create(
+                payment_amount=amount,
+                details=value,
+                comment=comment,
+                created_at=now - timedelta(microseconds=i),
+            )
+            for i, (amount, value, comment) in enumerate(
+                zip(["0.10", "12345678.90", "7", "1.5"], details, ["x", None, "", "\n"])
+            )
+        ]
+
+    def get_both(self, api_client, settings, url, params=None):
+        responses = []
+        for fast in (False, True):
+            settings.PAYOUT_FAST_SERIALIZER = fast
+            payout_cache.clear()
+            responses.append(api_client.get(url, params))
+        return responses
+
+    @pytest.mark.parametrize(
+        "params", [{}, {"count": "false"}, {"pagination": "cursor"}]
+    )
+    def test_list_is_byte_identical(self, api_client, settings, payouts, params):
+        slow, fast = self.get_both(api_client, settings, reverse("payout-list"), params)
+
+        assert fast.status_code == status.HTTP_200_OK
+        assert fast.content == slow.content
+        assert len(fast.json()["results"]) == len(payouts)
+
+    def test_retrieve_is_byte_identical(self, api_client, settings, payouts):
+        for payout in payouts:
+            url = reverse("payout-detail", args=[payout.id])
+            slow, fast = self.get_both(api_client, settings, url)
+
+            assert fast.content == slow.content
+            assert fast["ETag"] == slow["ETag"]
+
+    def test_retrieve_unknown_payout(self, api_client, settings):
+        missing = ["00000000-0000-0000-0000-000000000000", "not-a-uuid"]
+        for payout_id in missing:
+            slow, fast = self.get_both(
+                api_client, settings, reverse("payout-detail", args=[payout_id])
+            )
+
+            assert fast.status_code == slow.status_code == status.HTTP_404_NOT_FOUND
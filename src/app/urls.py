@@ -1,11 +1,21 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from . import converters  # noqa: F401  registers <payout_id:...>
+from .async_views import payout_detail, payouts, submit_payout
 from .views import PayoutViewSet
 
 router = DefaultRouter()
 router.register(r"payouts", PayoutViewSet, basename="payout")
 
 urlpatterns = [
+    # Long-polls and event streams are in stream_urls, served over ASGI only.
+    path("async/payouts/", payouts, name="async-payout-list"),
+    path("async/payouts/<payout_id:pk>/", payout_detail, name="async-payout-detail"),
+    path(
+        "async/payouts/<payout_id:pk>/submit/",
+        submit_payout,
+        name="async-payout-submit",
+    ),
     path("", include(router.urls)),
 ]
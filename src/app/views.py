@@ -1,36 +1,192 @@
+import itertools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, status, viewsets
+from prometheus_client import CONTENT_TYPE_LATEST
+from rest_framework import filters, serializers, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 
-from src.app.models import Payout, StatusChoices
+from src.app.cache import entry_headers, payout_cache
+from src.app.encoders import PAYOUT_FIELDS, PayoutRowEncoder
+from src.app.exceptions import PAYOUT_REQUEST_ERRORS
+from src.app.filters import (
+    ArchivedPayoutFilterSet,
+    PayoutDailyStatFilterSet,
+    PayoutFilterSet,
+    PayoutSearchFilter,
+)
+from src.app.idempotency import idempotent
+from src.app.instrumentation import log_usage, record_usage, usage_headers
+from src.app.metrics import render_metrics
+from src.app.models import (
+    Payout,
+    PayoutArchive,
+    PayoutDailyStat,
+    PayoutEvent,
+    StatusChoices,
+)
+from src.app.pagination import PayoutCursorPagination, PayoutPageNumberPagination
+from src.app.renderers import FastJSONRenderer
 from src.app.serializers import (
     PayoutCreateSerializer,
+    PayoutDailyStatSerializer,
+    PayoutEventSerializer,
     PayoutSerializer,
     PayoutUpdateSerializer,
 )
 from src.app.services import PayoutService
+from src.app.signals import PayoutTransition, notify_transitions
+
+
+async def aiterate(queryset, chunk_size):
+    """Rows of ``queryset``, fetched ``chunk_size`` at a time in a thread.
+
+    ``QuerySet.aiterator()`` runs ``values_list()`` queries on the event
+    loop thread and fails, so the sync iterator is driven from one instead.
+    """
+    rows = queryset.iterator(chunk_size=chunk_size)
+    next_chunk = sync_to_async(lambda: list(itertools.islice(rows, chunk_size)))
+    while chunk := await next_chunk():
+        for row in chunk:
+            yield row
 
 
 class PayoutViewSet(viewsets.ModelViewSet):
     queryset = Payout.objects.all()
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
+        PayoutSearchFilter,
         filters.OrderingFilter,
     ]
-    filterset_fields = ["status", "currency"]
     search_fields = ["comment", "details"]
     ordering_fields = ["created_at", "updated_at", "payment_amount"]
     ordering = ["-created_at"]
+    pagination_class = PayoutPageNumberPagination
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    @property
+    def reads_archive(self):
+        """Whether ``?archived=true`` points the list or export at the archive."""
+        if self.action not in ("list", "export"):
+            return False
+        return self.request.query_params.get("archived", "").lower() in ("true", "1")
+
+    @property
+    def filterset_class(self):
+        return ArchivedPayoutFilterSet if self.reads_archive else PayoutFilterSet
+
+    def get_queryset(self):
+        if self.reads_archive:
+            return PayoutArchive.objects.all()
+        return super().get_queryset()
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            params = self.request.query_params if self.request else {}
+            if params.get("pagination") == "cursor" or "cursor" in params:
+                self._paginator = PayoutCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def dispatch(self, request, *args, **kwargs):
+        with record_usage() as usage:
+            response = super().dispatch(request, *args, **kwargs)
+        # Streaming exports are measured up to the response, not the body.
+        action = getattr(self, "action", None) or request.method.lower()
+        log_usage(f"api.payouts.{action}", usage)
+        if settings.DEBUG:
+            for header, value in usage_headers(usage).items():
+                response[header] = value
+        return response
 
     def get_serializer_class(self):
-        if self.action == "create":
+        if self.action in ["create", "bulk"]:
             return PayoutCreateSerializer
         elif self.action in ["update", "partial_update"]:
             return PayoutUpdateSerializer
         return PayoutSerializer
 
+    def cached_response(self, request, entry):
+        not_modified = get_conditional_response(
+            request, etag=entry["etag"], last_modified=entry["last_modified"]
+        )
+        if not_modified is not None:
+            return not_modified
+        return Response(entry["data"], headers=entry_headers(entry))
+
+    def retrieve(self, request, *args, **kwargs):
+        payout_id = payout_cache.normalize_id(kwargs[self.lookup_field])
+        entry = payout_cache.get_detail(payout_id) if payout_id else None
+        if entry is None:
+            data, updated_at = self.retrieve_data(payout_id)
+            entry = payout_cache.set_detail(payout_id, data, updated_at)
+        return self.cached_response(request, entry)
+
+    def retrieve_data(self, payout_id):
+        """The serialized payout and its ``updated_at``.
+
+        Payouts moved to the archive by partition maintenance are served from
+        there, so their IDs keep resolving.
+        """
+        if not settings.PAYOUT_FAST_SERIALIZER:
+            try:
+                instance = self.get_object()
+            except Http404:
+                instance = PayoutArchive.objects.filter(pk=payout_id).first()
+                if instance is None:
+                    raise
+            return self.get_serializer(instance).data, instance.updated_at
+
+        row = None
+        if payout_id is not None:
+            row = (
+                self.filter_queryset(self.get_queryset())
+                .filter(pk=payout_id)
+                .values_list(*PAYOUT_FIELDS, named=True)
+                .first()
+            ) or (
+                PayoutArchive.objects.filter(pk=payout_id)
+                .values_list(*PAYOUT_FIELDS, named=True)
+                .first()
+            )
+        if row is None:
+            raise Http404
+        return PayoutRowEncoder().to_dict(row), row.updated_at
+
+    def list(self, request, *args, **kwargs):
+        # Keyed by the generation before the query, not after it.
+        key = payout_cache.list_key(request.build_absolute_uri())
+        entry = payout_cache.get_list(key)
+        if entry is None:
+            entry = payout_cache.set_list(key, self.list_data(request, *args, **kwargs))
+        return self.cached_response(request, entry)
+
+    def list_data(self, request, *args, **kwargs):
+        if not settings.PAYOUT_FAST_SERIALIZER:
+            return super().list(request, *args, **kwargs).data
+
+        # Read-only fast path: only the serialized columns, encoded by
+        # precompiled converters instead of PayoutSerializer fields. Named
+        # rows keep the attribute access the cursor paginator relies on.
+        queryset = self.filter_queryset(self.get_queryset()).values_list(
+            *PAYOUT_FIELDS, named=True
+        )
+        encoder = PayoutRowEncoder()
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return [encoder.to_dict(row) for row in queryset]
+        rows = [encoder.to_dict(row) for row in page]
+        return self.get_paginated_response(rows).data
+
+    @idempotent
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -41,9 +197,14 @@ class PayoutViewSet(viewsets.ModelViewSet):
             response_serializer = PayoutSerializer(submitted_payout)
             return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
-        except Exception as e:
+        except PAYOUT_REQUEST_ERRORS as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @idempotent
+    def update(self, request, *args, **kwargs):
+        return super().update(request, *args, **kwargs)
+
+    @idempotent
     def partial_update(self, request, *args, **kwargs):
         instance = self.get_object()
         serializer = self.get_serializer(instance, data=request.data, partial=True)
@@ -51,6 +212,7 @@ class PayoutViewSet(viewsets.ModelViewSet):
         updated_instance = serializer.save()
         return Response(self.get_serializer(updated_instance).data)
 
+    @idempotent
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
 
@@ -62,13 +224,130 @@ class PayoutViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        self.perform_destroy(instance)
+        with transaction.atomic():
+            transition = PayoutTransition.deleted(instance)
+            self.perform_destroy(instance)
+            notify_transitions([transition])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=["post"])
+    @idempotent
     def submit(self, request, pk=None):
         try:
             payout = PayoutService.submit_payout(pk)
             return Response(self.get_serializer(payout).data)
-        except Exception as e:
+        except PAYOUT_REQUEST_ERRORS as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=["post"])
+    @idempotent
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {"error": "Expected a non-empty list of payouts"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > settings.PAYOUT_BULK_MAX_ITEMS:
+            return Response(
+                {
+                    "error": f"No more than {settings.PAYOUT_BULK_MAX_ITEMS} payouts per request"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        child = self.get_serializer(many=True).child
+        valid_data = []
+        positions = []
+        errors = []
+        for index, item in enumerate(items):
+            try:
+                valid_data.append(child.run_validation(item))
+                positions.append(index)
+            except serializers.ValidationError as e:
+                errors.append({"index": index, "errors": e.detail})
+
+        try:
+            payouts, rejected = PayoutService.create_and_submit_many(valid_data)
+        except PAYOUT_REQUEST_ERRORS as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        for position, message in rejected:
+            errors.append({"index": positions[position], "errors": [message]})
+        errors.sort(key=lambda error: error["index"])
+
+        response_status = (
+            status.HTTP_201_CREATED if payouts else status.HTTP_400_BAD_REQUEST
+        )
+        return Response(
+            {"created": [payout.id for payout in payouts], "errors": errors},
+            status=response_status,
+        )
+
+    @action(detail=True, methods=["get"])
+    def history(self, request, pk=None):
+        """Status transitions of the payout from the event log, oldest first."""
+        payout_id = payout_cache.normalize_id(pk)
+        if payout_id is None:
+            raise Http404
+        events = PayoutEvent.objects.filter(payout_id=payout_id).order_by(
+            "created_at", "id"
+        )
+        data = PayoutEventSerializer(events, many=True).data
+        # Payouts from before the log existed have no events yet.
+        if not data and not (
+            Payout.objects.filter(pk=payout_id).exists()
+            or PayoutArchive.objects.filter(pk=payout_id).exists()
+        ):
+            raise Http404
+        return Response(data)
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        export_format = request.query_params.get("export_format", "csv")
+        if export_format not in ("csv", "ndjson"):
+            return Response(
+                {"error": "export_format must be 'csv' or 'ndjson'"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        encoder = PayoutRowEncoder()
+        queryset = self.filter_queryset(self.get_queryset()).values_list(
+            *encoder.fields
+        )
+        chunk_size = settings.PAYOUT_EXPORT_CHUNK_SIZE
+        if settings.ASGI:
+            # Django reads a sync iterator into a list under ASGI, so the
+            # export streams from the async ORM there.
+            rows = aiterate(queryset, chunk_size)
+            iter_csv, iter_ndjson = encoder.aiter_csv, encoder.aiter_ndjson
+        else:
+            rows = queryset.iterator(chunk_size=chunk_size)
+            iter_csv, iter_ndjson = encoder.iter_csv, encoder.iter_ndjson
+        if export_format == "csv":
+            content, content_type = iter_csv(rows), "text/csv"
+        else:
+            content, content_type = iter_ndjson(rows), "application/x-ndjson"
+
+        return StreamingHttpResponse(
+            content,
+            content_type=content_type,
+            headers={
+                "Content-Disposition": f'attachment; filename="payouts.{export_format}"'
+            },
+        )
+
+    @action(detail=False, methods=["get"])
+    def stats(self, request):
+        stats = PayoutDailyStat.objects.filter(count__gt=0).order_by(
+            "-day", "status", "currency"
+        )
+        filterset = PayoutDailyStatFilterSet(request.query_params, queryset=stats)
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(PayoutDailyStatSerializer(filterset.qs, many=True).data)
+
+
+def metrics(request):
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
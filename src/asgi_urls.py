@@ -0,0 +1,15 @@
+"""URLconf of the ASGI service: every WSGI route plus the long-lived ones.
+
+Long-polls and event streams hold their connection for up to
+``PAYOUT_WAIT_MAX_TIMEOUT`` seconds, which would tie up a gunicorn sync
+worker each, so only the uvicorn service mounts them.
+"""
+
+from django.urls import include, path
+
+from src.urls import urlpatterns as wsgi_urlpatterns
+
+urlpatterns = [
+    path("api/", include("src.app.stream_urls")),
+    *wsgi_urlpatterns,
+]
@@ -11,6 +11,9 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "test_task_drf.settings")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "src.core.settings")
+# Long-polls and event streams are only served here, not by gunicorn.
+os.environ.setdefault("ROOT_URLCONF", "src.asgi_urls")
+os.environ.setdefault("DJANGO_ASGI", "1")
 
 application = get_asgi_application()
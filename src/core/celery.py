@@ -1,9 +1,33 @@
 import os
 
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "src.core.settings")
 
 app = Celery("src.core")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def reset_db_connections(**kwargs):
+    from src.core.db import close_db_connections
+
+    close_db_connections()
+
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    port = os.environ.get("CELERY_METRICS_PORT")
+    if port:
+        from src.app.metrics import serve_worker_metrics
+
+        serve_worker_metrics(int(port))
+
+
+@worker_process_shutdown.connect
+def forget_process_metrics(pid, **kwargs):
+    from src.app.metrics import mark_process_dead
+
+    mark_process_dead(pid)
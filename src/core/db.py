@@ -0,0 +1,16 @@
+from django.db import connections
+
+
+def close_db_connections():
+    """Drop database connections and pools inherited from a parent process.
+
+    Sockets must not be shared between forked processes, so each child opens
+    its own connections on first use.
+    """
+    for connection in connections.all(initialized_only=True):
+        if connection.settings_dict["OPTIONS"].get("pool") and hasattr(
+            connection, "close_pool"
+        ):
+            connection.close_pool()
+        else:
+            connection.close()
@@ -4,6 +4,7 @@ from pathlib import Path
 
 import environ
 from celery.schedules import crontab
+from django.core.exceptions import ImproperlyConfigured
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -20,51 +21,87 @@ DEBUG = env("DEBUG")
 
 ALLOWED_HOSTS = env.list("ALLOWED_HOSTS")
 
-ROOT_URLCONF = "src.urls"
+# src.core.asgi switches to src.asgi_urls, which adds the streaming routes.
+ROOT_URLCONF = env("ROOT_URLCONF", default="src.urls")
 
 WSGI_APPLICATION = "src.core.wsgi.application"
 
 
+TESTING = "test" in sys.argv or "pytest" in sys.modules
+
+# Process role, which decides the apps, middleware and templates loaded:
+#   "api"    - gunicorn, uvicorn and management commands such as migrate
+#   "worker" - Celery workers and the outbox relay
+#   "beat"   - the Celery scheduler
+#   "test"   - the test suite
+# Only "api" serves HTML and the OpenAPI schema, so only it pays for the
+# admin, static files and drf-spectacular; "test" keeps the API middleware
+# and the sessions and messages apps it relies on.
+APP_ROLE = env("APP_ROLE", default="test" if TESTING else "api")
+
 # Application definition
-INSTALLED_APPS = [
-    "django.contrib.admin",
-    "django.contrib.auth",
-    "django.contrib.contenttypes",
-    "django.contrib.sessions",
-    "django.contrib.messages",
-    "django.contrib.staticfiles",
-    "rest_framework",
-    "django_filters",
-    "drf_spectacular",
-    "src.app",
-]
+ROLE_APPS = {
+    "api": [
+        "django.contrib.admin",
+        "django.contrib.auth",
+        "django.contrib.contenttypes",
+        "django.contrib.sessions",
+        "django.contrib.messages",
+        "django.contrib.staticfiles",
+        "rest_framework",
+        "django_filters",
+        "drf_spectacular",
+        "src.app",
+    ],
+    "worker": ["django.contrib.contenttypes", "src.app"],
+    "beat": ["django.contrib.contenttypes", "src.app"],
+    "test": [
+        "django.contrib.auth",
+        "django.contrib.contenttypes",
+        "django.contrib.sessions",
+        "django.contrib.messages",
+        "rest_framework",
+        "django_filters",
+        "src.app",
+    ],
+}
+INSTALLED_APPS = ROLE_APPS[APP_ROLE]
 
 # Middlewares
-MIDDLEWARE = [
-    "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
-    "django.middleware.common.CommonMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
-    "django.middleware.clickjacking.XFrameOptionsMiddleware",
-]
+ROLE_MIDDLEWARE = {
+    "api": [
+        "django.middleware.security.SecurityMiddleware",
+        "django.contrib.sessions.middleware.SessionMiddleware",
+        "django.middleware.common.CommonMiddleware",
+        "django.middleware.csrf.CsrfViewMiddleware",
+        "django.contrib.auth.middleware.AuthenticationMiddleware",
+        "django.contrib.messages.middleware.MessageMiddleware",
+        "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    ],
+    "worker": [],
+    "beat": [],
+}
+# Tests go through the same middleware as API requests, CSRF and auth included.
+ROLE_MIDDLEWARE["test"] = ROLE_MIDDLEWARE["api"]
+MIDDLEWARE = ROLE_MIDDLEWARE[APP_ROLE]
 
 # Templates
-TEMPLATES = [
-    {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
-        "DIRS": [],
-        "APP_DIRS": True,
-        "OPTIONS": {
-            "context_processors": [
-                "django.template.context_processors.request",
-                "django.contrib.auth.context_processors.auth",
-                "django.contrib.messages.context_processors.messages",
-            ],
+TEMPLATES = []
+if APP_ROLE == "api":
+    TEMPLATES = [
+        {
+            "BACKEND": "django.template.backends.django.DjangoTemplates",
+            "DIRS": [],
+            "APP_DIRS": True,
+            "OPTIONS": {
+                "context_processors": [
+                    "django.template.context_processors.request",
+                    "django.contrib.auth.context_processors.auth",
+                    "django.contrib.messages.context_processors.messages",
+                ],
+            },
         },
-    },
-]
+    ]
 
 # Databases
 DATABASES = {
@@ -81,8 +118,56 @@ DATABASES = {
     }
 }
 
+# Connection reuse, per process:
+#   "none"       - a new connection for every request / task
+#   "persistent" - keep connections open for DB_CONN_MAX_AGE seconds
+#   "pool"       - psycopg 3 connection pool (pip install ".[pool]")
+#   "pgbouncer"  - persistent connections to a transaction-pooling PgBouncer
+DB_POOL_MODE = env("DB_POOL_MODE", default="persistent")
+# Set by src.core.asgi. Persistent connections belong to the thread that
+# opened them and leak under ASGI, so they are closed after every request.
+ASGI = env.bool("DJANGO_ASGI", default=False)
+# Requests a process serves at once: gunicorn's threads per worker. Sync
+# workers, prefork Celery children and the ASGI sync thread use one.
+DB_CONCURRENCY = env.int("GUNICORN_THREADS", default=1)
+if DB_POOL_MODE in ("persistent", "pgbouncer"):
+    DATABASES["default"]["CONN_MAX_AGE"] = (
+        0 if ASGI else env.int("DB_CONN_MAX_AGE", default=60)
+    )
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+if DB_POOL_MODE == "pgbouncer":
+    # Named cursors do not survive transaction pooling.
+    DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = True
+if DB_POOL_MODE == "pool":
+    # Sized per process, one connection per concurrent request or task plus
+    # one spare; the total is processes x DB_POOL_MAX_SIZE.
+    DB_POOL_MAX_SIZE = env.int("DB_POOL_MAX_SIZE", default=DB_CONCURRENCY + 1)
+    if DB_POOL_MAX_SIZE < DB_CONCURRENCY:
+        raise ImproperlyConfigured(
+            f"DB_POOL_MAX_SIZE={DB_POOL_MAX_SIZE} is below the "
+            f"{DB_CONCURRENCY} GUNICORN_THREADS each process runs"
+        )
+
+    from psycopg_pool import ConnectionPool
+
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": env.int("DB_POOL_MIN_SIZE", default=1),
+        "max_size": DB_POOL_MAX_SIZE,
+        "timeout": env.float("DB_POOL_TIMEOUT", default=10.0),
+        "max_idle": env.float("DB_POOL_MAX_IDLE", default=300.0),
+        "check": ConnectionPool.check_connection,
+    }
+
+# Caches
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": env("REDIS_URL", default="redis://redis:6379/0"),
+    }
+}
+
 # Tests
-if "test" in sys.argv or "pytest" in sys.modules:
+if TESTING:
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
@@ -90,6 +175,12 @@ if "test" in sys.argv or "pytest" in sys.modules:
         }
     }
 
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
     SECRET_KEY = "test-secret-key-for-tests-only"
 
     REST_FRAMEWORK = {
@@ -149,9 +240,179 @@ REDIS_URL = env("REDIS_URL", default="redis://redis:6379/0")
 CELERY_BROKER_URL = env("CELERY_BROKER_URL", default=REDIS_URL)
 CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND", default=REDIS_URL)
 CELERY_TIMEZONE = "Europe/Moscow"
+# Task results. Periodic tasks never store theirs. Payout tasks do not either
+# by default: their outcomes are in the PayoutEvent log, written in batches
+# with the status change. With CELERY_TASK_IGNORE_RESULT=false, or per task
+# through CELERY_TASK_ANNOTATIONS, e.g.
+# '{"payouts.process_payout_batch": {"ignore_result": false}}', results are
+# kept as msgpack for CELERY_RESULT_EXPIRES seconds.
+CELERY_TASK_IGNORE_RESULT = env.bool("CELERY_TASK_IGNORE_RESULT", default=True)
+CELERY_TASK_ANNOTATIONS = env.json("CELERY_TASK_ANNOTATIONS", default={})
+CELERY_RESULT_SERIALIZER = env("CELERY_RESULT_SERIALIZER", default="msgpack")
+CELERY_RESULT_COMPRESSION = env("CELERY_RESULT_COMPRESSION", default=None)
+CELERY_RESULT_EXPIRES = env.int("CELERY_RESULT_EXPIRES", default=60 * 60)
+CELERY_RESULT_ACCEPT_CONTENT = ["json", "msgpack"]
+# Worker presets, picked with WORKER_PROFILE.
+WORKER_PROFILES = {
+    # Celery's own: every process reserves 4 messages, each acknowledged
+    # right before it runs.
+    "default": {
+        "task_acks_late": False,
+        "task_reject_on_worker_lost": False,
+        "worker_prefetch_multiplier": 4,
+    },
+    # Payout tasks wait 3-10 s on the gateway. A worker reserves no more
+    # messages than it has processes, so waiting work stays in the broker for
+    # whichever worker frees up first. Messages are acknowledged after the
+    # task, and a child that dies mid-task has its message requeued instead
+    # of leaving the payout to the stalled scan. Run such workers with
+    # "-O fair --autoscale=<max>,<min>", see docker-compose.yml.
+    "long_tasks": {
+        "task_acks_late": True,
+        "task_reject_on_worker_lost": True,
+        "worker_prefetch_multiplier": 1,
+    },
+}
+WORKER_PROFILE = env("WORKER_PROFILE", default="long_tasks")
+CELERY_TASK_ACKS_LATE = WORKER_PROFILES[WORKER_PROFILE]["task_acks_late"]
+CELERY_TASK_REJECT_ON_WORKER_LOST = WORKER_PROFILES[WORKER_PROFILE][
+    "task_reject_on_worker_lost"
+]
+# Prefetch is per worker, and so per queue with one worker service per queue.
+CELERY_WORKER_PREFETCH_MULTIPLIER = env.int(
+    "CELERY_WORKER_PREFETCH_MULTIPLIER",
+    default=WORKER_PROFILES[WORKER_PROFILE]["worker_prefetch_multiplier"],
+)
+# Unacknowledged messages, including retries waiting out their countdown,
+# go back to the queue after this long on Redis. Keep it above the longest
+# task time limit plus retry delay.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "visibility_timeout": env.int("CELERY_VISIBILITY_TIMEOUT", default=60 * 60)
+}
 CELERY_BEAT_SCHEDULE = {
     "check-stalled-payouts-every-10-min": {
         "task": "src.app.tasks.sanity_task.check_stalled_payouts",
         "schedule": crontab(minute="*/10"),
     },
+    "relay-outbox-every-minute": {
+        "task": "payouts.relay_outbox",
+        "schedule": crontab(minute="*"),
+    },
+    "reconcile-payout-stats-daily": {
+        "task": "payouts.reconcile_stats",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "manage-payout-partitions-daily": {
+        "task": "payouts.manage_partitions",
+        "schedule": crontab(hour=2, minute=0),
+    },
+    "purge-idempotency-keys-hourly": {
+        "task": "payouts.purge_idempotency_keys",
+        "schedule": crontab(minute=30),
+    },
+}
+
+# Logging
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "usage": {"format": "%(asctime)s %(levelname)s %(name)s %(message)s"},
+    },
+    "handlers": {
+        "usage": {"class": "logging.StreamHandler", "formatter": "usage"},
+    },
+    "loggers": {
+        # One "<operation> queries=.. db_ms=.. wall_ms=.." line per API action
+        # and Celery task; the same values are attached as record attributes.
+        "src.app.instrumentation": {
+            "handlers": ["usage"],
+            "level": env("USAGE_LOG_LEVEL", default="INFO"),
+            "propagate": False,
+        },
+    },
+}
+
+# Payouts
+PAYOUT_BULK_MAX_ITEMS = env.int("PAYOUT_BULK_MAX_ITEMS", default=10000)
+PAYOUT_BULK_INSERT_BATCH_SIZE = env.int("PAYOUT_BULK_INSERT_BATCH_SIZE", default=1000)
+PAYOUT_BATCH_MAX_SIZE = env.int("PAYOUT_BATCH_MAX_SIZE", default=100)
+PAYOUT_BATCH_MAX_WAIT = env.float("PAYOUT_BATCH_MAX_WAIT", default=1.0)
+PAYOUT_GATEWAY = {
+    "BACKEND": env(
+        "PAYOUT_GATEWAY_BACKEND", default="src.app.gateway.FakePayoutGateway"
+    ),
+    "OPTIONS": {
+        "min_latency": env.float("PAYOUT_GATEWAY_MIN_LATENCY", default=3.0),
+        "max_latency": env.float("PAYOUT_GATEWAY_MAX_LATENCY", default=10.0),
+        "approval_rate": env.float("PAYOUT_GATEWAY_APPROVAL_RATE", default=0.8),
+        "max_in_flight": env.int("PAYOUT_GATEWAY_MAX_IN_FLIGHT", default=100),
+    },
+}
+PAYOUT_OUTBOX_BATCH_SIZE = env.int("PAYOUT_OUTBOX_BATCH_SIZE", default=500)
+PAYOUT_OUTBOX_POLL_INTERVAL = env.float("PAYOUT_OUTBOX_POLL_INTERVAL", default=0.5)
+PAYOUT_OUTBOX_RETENTION = env.int("PAYOUT_OUTBOX_RETENTION", default=24 * 60 * 60)
+# Failed publishes are retried after 2**attempts seconds, capped, and a
+# message is set aside (kept unsent, skipped by the relay) after the last one.
+PAYOUT_OUTBOX_MAX_ATTEMPTS = env.int("PAYOUT_OUTBOX_MAX_ATTEMPTS", default=10)
+PAYOUT_OUTBOX_MAX_BACKOFF = env.int("PAYOUT_OUTBOX_MAX_BACKOFF", default=15 * 60)
+PAYOUT_CACHE_ALIAS = "default"
+PAYOUT_CACHE_TTL = env.int("PAYOUT_CACHE_TTL", default=60)
+PAYOUT_CACHE_LOCAL_TTL = env.float("PAYOUT_CACHE_LOCAL_TTL", default=1.0)
+PAYOUT_CACHE_LOCAL_MAX_SIZE = env.int("PAYOUT_CACHE_LOCAL_MAX_SIZE", default=10000)
+# Seconds a changed payout's detail entry refuses fills from earlier reads.
+PAYOUT_CACHE_TOMBSTONE_TTL = env.int("PAYOUT_CACHE_TOMBSTONE_TTL", default=10)
+# Publish invalidations so every process drops its local copies at once.
+PAYOUT_CACHE_BROADCAST = env.bool("PAYOUT_CACHE_BROADCAST", default=not TESTING)
+PAYOUT_EVENTS_ENABLED = env.bool("PAYOUT_EVENTS_ENABLED", default=not TESTING)
+PAYOUT_WAIT_MAX_TIMEOUT = env.float("PAYOUT_WAIT_MAX_TIMEOUT", default=30.0)
+PAYOUT_WAIT_POLL_INTERVAL = env.float("PAYOUT_WAIT_POLL_INTERVAL", default=1.0)
+PAYOUT_STREAM_MAX_IDS = env.int("PAYOUT_STREAM_MAX_IDS", default=100)
+PAYOUT_STREAM_HEARTBEAT = env.float("PAYOUT_STREAM_HEARTBEAT", default=15.0)
+PAYOUT_EXPORT_CHUNK_SIZE = env.int("PAYOUT_EXPORT_CHUNK_SIZE", default=2000)
+PAYOUT_DEFAULT_QUEUE = env("PAYOUT_DEFAULT_QUEUE", default="payouts")
+PAYOUT_PRIORITY_QUEUE = env("PAYOUT_PRIORITY_QUEUE", default="payouts.priority")
+PAYOUT_STALLED_QUEUE = env("PAYOUT_STALLED_QUEUE", default="payouts.stalled")
+# Seconds in PROCESSING before the sanity check resubmits a payout. Keep it
+# well above the payout tasks' time_limit, or a running task gets a twin.
+PAYOUT_STALLED_AFTER = env.int("PAYOUT_STALLED_AFTER", default=600)
+# "currency" (payouts.rub, payouts.usd, ...), "amount" (payouts.upto_<tier>,
+# payouts.above_<last tier>) or "none" (everything on PAYOUT_DEFAULT_QUEUE).
+PAYOUT_ROUTE_BY = env("PAYOUT_ROUTE_BY", default="currency")
+PAYOUT_AMOUNT_TIERS = env.list("PAYOUT_AMOUNT_TIERS", cast=int, default=[1000, 100000])
+PAYOUT_PRIORITY_MIN_AMOUNT = env.float("PAYOUT_PRIORITY_MIN_AMOUNT", default=None)
+# Defaults to "celery" plus every payout queue.
+PAYOUT_METRICS_QUEUES = env.list("PAYOUT_METRICS_QUEUES", default=None)
+PAYOUT_IDEMPOTENCY_TTL = env.int("PAYOUT_IDEMPOTENCY_TTL", default=24 * 60 * 60)
+PAYOUT_IDEMPOTENCY_RETENTION = env.int(
+    "PAYOUT_IDEMPOTENCY_RETENTION", default=7 * 24 * 60 * 60
+)
+# Gateway rate limiting: "redis" (shared by all workers), "local" (per
+# process) or "none". Limits apply per currency, per payout method or to all
+# payouts together, see PAYOUT_RATE_LIMIT_BY; "rate" is the ceiling the
+# adaptive rate recovers to, in payouts per second.
+PAYOUT_RATE_LIMIT_BACKEND = env(
+    "PAYOUT_RATE_LIMIT_BACKEND", default="none" if TESTING else "redis"
+)
+PAYOUT_RATE_LIMIT_BY = env("PAYOUT_RATE_LIMIT_BY", default="currency")
+PAYOUT_RATE_LIMIT_MAX_WAIT = env.float("PAYOUT_RATE_LIMIT_MAX_WAIT", default=5.0)
+# Rate-limited retries of a payout task before they count as failures.
+PAYOUT_RATE_LIMIT_MAX_RETRIES = env.int("PAYOUT_RATE_LIMIT_MAX_RETRIES", default=50)
+PAYOUT_RATE_LIMITS = {
+    "default": {
+        "rate": env.float("PAYOUT_RATE_LIMIT_RATE", default=50.0),
+        "burst": env.float("PAYOUT_RATE_LIMIT_BURST", default=100.0),
+        "min_rate": env.float("PAYOUT_RATE_LIMIT_MIN_RATE", default=2.0),
+        "increase": env.float("PAYOUT_RATE_LIMIT_INCREASE", default=1.0),
+        "decrease": env.float("PAYOUT_RATE_LIMIT_DECREASE", default=0.7),
+        "target_latency": env.float("PAYOUT_RATE_LIMIT_TARGET_LATENCY", default=12.0),
+        "error_rate": env.float("PAYOUT_RATE_LIMIT_ERROR_RATE", default=0.1),
+    },
 }
+# Per-scope overrides, e.g. '{"RUB": {"rate": 20}, "card": {"burst": 10}}'.
+PAYOUT_RATE_LIMITS.update(env.json("PAYOUT_RATE_LIMIT_OVERRIDES", default={}))
+PAYOUT_RETRY_BASE_DELAY = env.float("PAYOUT_RETRY_BASE_DELAY", default=10.0)
+PAYOUT_RETRY_MAX_DELAY = env.float("PAYOUT_RETRY_MAX_DELAY", default=300.0)
+# Serve list and retrieve from .values() rows and PayoutRowEncoder instead of
+# PayoutSerializer; the JSON is the same byte for byte.
+PAYOUT_FAST_SERIALIZER = env.bool("PAYOUT_FAST_SERIALIZER", default=True)
@@ -1,14 +1,48 @@
-from django.contrib import admin
+import functools
+
+from django.apps import apps
 from django.urls import include, path
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from django.utils.module_loading import import_string
+
+from src.app.views import metrics
+
+
+def lazy_view(view_class, **initkwargs):
+    """A class-based view imported on its first request rather than at startup."""
+
+    @functools.cache
+    def load():
+        return import_string(view_class).as_view(**initkwargs)
+
+    def view(request, *args, **kwargs):
+        return load()(request, *args, **kwargs)
+
+    return view
+
 
 urlpatterns = [
-    path("admin/", admin.site.urls),
     path("api/", include("src.app.urls")),
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
-    path(
-        "api/docs/",
-        SpectacularSwaggerView.as_view(url_name="schema"),
-        name="swagger-ui",
-    ),
+    path("metrics", metrics, name="metrics"),
 ]
+
+if apps.is_installed("django.contrib.admin"):
+    from django.contrib import admin
+
+    urlpatterns.append(path("admin/", admin.site.urls))
+
+if apps.is_installed("drf_spectacular"):
+    # Schema generation pulls in the whole of drf-spectacular and PyYAML.
+    urlpatterns += [
+        path(
+            "api/schema/",
+            lazy_view("drf_spectacular.views.SpectacularAPIView"),
+            name="schema",
+        ),
+        path(
+            "api/docs/",
+            lazy_view(
+                "drf_spectacular.views.SpectacularSwaggerView", url_name="schema"
+            ),
+            name="swagger-ui",
+        ),
+    ]